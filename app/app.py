@@ -1,28 +1,22 @@
 import streamlit as st
 import pandas as pd
 import os
-import pickle
 import sys
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # --- Importações do Projeto ---
-from core.data.io import load_daily_activity
-from core.data.database import (
-    create_database_and_tables,
-    insert_csv_to_sor,
-    run_etl_sor_to_sot,
-    run_etl_sot_to_spec_train,
-    run_etl_for_predict_data,
-    load_data,
-    drop_database,
-    get_activity_summary,
-    get_daily_activity_stats
-)
-from core.features.preprocess import make_preprocess_pipeline
-from core.models.train import train_regressor
-from core.models.predict import evaluate_regressor
-from core.explain.coefficients import extract_linear_importances
+from core.data.io import load_daily_activity_uploads
+from core.data.database import drop_database, get_drift_report
+from core.data.cache import activity_summary, daily_activity_stats, describe_frame, frame_fingerprint, most_active_users
+from core.data.export import EXPORT_SOURCES, export_columns, export_to_file
+from core.data.query import list_user_ids, query_daily_activity
+from core.data.schema import to_model_input
+from core.explain.coefficients import explain_predictions, extract_linear_importances, top_contributions
+from core.models.registry import MODEL_PATH, load_model, model_fingerprint
+from core.models.scoring import load_predictions
+from core.jobs.runner import get_runner
+from core.monitoring.timing import recent_runs, run_stages, stage_summary
 from core.chatbot.rules import answer_from_metrics
 
 # --- Configurações da Página e Estado ---
@@ -42,16 +36,36 @@ if "metrics" not in st.session_state:
 if "importances" not in st.session_state:
     st.session_state.importances = pd.DataFrame(columns=["feature", "importance"])
 
-# --- Diretórios ---
-MODEL_DIR = "model"
-if not os.path.exists(MODEL_DIR):
-    os.makedirs(MODEL_DIR)
-MODEL_PATH = os.path.join(MODEL_DIR, "regressor_model.pickle")
-
 # --- Funções Auxiliares ---
-@st.cache_data
-def convert_df_to_csv(df):
-    return df.to_csv(index=False).encode('utf-8')
+def prepare_export(table, columns, start_date, end_date, compress):
+    """
+    Grava a exportação em fluxo num arquivo temporário (um por sessão) e
+    guarda o caminho na sessão; o arquivo anterior é removido.
+    """
+    previous = st.session_state.get("export_path")
+    if previous and os.path.exists(previous):
+        os.remove(previous)
+    path, rows = export_to_file(table, columns=columns, start_date=start_date, end_date=end_date, compress=compress)
+    st.session_state.export_path = path
+    return rows
+
+def read_activity_uploads(uploaded_files):
+    """Lê em memória (e em paralelo) os uploads de atividade diária e os junta."""
+    files = [
+        f for f in uploaded_files or []
+        if "daily" in f.name.lower() or "activity" in f.name.lower()
+    ]
+    return load_daily_activity_uploads(files)
+
+@st.cache_data(max_entries=8)
+def get_overview_summary(fingerprint, _df):
+    """Resumo da Visão Geral, calculado uma vez por conteúdo (compartilhado entre sessões)."""
+    return describe_frame(_df)
+
+@st.cache_resource
+def get_active_model(fingerprint):
+    """Modelo ativo compartilhado entre sessões; recarrega quando o artefato muda."""
+    return load_model(MODEL_PATH)
 
 # --- Título e Sidebar ---
 st.title("🏃‍♂️ Análise de Atividade Física - Dashboard Interativo")
@@ -73,99 +87,166 @@ with st.sidebar:
         "Variável Alvo para Previsão",
         ["Calories"]
     )
+    training_mode = st.selectbox(
+        "Modo de treino",
+        [
+            "Divisão simples (Regressão Linear)",
+            "Validação cruzada + busca de hiperparâmetros",
+            "Incremental fora da memória (SGD em blocos)",
+        ]
+    )
+    if training_mode.startswith("Validação cruzada"):
+        cv_folds = st.slider("Número de folds", 3, 10, 5)
+        cv_jobs = st.slider("Processos paralelos", 1, os.cpu_count() or 1, min(4, os.cpu_count() or 1))
+    incremental_etl = st.checkbox(
+        "Atualização incremental (processa só dias novos ou alterados)",
+        value=False,
+        help="Desmarcado, o banco é recriado e todo o histórico é reprocessado (backfill)."
+    )
     
     if st.button("Executar Treinamento"):
-        df_data = None
-        for file in uploaded_files:
-            if "daily" in file.name.lower() or "activity" in file.name.lower():
-                # Salva o arquivo temporariamente e carrega
-                try:
-                    # Salva o arquivo uploadado temporariamente
-                    temp_path = f"temp_{file.name}"
-                    with open(temp_path, "wb") as f:
-                        f.write(file.getbuffer())
-                    
-                    # Carrega o arquivo
-                    df_data = load_daily_activity(temp_path)
-                    
-                    # Remove o arquivo temporário
-                    os.remove(temp_path)
-                    
-                    if df_data is not None and not df_data.empty:
-                         st.session_state.df_overview = df_data
-                        
-                except Exception as e:
-                    st.error(f"Erro ao processar arquivo {file.name}: {e}")
-                    continue
-        
+        df_data, errors = read_activity_uploads(uploaded_files)
+        for name, message in errors.items():
+            st.error(f"Erro ao processar arquivo {name}: {message}")
         if df_data is not None and not df_data.empty:
-            with st.spinner("Processando dados e treinando o modelo..."):
-                try:
-                    # Executa o pipeline ETL
-                    create_database_and_tables()
-                    insert_csv_to_sor(df_data)
-                    run_etl_sor_to_sot()
-                    run_etl_sot_to_spec_train()
-                    
-                    # Carrega dados processados
-                    df_spec_train = load_data("spec_daily_activity_train")
-                    
-                    # Prepara dados para treino
-                    y = df_spec_train[target_variable]
-                    X = df_spec_train.drop(columns=[target_variable])
-                    
-                    # Preprocessamento e treino
-                    pre = make_preprocess_pipeline(X)
-                    model, X_test, y_test = train_regressor(X, y, pre, test_size=test_size)
-                    
-                    # Salva o modelo
-                    with open(MODEL_PATH, "wb") as f:
-                        pickle.dump(model, f)
-                    
-                    # Avalia o modelo
-                    st.session_state.metrics = evaluate_regressor(model, X_test, y_test)
-                    st.session_state.importances = extract_linear_importances(model, X.columns, pre)
-                    st.session_state.model_trained = True
-                    st.session_state.predictions_made = False
-                    st.session_state.target_variable = target_variable
-                    
-                    st.success(f"Modelo treinado para prever '{target_variable}' e salvo com sucesso!")
-                    
-                except Exception as e:
-                    st.error(f"Erro durante o treinamento: {e}")
+            st.session_state.df_overview = df_data
+            st.session_state.df_overview_key = frame_fingerprint(df_data)
+            if training_mode.startswith("Incremental"):
+                mode = "incremental"
+            elif training_mode.startswith("Validação cruzada"):
+                mode = "cv"
+            else:
+                mode = "simple"
+            params = {
+                "target": target_variable,
+                "test_size": test_size,
+                "mode": mode,
+                "incremental_etl": incremental_etl,
+            }
+            if mode == "cv":
+                params.update(cv_folds=cv_folds, cv_jobs=cv_jobs)
+            # O ETL e o treino rodam em segundo plano; a sessão segue responsiva
+            st.session_state.job_id = get_runner().submit("train", params, df_data)
+            st.info("Treinamento enviado para execução em segundo plano.")
         else:
             st.warning("Nenhum dado válido de atividade física foi encontrado nos arquivos uploadados.")
 
-    
+    # --- Carregar o modelo ativo já salvo ---
+    if st.button("Carregar Modelo Salvo"):
+        fingerprint = model_fingerprint(MODEL_PATH)
+        if fingerprint is None:
+            st.warning("Nenhum modelo salvo encontrado.")
+        else:
+            try:
+                model, metadata = get_active_model(fingerprint)
+                st.session_state.metrics = metadata.get("metrics") or None
+                st.session_state.importances = extract_linear_importances(
+                    model, metadata.get("feature_names"), None, version=metadata.get("version")
+                )
+                st.session_state.target_variable = metadata.get("target", "Calories")
+                st.session_state.model_version = metadata.get("version")
+                st.session_state.model_trained = True
+                st.success(f"Modelo {metadata.get('version')} carregado.")
+            except Exception as e:
+                st.error(f"Erro ao carregar o modelo salvo: {e}")
+
+    # --- AÇÃO 2: Gerar previsões com o modelo salvo ---
+    st.subheader("Gerar Previsões")
+    if st.button("Executar Previsões"):
+        if not os.path.exists(MODEL_PATH):
+            st.warning("Nenhum modelo salvo encontrado. Treine um modelo primeiro.")
+        else:
+            df_predict, errors = read_activity_uploads(uploaded_files)
+            for name, message in errors.items():
+                st.error(f"Erro ao processar arquivo {name}: {message}")
+
+            if df_predict is not None and not df_predict.empty:
+                st.session_state.job_id = get_runner().submit("predict", {"model_path": MODEL_PATH}, df_predict)
+                st.info("Previsões enviadas para execução em segundo plano.")
+            else:
+                st.warning("Nenhum dado válido de atividade física foi encontrado nos arquivos uploadados.")
+
     # --- AÇÃO 3: Limpeza ---
     st.header("3. Manutenção")
     if st.button("Limpar Tudo"):
         drop_database()
-        if os.path.exists(MODEL_PATH):
-            os.remove(MODEL_PATH)
+        for path in (MODEL_PATH, os.path.splitext(MODEL_PATH)[0] + ".json"):
+            if os.path.exists(path):
+                os.remove(path)
         st.session_state.clear()
         st.info("Banco de dados, modelo salvo e sessão resetados.")
         st.rerun()
 
+# --- Acompanhamento dos jobs em segundo plano ---
+def apply_job_result(job):
+    """Copia o resultado de um job concluído para o estado da sessão."""
+    result = job["Result"] or {}
+    if job["Kind"] == "train":
+        st.session_state.metrics = result["metrics"]
+        st.session_state.importances = pd.DataFrame(result["importances"])
+        cv_results = result.get("cv_results")
+        st.session_state.cv_results = pd.DataFrame(cv_results) if cv_results is not None else None
+        st.session_state.target_variable = result["target"]
+        st.session_state.model_version = result["version"]
+        st.session_state.model_trained = True
+        st.session_state.predictions_made = False
+        st.success(f"Modelo treinado para prever '{result['target']}' e salvo com sucesso (versão {result['version']})!")
+    elif job["Kind"] == "predict":
+        st.session_state.prediction_df = load_predictions(result["version"])
+        st.session_state.predictions_made = True
+        st.success(f"Previsões geradas com o modelo {result['version']}.")
+
+@st.fragment(run_every="2s")
+def job_status_panel():
+    """Consulta o job da sessão periodicamente, sem reexecutar a página inteira."""
+    job_id = st.session_state.get("job_id")
+    if job_id is None:
+        return
+    job = get_runner().get(job_id)
+    if job is None:
+        st.session_state.job_id = None
+        return
+    if job["Status"] in ("pending", "running"):
+        st.progress(job["Progress"], text=f"Job {job['Kind']}: {job['Stage']}")
+        return
+    st.session_state.job_id = None
+    if job["Status"] == "done":
+        st.session_state.job_notice = ("success", job)
+    else:
+        st.session_state.job_notice = ("error", job)
+    # Atualiza as abas com o novo estado
+    st.rerun()
+
+job_status_panel()
+notice = st.session_state.pop("job_notice", None)
+if notice is not None:
+    kind, job = notice
+    if kind == "success":
+        apply_job_result(job)
+    elif job["Status"] == "interrupted":
+        st.warning(f"O job {job['Kind']} foi interrompido e não pôde ser retomado ({job['Error']}). Execute novamente.")
+    else:
+        st.error(f"Erro no job {job['Kind']}: {job['Error']}")
+
 # --- Abas Principais ---
-tab_overview, tab_train, tab_analytics, tab_chat = st.tabs([
-    "📊 Visão Geral", "🤖 Resultados do Treino", "📈 Analytics", "💬 Chat com o Modelo"
+tab_overview, tab_train, tab_analytics, tab_chat, tab_diagnostics = st.tabs([
+    "📊 Visão Geral", "🤖 Resultados do Treino", "📈 Analytics", "💬 Chat com o Modelo", "🩺 Diagnóstico"
 ])
 
 with tab_overview:
     st.header("Visão Geral dos Dados de Atividade")
     if "df_overview" in st.session_state and st.session_state.df_overview is not None:
-        df_overview = st.session_state.df_overview
+        overview = get_overview_summary(st.session_state.df_overview_key, st.session_state.df_overview)
         st.subheader("Preview do Dataset")
-        st.dataframe(df_overview.head())
+        st.dataframe(overview["head"])
 
         st.subheader("Estatísticas descritivas")
-        st.dataframe(df_overview.describe())
+        st.dataframe(overview["describe"])
 
         st.subheader("Informações do Dataset")
-        st.write(f"Formato: {df_overview.shape[0]} linhas × {df_overview.shape[1]} colunas")
-        if 'ActivityDate' in df_overview.columns:
-            st.write(f"Período: {df_overview['ActivityDate'].min()} até {df_overview['ActivityDate'].max()}")
+        st.write(f"Formato: {overview['shape'][0]} linhas × {overview['shape'][1]} colunas")
+        if overview["period"] is not None:
+            st.write(f"Período: {overview['period'][0]} até {overview['period'][1]}")
     else:
         st.info("Faça upload do arquivo DailyActivityMerged.csv ou treine um modelo para ver a visão geral.")
 
@@ -179,6 +260,23 @@ with tab_train:
         st.json(st.session_state.metrics)
         st.subheader("🔎 Importâncias das Variáveis")
         st.dataframe(st.session_state.importances.head(15), use_container_width=True)
+        if st.session_state.get("cv_results") is not None:
+            st.subheader("🧪 Validação cruzada por candidato")
+            st.dataframe(st.session_state.cv_results, use_container_width=True)
+
+    if st.session_state.predictions_made and st.session_state.prediction_df is not None:
+        st.subheader("🔮 Previsões em lote")
+        st.dataframe(st.session_state.prediction_df.head(50), use_container_width=True)
+        fingerprint = model_fingerprint(MODEL_PATH)
+        if fingerprint is not None:
+            try:
+                model, metadata = get_active_model(fingerprint)
+                sample = to_model_input(st.session_state.prediction_df.head(50))
+                contributions = explain_predictions(model, sample, version=metadata.get("version"))
+                st.subheader("🧩 Principais contribuições por previsão")
+                st.dataframe(top_contributions(contributions, k=3), use_container_width=True)
+            except Exception as e:
+                st.warning(f"Não foi possível explicar as previsões: {e}")
 
 
 
@@ -186,17 +284,54 @@ with tab_analytics:
     st.header("Análises e Estatísticas")
     if st.session_state.model_trained:
         try:
-            activity_summary = get_activity_summary()
-            daily_stats = get_daily_activity_stats()
+            # Em cache até o próximo ETL gravar no banco
+            summary = activity_summary()
+            daily_stats = daily_activity_stats()
             
             st.subheader("📋 Resumo das Atividades")
-            st.dataframe(activity_summary)
+            st.dataframe(summary)
             
             st.subheader("📈 Estatísticas Diárias")
             st.dataframe(daily_stats.head(10))
+
+            st.subheader("🏆 Usuários Mais Ativos")
+            st.dataframe(most_active_users(top_n=10), use_container_width=True)
+
+            # Histórico de um usuário: só as linhas dele saem do banco
+            st.subheader("👤 Histórico por Usuário")
+            user_id = st.selectbox("Usuário", list_user_ids())
+            if user_id is not None:
+                history = query_daily_activity(
+                    user_ids=[user_id],
+                    columns=["ActivityDate", "TotalSteps", "TotalActiveMinutes", "Calories", "ActivityLevel"],
+                )
+                st.line_chart(history.set_index("ActivityDate")[["TotalSteps", "Calories"]])
+                st.dataframe(history, use_container_width=True)
                 
         except Exception as e:
             st.warning(f"Não foi possível carregar análises: {e}")
+
+        # Exportação lida do banco em lotes, sem montar o CSV em memória
+        st.subheader("📥 Exportar Dados")
+        export_table = st.selectbox("Tabela", sorted(EXPORT_SOURCES), key="export_table")
+        export_cols = st.multiselect("Colunas (vazio = todas)", export_columns(export_table), key="export_cols")
+        export_period = st.date_input("Período (opcional)", value=(), key="export_period")
+        export_gzip = st.checkbox("Comprimir (gzip)", value=True, key="export_gzip")
+        if st.button("Preparar exportação"):
+            start_date, end_date = (export_period + (None, None))[:2] if export_period else (None, None)
+            try:
+                with st.spinner("Exportando..."):
+                    rows = prepare_export(export_table, export_cols or None, start_date, end_date, export_gzip)
+                st.success(f"{rows} linhas exportadas.")
+            except Exception as e:
+                st.error(f"Erro na exportação: {e}")
+        export_path = st.session_state.get("export_path")
+        if export_path and os.path.exists(export_path):
+            with open(export_path, "rb") as f:
+                st.download_button(
+                    "Baixar arquivo", f, file_name=os.path.basename(export_path),
+                    mime="application/gzip" if export_path.endswith(".gz") else "text/csv",
+                )
     else:
         st.info("Treine um modelo primeiro para ver as análises.")
 
@@ -215,6 +350,38 @@ with tab_chat:
                 task="Regressão",
                 metrics_df_or_dict=st.session_state.metrics,
                 importances_df=st.session_state.importances,
+                version=st.session_state.get("model_version"),
             )
             st.session_state.chat_messages.append({"role": "assistant", "content": response})
-            st.rerun()
\ No newline at end of file
+            st.rerun()
+
+with tab_diagnostics:
+    st.header("Diagnóstico de Desempenho")
+    try:
+        runs = recent_runs(limit=20)
+        if runs.empty:
+            st.info("Nenhuma execução instrumentada registrada ainda.")
+        else:
+            st.subheader("⏱️ Execuções recentes")
+            st.dataframe(runs.drop(columns=["RunId"]), use_container_width=True)
+            labels = {f"{r.StartedAt} · {r.Stage}": r.RunId for r in runs.itertuples()}
+            selected = st.selectbox("Estágios da execução", list(labels))
+            stages = run_stages(labels[selected])
+            st.dataframe(stages.drop(columns=["ProfileSummary"]), use_container_width=True)
+            profiles = stages["ProfileSummary"].dropna()
+            if not profiles.empty:
+                with st.expander("cProfile (FITBIT_PROFILE)"):
+                    st.code(profiles.iloc[0])
+            st.subheader("📊 Tempo por estágio")
+            st.dataframe(stage_summary(), use_container_width=True)
+        st.subheader("📉 Drift entre treino e previsão")
+        drift = get_drift_report()
+        if drift.empty:
+            st.info("Treine um modelo e gere previsões para comparar as distribuições.")
+        else:
+            st.caption("PSI nos decis do treino e KS pelos sketches do ETL (PSI >= 0,1 moderado, >= 0,25 alto).")
+            st.dataframe(drift, use_container_width=True)
+        st.subheader("🧵 Jobs recentes")
+        st.dataframe(get_runner().recent(), use_container_width=True)
+    except Exception as e:
+        st.warning(f"Não foi possível carregar o diagnóstico: {e}")
@@ -0,0 +1,111 @@
+"""
+Custo de importação (partida a frio) dos módulos do app.
+
+Importa os módulos num interpretador novo com `python -X importtime` e
+resume a saída: tempo total, os módulos mais caros (acumulado e próprio) e
+o custo por pacote de topo. Por padrão importa os módulos `core.*` que
+app/app.py importa no topo do script (o próprio app precisa do Streamlit e
+executa a página, então não é importado).
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --module core.jobs.tasks --top 30
+    python benchmarks/import_time.py --forbid sklearn,scipy   # falha se forem carregados
+    python benchmarks/import_time.py --json startup.json
+"""
+import argparse
+import ast
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT_DIR, "app", "app.py")
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def app_modules(app_path=APP_PATH):
+    """Módulos do projeto importados no nível de módulo de app/app.py."""
+    with open(app_path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom) and node.module and node.module.split(".")[0] == "core":
+            modules.append(node.module)
+        elif isinstance(node, ast.Import):
+            modules.extend(a.name for a in node.names if a.name.split(".")[0] == "core")
+    return list(dict.fromkeys(modules))
+
+
+def measure_imports(modules):
+    """
+    Importa `modules` num subprocesso com -X importtime e retorna
+    (segundos de parede, lista de dicts module/self_us/cumulative_us/depth).
+    """
+    code = "; ".join(f"import {m}" for m in modules) or "pass"
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT_DIR, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else "falha na importação")
+    entries = []
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            entries.append({
+                "module": m.group(4),
+                "self_us": int(m.group(1)),
+                "cumulative_us": int(m.group(2)),
+                "depth": len(m.group(3)) // 2,
+            })
+    return wall, entries
+
+
+def by_package(entries):
+    """Tempo próprio somado por pacote de topo (pandas, sklearn, core, ...), em ms."""
+    totals = defaultdict(int)
+    for e in entries:
+        totals[e["module"].split(".")[0]] += e["self_us"]
+    return {name: us / 1000 for name, us in sorted(totals.items(), key=lambda kv: -kv[1])}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mede o custo de importação dos módulos do app.")
+    parser.add_argument("--module", action="append", help="Módulo a importar (repetível). Padrão: os de app/app.py.")
+    parser.add_argument("--top", type=int, default=20, help="Quantos módulos listar.")
+    parser.add_argument("--forbid", default="", help="Pacotes que não podem ser carregados, separados por vírgula.")
+    parser.add_argument("--json", help="Grava o resultado completo neste arquivo.")
+    args = parser.parse_args(argv)
+
+    modules = args.module or app_modules()
+    wall, entries = measure_imports(modules)
+    packages = by_package(entries)
+    loaded = {e["module"].split(".")[0] for e in entries}
+
+    print(f"Módulos: {', '.join(modules)}")
+    print(f"Tempo total (interpretador + importações): {wall * 1000:.0f} ms")
+    print(f"\n{'acumulado (ms)':>15} {'próprio (ms)':>13}  módulo")
+    for e in sorted(entries, key=lambda e: -e["cumulative_us"])[:args.top]:
+        print(f"{e['cumulative_us'] / 1000:>15.1f} {e['self_us'] / 1000:>13.1f}  {e['module']}")
+    print(f"\n{'próprio (ms)':>13}  pacote")
+    for name, ms in list(packages.items())[:args.top]:
+        print(f"{ms:>13.1f}  {name}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"modules": modules, "wall_seconds": wall, "packages_ms": packages, "entries": entries}, f, indent=2)
+
+    forbidden = [p for p in args.forbid.split(",") if p.strip() and p.strip() in loaded]
+    if forbidden:
+        print(f"\nCarregados na partida, mas proibidos: {', '.join(forbidden)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
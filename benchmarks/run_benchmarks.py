@@ -0,0 +1,264 @@
+"""
+Benchmarks do pipeline em várias escalas, com dados sintéticos.
+
+Para cada escala (número de linhas) um subprocesso gera um CSV com
+core.data.synthetic, executa as etapas do pipeline (carga do CSV, carga
+da SOR, ETLs, leituras da SPEC, consultas de análise, treino, avaliação e
+pontuação) num banco temporário e mede latência, vazão (linhas/s) e pico de
+memória. O resultado vai para um JSON que pode ser comparado com o de outro
+commit:
+
+    python benchmarks/run_benchmarks.py --scales 10000,100000,1000000
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/anterior.json
+
+O pico de memória (peak_rss_mb) é o do processo ao fim da etapa; como as
+etapas rodam em sequência no mesmo subprocesso, peak_growth_mb mostra
+quanto cada uma elevou esse pico.
+"""
+import argparse
+import contextlib
+import json
+import os
+import pickle
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+RESULTS_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
+DEFAULT_SCALES = "10000,100000,1000000"
+DEFAULT_DAYS = 180
+DEFAULT_TRAIN_MAX_ROWS = 1_000_000
+REGRESSION_THRESHOLD = 1.2
+
+
+def _measure(results, name, func, rows=None, repeat=1):
+    """Executa `func` `repeat` vezes e guarda latência, vazão e memória da etapa."""
+    from core.monitoring.timing import peak_rss_mb
+
+    peak_before = peak_rss_mb()
+    timings = []
+    value = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = func()
+        timings.append(time.perf_counter() - start)
+    peak_after = peak_rss_mb()
+    seconds = statistics.median(timings)
+    results.append({
+        "stage": name,
+        "seconds": seconds,
+        "seconds_all": timings,
+        "rows": rows,
+        "rows_per_second": rows / seconds if rows and seconds > 0 else None,
+        "peak_rss_mb": peak_after,
+        "peak_growth_mb": peak_after - peak_before if peak_after is not None else None,
+    })
+    print(f"  {name}: {seconds:.3f}s" + (f" ({rows / seconds:,.0f} linhas/s)" if rows and seconds > 0 else ""),
+          file=sys.stderr)
+    return value
+
+
+def run_scale(n_rows, n_days, workdir, train_max_rows, repeat, epochs, seed):
+    """
+    Executa as etapas para uma escala. Deve rodar num processo cujo
+    FITBIT_DB_PATH/FITBIT_RUNTIME_DB_PATH apontem para `workdir`.
+    """
+    from core.data.database import (
+        SNAPSHOT_DIR, create_database_and_tables, get_activity_summary, get_daily_activity_stats,
+        insert_csv_to_sor_streaming, load_data, run_etl_for_predict_data, run_etl_sor_to_sot,
+        run_etl_sot_to_spec_train,
+    )
+    from core.data.io import load_daily_activity
+    from core.data.schema import to_model_input
+    from core.data.snapshot import remove_snapshots
+    from core.data.synthetic import write_daily_activity_csv
+    from core.features.preprocess import make_preprocess_pipeline
+    from core.models.incremental import train_regressor_incremental
+    from core.models.predict import evaluate_regressor
+    from core.models.scoring import score_predict_table
+    from core.models.train import train_regressor
+
+    n_users = max(1, n_rows // n_days)
+    n_rows = n_users * n_days
+    csv_path = os.path.join(workdir, "dailyActivity_synthetic.csv")
+    model_path = os.path.join(workdir, "model", "regressor_model.pickle")
+    stages, skipped = [], []
+
+    _measure(stages, "generate_csv", lambda: write_daily_activity_csv(csv_path, n_users, n_days, seed=seed), n_rows)
+    df = _measure(stages, "load_daily_activity", lambda: load_daily_activity(csv_path), n_rows)
+
+    create_database_and_tables()
+    _measure(stages, "insert_csv_to_sor_streaming", lambda: insert_csv_to_sor_streaming(csv_path), n_rows)
+    _measure(stages, "run_etl_sor_to_sot", run_etl_sor_to_sot, n_rows)
+    _measure(stages, "run_etl_sot_to_spec_train", run_etl_sot_to_spec_train, n_rows)
+
+    def load_from_sql():
+        remove_snapshots(SNAPSHOT_DIR)
+        return load_data("spec_daily_activity_train")
+
+    _measure(stages, "load_data_sql", load_from_sql, n_rows, repeat)
+    df_spec = _measure(stages, "load_data_snapshot", lambda: load_data("spec_daily_activity_train"), n_rows, repeat)
+    _measure(stages, "get_activity_summary", get_activity_summary, n_rows, repeat)
+    _measure(stages, "get_daily_activity_stats", get_daily_activity_stats, n_rows, repeat)
+
+    model = None
+    if n_rows <= train_max_rows:
+        df_spec = to_model_input(df_spec)
+        y = df_spec["Calories"]
+        X = df_spec.drop(columns=["Calories"])
+        model, X_test, y_test = _measure(
+            stages, "train_regressor", lambda: train_regressor(X, y, make_preprocess_pipeline(X)), n_rows
+        )
+        _measure(stages, "evaluate_regressor", lambda: evaluate_regressor(model, X_test, y_test), len(X_test))
+    else:
+        skipped.append({"stage": "train_regressor", "reason": f"acima de --train-max-rows ({train_max_rows})"})
+    del df_spec
+
+    incremental_model, _ = _measure(
+        stages, "train_regressor_incremental", lambda: train_regressor_incremental(n_epochs=epochs), n_rows
+    )
+
+    # Gravado direto (sem o registro) para não criar versões em model/versions
+    os.makedirs(os.path.dirname(model_path), exist_ok=True)
+    with open(model_path, "wb") as f:
+        pickle.dump(model or incremental_model, f)
+    _measure(stages, "run_etl_for_predict_data", lambda: run_etl_for_predict_data(df), n_rows)
+    _measure(stages, "score_predict_table", lambda: score_predict_table(model_path), n_rows)
+
+    return {"rows": n_rows, "n_users": n_users, "n_days": n_days, "stages": stages, "skipped": skipped}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _environment():
+    import numpy as np
+    import pandas as pd
+    import sklearn
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "scikit-learn": sklearn.__version__,
+    }
+
+
+def _run_worker(n_rows, args):
+    """Executa run_scale num subprocesso com banco e snapshot temporários."""
+    workdir = tempfile.mkdtemp(prefix=f"fitbit_bench_{n_rows}_")
+    env = dict(
+        os.environ,
+        FITBIT_DB_PATH=os.path.join(workdir, "fitness_tracker.db"),
+        FITBIT_RUNTIME_DB_PATH=os.path.join(workdir, "fitness_runtime.db"),
+    )
+    env.pop("FITBIT_PROFILE", None)
+    cmd = [
+        sys.executable, os.path.abspath(__file__), "--worker",
+        "--rows", str(n_rows), "--days", str(args.days), "--workdir", workdir,
+        "--train-max-rows", str(args.train_max_rows), "--repeat", str(args.repeat),
+        "--epochs", str(args.epochs), "--seed", str(args.seed),
+    ]
+    try:
+        proc = subprocess.run(cmd, env=env, stdout=subprocess.PIPE, text=True)
+        if proc.returncode != 0:
+            return {"rows": n_rows, "error": f"subprocesso terminou com código {proc.returncode}"}
+        return json.loads(proc.stdout.strip().splitlines()[-1])
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def compare(current, previous, threshold=REGRESSION_THRESHOLD):
+    """Compara dois resultados por (linhas, etapa); retorna as regressões acima de `threshold`."""
+    old = {
+        (scale["rows"], s["stage"]): s["seconds"]
+        for scale in previous.get("results", []) for s in scale.get("stages", [])
+    }
+    regressions = []
+    print(f"{'linhas':>10}  {'etapa':<30} {'antes (s)':>10} {'agora (s)':>10} {'razão':>7}")
+    for scale in current["results"]:
+        for s in scale.get("stages", []):
+            before = old.get((scale["rows"], s["stage"]))
+            if before is None:
+                continue
+            ratio = s["seconds"] / before if before > 0 else float("inf")
+            flag = "  <-- regressão" if ratio > threshold else ""
+            print(f"{scale['rows']:>10}  {s['stage']:<30} {before:>10.3f} {s['seconds']:>10.3f} {ratio:>7.2f}{flag}")
+            if ratio > threshold:
+                regressions.append({"rows": scale["rows"], "stage": s["stage"], "ratio": ratio})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do pipeline com dados sintéticos.")
+    parser.add_argument("--scales", default=DEFAULT_SCALES, help="Linhas por execução, separadas por vírgula.")
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS, help="Dias por usuário nos dados sintéticos.")
+    parser.add_argument("--train-max-rows", type=int, default=DEFAULT_TRAIN_MAX_ROWS,
+                        help="Acima disso o treino em memória é pulado (o incremental sempre roda).")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetições das leituras e consultas (mediana).")
+    parser.add_argument("--epochs", type=int, default=1, help="Épocas do treino incremental.")
+    parser.add_argument("--seed", type=int, default=42, help="Semente do gerador sintético.")
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: benchmarks/results/<data>_<commit>.json).")
+    parser.add_argument("--compare", help="JSON de uma execução anterior para comparar.")
+    parser.add_argument("--keep", action="store_true", help="Mantém os diretórios temporários.")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--rows", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        # Os prints do pipeline vão para stderr; o stdout leva só o JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            result = run_scale(args.rows, args.days, args.workdir, args.train_max_rows, args.repeat, args.epochs, args.seed)
+        print(json.dumps(result))
+        return
+
+    scales = [int(float(s)) for s in args.scales.split(",") if s.strip()]
+    commit = _git_commit()
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "environment": _environment(),
+        "config": {
+            "scales": scales, "days": args.days, "train_max_rows": args.train_max_rows,
+            "repeat": args.repeat, "epochs": args.epochs, "seed": args.seed,
+        },
+        "results": [],
+    }
+    for n_rows in scales:
+        print(f"Escala {n_rows} linhas...", file=sys.stderr)
+        report["results"].append(_run_worker(n_rows, args))
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{commit or 'sem-commit'}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Resultados salvos em {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
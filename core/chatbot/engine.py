@@ -0,0 +1,182 @@
+"""
+Motor de intenções do chatbot.
+
+As intenções são declaradas como dados (radicais sem acento, requisitos
+adicionais e modelo de resposta) e compiladas uma única vez em uma regex
+combinada, com um grupo nomeado por intenção. As respostas que dependem do
+modelo (métricas e variáveis mais importantes) são montadas uma vez por
+versão de modelo; responder uma pergunta é normalizar o texto, uma busca
+na regex e uma consulta ao dicionário de respostas.
+"""
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+# Em ordem de prioridade: quando a pergunta casa com mais de uma intenção,
+# vale a primeira da lista. Os radicais são comparados sem acentos e em
+# minúsculas, como substrings; "requires" exige também um desses radicais
+# em qualquer ponto da pergunta.
+INTENTS = [
+    {
+        "name": "importance",
+        "stems": ["importan", "variave", "features"],
+        "template": "No modelo de {task}, as variáveis mais influentes foram: {top_features}. (Com base nos coeficientes do modelo)",
+        "fallback": "Ainda não tenho dados de importância das variáveis para mostrar.",
+        "needs": "top_features",
+    },
+    {
+        "name": "metrics",
+        "stems": ["metric", "score", "acur", "rmse", "erro"],
+        "template": "As métricas do modelo de {task} foram: {metrics}",
+    },
+    {
+        "name": "pipeline",
+        "stems": ["como foi treinado", "pipeline", "treinament"],
+        "template": (
+            "O pipeline aplicado neste projeto inclui:\n"
+            "- Tratamento de valores ausentes (imputação)\n"
+            "- Codificação one-hot para variáveis categóricas\n"
+            "- Padronização dos dados numéricos\n"
+            "- Treinamento usando um modelo de Regressão Linear para prever calorias gastas"
+        ),
+    },
+    {
+        "name": "privacy",
+        "stems": ["privacid", "lgpd", "dados sensivei"],
+        "template": (
+            "O dataset do Fitbit não contém dados pessoais identificáveis. "
+            "Em um ambiente real, seguiríamos a LGPD, garantindo consentimento expresso, "
+            "minimização de dados e rastreabilidade de acessos."
+        ),
+    },
+    {
+        "name": "active_users",
+        "stems": ["usuario"],
+        "requires": ["ativo"],
+        "template": (
+            "Os usuários mais ativos foram identificados com base nos maiores valores de "
+            "TotalSteps e VeryActiveMinutes. Em geral, esses usuários também apresentam "
+            "maior gasto calórico médio."
+        ),
+    },
+    {
+        "name": "calories",
+        "stems": ["caloria", "gasto energet"],
+        "template": (
+            "O gasto calórico no Fitbit é fortemente influenciado pelos minutos em atividade "
+            "muito intensa (VeryActiveMinutes), pela quantidade total de passos (TotalSteps) "
+            "e pela distância percorrida (TotalDistance)."
+        ),
+    },
+]
+
+FALLBACK = "Desculpe, não entendi. Você pode perguntar sobre variáveis importantes, métricas, pipeline ou usuários mais ativos."
+
+TOP_FEATURES = 5
+
+
+def normalize(text):
+    """Minúsculas e sem acentos ("Métricas" -> "metricas")."""
+    decomposed = unicodedata.normalize("NFKD", (text or "").lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def compile_intents(intents):
+    """
+    Compila as intenções em (regex combinada, prioridade por grupo,
+    regex de requisito por grupo). Os grupos se chamam i0, i1, ... na
+    ordem de prioridade.
+    """
+    alternatives = []
+    priority = {}
+    requires = {}
+    for i, intent in enumerate(intents):
+        group = f"i{i}"
+        stems = sorted((normalize(s) for s in intent["stems"]), key=len, reverse=True)
+        alternatives.append(f"(?P<{group}>{'|'.join(re.escape(s) for s in stems)})")
+        priority[group] = i
+        if intent.get("requires"):
+            requires[group] = re.compile("|".join(re.escape(normalize(s)) for s in intent["requires"]))
+    return re.compile("|".join(alternatives)), priority, requires
+
+
+_PATTERN, _PRIORITY, _REQUIRES = compile_intents(INTENTS)
+
+
+def match_intent(question):
+    """Nome da intenção de maior prioridade presente na pergunta, ou None."""
+    q = normalize(question)
+    best = None
+    for m in _PATTERN.finditer(q):
+        group = m.lastgroup
+        rank = _PRIORITY[group]
+        if best is not None and rank >= best:
+            continue
+        if group in _REQUIRES and not _REQUIRES[group].search(q):
+            continue
+        best = rank
+        if best == 0:
+            break
+    return INTENTS[best]["name"] if best is not None else None
+
+
+def _fragments(metrics, importances):
+    fragments = {"metrics": metrics}
+    if importances is not None and not importances.empty:
+        fragments["top_features"] = ", ".join(importances["feature"].head(TOP_FEATURES).astype(str))
+    return fragments
+
+
+def render_answers(task, metrics, importances):
+    """Resposta pronta de cada intenção para um modelo (intenção -> texto)."""
+    fragments = dict(_fragments(metrics, importances), task=task)
+    answers = {}
+    for intent in INTENTS:
+        needs = intent.get("needs")
+        if needs and needs not in fragments:
+            answers[intent["name"]] = intent["fallback"]
+        else:
+            answers[intent["name"]] = intent["template"].format(**fragments)
+    return answers
+
+
+# Respostas por (versão do modelo, tarefa), com no máximo ANSWERS_CACHE_SIZE
+# entradas (as usadas há mais tempo saem primeiro): cada treino gera uma
+# versão nova e o cache não pode crescer sem limite.
+ANSWERS_CACHE_SIZE = 16
+_answers_cache = OrderedDict()
+_answers_lock = threading.Lock()
+
+
+def answers_for_model(task, metrics, importances, version=None):
+    """
+    Respostas de render_answers, montadas uma vez por (versão do modelo,
+    tarefa). Sem `version` são montadas a cada chamada.
+    """
+    if version is None:
+        return render_answers(task, metrics, importances)
+    key = (version, task)
+    with _answers_lock:
+        answers = _answers_cache.get(key)
+        if answers is not None:
+            _answers_cache.move_to_end(key)
+            return answers
+    answers = render_answers(task, metrics, importances)
+    with _answers_lock:
+        _answers_cache[key] = answers
+        _answers_cache.move_to_end(key)
+        while len(_answers_cache) > ANSWERS_CACHE_SIZE:
+            _answers_cache.popitem(last=False)
+    return answers
+
+
+def answer(question, answers):
+    """Responde uma pergunta com as respostas já montadas para o modelo."""
+    intent = match_intent(question)
+    return answers[intent] if intent is not None else FALLBACK
+
+
+def answer_batch(questions, answers):
+    """Responde uma sequência de perguntas (ex.: reprocessar um log de chat)."""
+    return [answer(q, answers) for q in questions]
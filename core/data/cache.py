@@ -0,0 +1,66 @@
+import functools
+import hashlib
+import threading
+
+import pandas as pd
+
+from core.data.database import data_version, get_activity_summary, get_daily_activity_stats
+from core.data.query import top_active_users
+
+
+def frame_fingerprint(df):
+    """Hash do conteúdo de um DataFrame (colunas, tipos e valores)."""
+    digest = hashlib.sha256()
+    digest.update(repr(list(zip(map(str, df.columns), map(str, df.dtypes)))).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def cached_by_data_version(func):
+    """
+    Memoriza `func` por processo enquanto data_version() não mudar.
+
+    O resultado é compartilhado entre reruns e sessões do Streamlit (todas
+    rodam no mesmo processo), então não deve ser alterado por quem o recebe.
+    As funções de ETL chamam bump_data_version() após gravar, o que invalida
+    todas as entradas de uma vez.
+    """
+    entries = {}
+    lock = threading.Lock()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        version = data_version()
+        key = (args, tuple(sorted(kwargs.items())))
+        with lock:
+            cached = entries.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        value = func(*args, **kwargs)
+        with lock:
+            # Entradas de versões anteriores não servem mais
+            for stale in [k for k, (v, _) in entries.items() if v != version]:
+                del entries[stale]
+            entries[key] = (version, value)
+        return value
+
+    wrapper.cache_clear = entries.clear
+    return wrapper
+
+
+activity_summary = cached_by_data_version(get_activity_summary)
+daily_activity_stats = cached_by_data_version(get_daily_activity_stats)
+most_active_users = cached_by_data_version(top_active_users)
+
+
+def describe_frame(df):
+    """Pré-visualização e estatísticas descritivas usadas pela Visão Geral."""
+    summary = {
+        "head": df.head(),
+        "describe": df.describe(),
+        "shape": df.shape,
+        "period": None,
+    }
+    if "ActivityDate" in df.columns:
+        summary["period"] = (df["ActivityDate"].min(), df["ActivityDate"].max())
+    return summary
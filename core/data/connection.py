@@ -0,0 +1,156 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Pragmas aplicados a toda conexão nova.
+# WAL permite que leitores (dashboard) não bloqueiem durante as escritas do ETL.
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -64000,        # em KiB (~64 MB)
+    "mmap_size": 268435456,      # 256 MB de I/O mapeado em memória
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,        # ms
+}
+
+
+class ConnectionManager:
+    """
+    Pool de conexões SQLite para um arquivo de banco, seguro entre threads.
+
+    As conexões ociosas são reaproveitadas entre chamadas (e entre as threads
+    de sessões do Streamlit); cada conexão é usada por uma thread de cada vez.
+    Chamadas aninhadas na mesma thread reutilizam a conexão já em uso, de
+    modo que funções do ETL podem compartilhar uma única transação.
+    """
+
+    def __init__(self, path, pragmas=None, max_idle=8):
+        self.path = path
+        self.pragmas = dict(PRAGMAS if pragmas is None else pragmas)
+        self._idle = queue.LifoQueue(maxsize=max_idle)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def _acquire(self):
+        while True:
+            try:
+                generation, conn = self._idle.get_nowait()
+            except queue.Empty:
+                return self._generation, self._open()
+            if generation == self._generation:
+                return generation, conn
+            conn.close()
+
+    def _release(self, generation, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        if generation != self._generation:
+            conn.close()
+            return
+        try:
+            self._idle.put_nowait((generation, conn))
+        except queue.Full:
+            conn.close()
+
+    @contextmanager
+    def connection(self):
+        """Empresta uma conexão do pool (não faz commit automático)."""
+        active = getattr(self._local, "active", None)
+        if active is not None:
+            self._local.depth += 1
+            try:
+                yield active[1]
+            finally:
+                self._local.depth -= 1
+            return
+
+        generation, conn = self._acquire()
+        self._local.active = (generation, conn)
+        self._local.depth = 1
+        try:
+            yield conn
+        finally:
+            self._local.active = None
+            self._local.depth = 0
+            self._release(generation, conn)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Empresta uma conexão e faz commit ao final (ou rollback em caso de erro).
+        Em chamadas aninhadas, apenas a transação mais externa faz commit.
+        """
+        with self.connection() as conn:
+            outermost = self._local.depth == 1
+            self._local.transactions = getattr(self._local, "transactions", 0) + 1
+            try:
+                yield conn
+            except Exception:
+                if outermost:
+                    conn.rollback()
+                raise
+            finally:
+                self._local.transactions -= 1
+            if outermost:
+                conn.commit()
+
+    def in_transaction(self):
+        """True se a thread atual está dentro de transaction() ou tem gravações pendentes."""
+        if getattr(self._local, "transactions", 0):
+            return True
+        active = getattr(self._local, "active", None)
+        return active is not None and active[1].in_transaction
+
+    def executescript(self, script):
+        """
+        Executa um script SQL (vários comandos) numa conexão do pool.
+
+        sqlite3 faz commit de qualquer transação aberta antes de executar o
+        script, então ele é recusado dentro de transaction() ou com gravações
+        pendentes na conexão: terminaria a transação externa antes da hora.
+        Se o script falhar no meio de um BEGIN, a transação dele é desfeita.
+        """
+        if self.in_transaction():
+            raise RuntimeError("executescript não pode rodar dentro de uma transação aberta.")
+        with self.connection() as conn:
+            try:
+                conn.executescript(script)
+            except Exception:
+                if conn.in_transaction:
+                    conn.rollback()
+                raise
+
+    def close_all(self):
+        """
+        Fecha as conexões ociosas e invalida as que estão em uso, que serão
+        fechadas ao serem devolvidas. Necessário antes de apagar o arquivo.
+        """
+        with self._lock:
+            self._generation += 1
+        while True:
+            try:
+                _, conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_manager(path):
+    """Retorna o gerenciador de conexões compartilhado para um arquivo de banco."""
+    with _managers_lock:
+        manager = _managers.get(path)
+        if manager is None:
+            manager = _managers[path] = ConnectionManager(path)
+        return manager
@@ -1,205 +1,737 @@
+import argparse
 import sqlite3
 import pandas as pd
 import os
 from datetime import datetime
 
+from core.data.connection import PRAGMAS, get_manager
+from core.data.dates import format_activity_dates, parse_activity_dates
+from core.data.io import iter_daily_activity_chunks, DEFAULT_CHUNKSIZE
+from core.data.schema import COLUMN_TYPES, apply_schema, memory_report, to_storage
+from core.data.snapshot import read_snapshot, remove_snapshots, write_snapshot
+from core.features.transform import ActivityFeatureTransformer, FILL_COLUMNS
+from core.features.store import (
+    MODEL_FEATURE_COLUMNS, compute_batch_features, rebuild_feature_store, update_feature_store,
+)
+from core.monitoring.drift import drift_report, rebuild_table_sketches, update_table_sketches
+from core.monitoring.timing import timed
+
 # Pega o caminho absoluto do diretório onde este arquivo (database.py) está.
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 SQL_DIR = os.path.join(CURRENT_DIR, "sql")
 APP_DIR = os.path.dirname(os.path.dirname(CURRENT_DIR))
-DB_NAME = os.path.join(APP_DIR, "fitness_tracker.db")
+DB_NAME = os.environ.get("FITBIT_DB_PATH", os.path.join(APP_DIR, "fitness_tracker.db"))
+# Banco de execução (fila de jobs etc.): separado porque o backfill apaga DB_NAME
+RUNTIME_DB_NAME = os.environ.get("FITBIT_RUNTIME_DB_PATH", os.path.join(APP_DIR, "fitness_runtime.db"))
+# Snapshot colunar (.npy por coluna) das tabelas SPEC, ao lado do banco
+SNAPSHOT_DIR = os.path.splitext(DB_NAME)[0] + "_snapshot"
+SNAPSHOT_TABLES = ("spec_daily_activity_train", "spec_daily_activity_predict")
+
+SOR_COLUMNS = [
+    'Id', 'ActivityDate', 'TotalSteps', 'TotalDistance', 'TrackerDistance',
+    'LoggedActivitiesDistance', 'VeryActiveDistance', 'ModeratelyActiveDistance',
+    'LightActiveDistance', 'SedentaryActiveDistance', 'VeryActiveMinutes',
+    'FairlyActiveMinutes', 'LightlyActiveMinutes', 'SedentaryMinutes', 'Calories'
+]
+
+SPEC_COLUMNS = [
+    'ActivityDate', 'TotalSteps', 'TotalDistance', 'TrackerDistance',
+    'VeryActiveMinutes', 'FairlyActiveMinutes', 'LightlyActiveMinutes',
+    'SedentaryMinutes', 'Calories', 'TotalActiveMinutes', 'ActivityRatio',
+    'CaloriesPerStep', 'ActivityLevel'
+] + MODEL_FEATURE_COLUMNS
+
+SOT_COLUMNS = SOR_COLUMNS + ['TotalActiveMinutes', 'ActivityRatio', 'CaloriesPerStep', 'ActivityLevel']
 
 def connect_db():
-    """Cria uma conexão com o banco de dados SQLite."""
-    return sqlite3.connect(DB_NAME)
+    """Cria uma conexão avulsa com o banco de dados SQLite (com os pragmas padrão)."""
+    conn = sqlite3.connect(DB_NAME)
+    for name, value in PRAGMAS.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+def db_connection():
+    """Context manager que empresta uma conexão do pool compartilhado."""
+    return get_manager(DB_NAME).connection()
+
+def db_transaction():
+    """Context manager com conexão do pool e commit/rollback automático."""
+    return get_manager(DB_NAME).transaction()
+
+def runtime_connection():
+    """Conexão do pool do banco de execução (RUNTIME_DB_NAME)."""
+    return get_manager(RUNTIME_DB_NAME).connection()
+
+def runtime_transaction():
+    """Transação no banco de execução (RUNTIME_DB_NAME)."""
+    return get_manager(RUNTIME_DB_NAME).transaction()
+
+RUNTIME_SCHEMA_FILES = [
+    "jobs.sql",
+    "data_version.sql",
+    "stage_metrics.sql",
+]
+
+_runtime_ready = False
+
+def ensure_runtime_tables():
+    """Cria as tabelas do banco de execução (uma vez por processo)."""
+    global _runtime_ready
+    if _runtime_ready:
+        return
+    for filename in RUNTIME_SCHEMA_FILES:
+        with open(os.path.join(SQL_DIR, filename), 'r') as f:
+            get_manager(RUNTIME_DB_NAME).executescript(f.read())
+    _runtime_ready = True
+
+def etl_version():
+    """
+    Contador de gravações do ETL (guardado no banco de execução, visível
+    para outros processos), incrementado por bump_data_version().
+    """
+    ensure_runtime_tables()
+    with runtime_connection() as conn:
+        row = conn.execute("SELECT Version, UpdatedAt FROM data_versions WHERE DbPath = ?", (DB_NAME,)).fetchone()
+    version, updated_at = row if row else (0, "")
+    return f"{version}@{updated_at}"
+
+def data_version():
+    """
+    Token que muda sempre que os dados do banco mudam, para chaves de cache.
+
+    Combina etl_version() com mtime/tamanho do arquivo do banco e do WAL,
+    que pegam gravações feitas por fora das funções de ETL.
+    """
+    stats = []
+    for path in (DB_NAME, DB_NAME + "-wal"):
+        try:
+            stat = os.stat(path)
+            stats.append(f"{stat.st_mtime_ns}.{stat.st_size}")
+        except FileNotFoundError:
+            stats.append("-")
+    return f"{etl_version()}|{'|'.join(stats)}"
+
+def bump_data_version():
+    """
+    Invalida os caches ligados a data_version(). Chamar após o commit da
+    gravação: dentro de uma transação do banco principal, um leitor poderia
+    guardar em cache, sob a versão nova, dados ainda sem as alterações.
+    """
+    if get_manager(DB_NAME).in_transaction():
+        raise RuntimeError("bump_data_version() chamada antes do commit da transação.")
+    ensure_runtime_tables()
+    with runtime_transaction() as conn:
+        conn.execute("""
+            INSERT INTO data_versions (DbPath, Version, UpdatedAt) VALUES (?, 1, ?)
+            ON CONFLICT(DbPath) DO UPDATE SET Version = Version + 1, UpdatedAt = excluded.UpdatedAt
+        """, (DB_NAME, datetime.now().isoformat(timespec='microseconds')))
+
+def _remove_database_files():
+    """Fecha as conexões do pool e apaga o banco, seus arquivos WAL e os snapshots."""
+    get_manager(DB_NAME).close_all()
+    remove_snapshots(SNAPSHOT_DIR)
+    _sor_dates_checked.discard(DB_NAME)
+    removed = False
+    for path in (DB_NAME, DB_NAME + "-wal", DB_NAME + "-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+            removed = removed or path == DB_NAME
+    return removed
 
 def execute_sql_from_file(filepath):
-    """Lê um arquivo .sql e executa os comandos."""
-    conn = connect_db()
-    cursor = conn.cursor()
+    """
+    Lê um arquivo .sql e executa os comandos. Não pode ser chamada dentro de
+    db_transaction(): executescript faria commit da transação aberta.
+    """
     with open(filepath, 'r') as f:
         sql_script = f.read()
-    cursor.executescript(sql_script)
-    conn.commit()
-    conn.close()
+    get_manager(DB_NAME).executescript(sql_script)
 
-def create_database_and_tables():
-    """Cria o banco de dados e todas as tabelas a partir dos arquivos .sql."""
-    if os.path.exists(DB_NAME):
-        os.remove(DB_NAME)
-    
-    sql_files = [
-        os.path.join(SQL_DIR, "sor_daily_activity.sql"),
-        os.path.join(SQL_DIR, "sot_daily_activity.sql"),
-        os.path.join(SQL_DIR, "spec_daily_activity_train.sql"),
-        os.path.join(SQL_DIR, "spec_daily_activity_predict.sql")
-    ]
-    for filepath in sql_files:
+SCHEMA_FILES = [
+    "sor_daily_activity.sql",
+    "sot_daily_activity.sql",
+    "spec_daily_activity_train.sql",
+    "spec_daily_activity_predict.sql",
+    "etl_watermark.sql",
+    "spec_daily_activity_aggregates.sql",
+    "spec_daily_activity_predictions.sql",
+    "feature_store_daily_activity.sql",
+    "monitoring_sketches.sql",
+]
+
+# Bancos cujas datas da SOR já foram verificadas neste processo
+_sor_dates_checked = set()
+
+def ensure_database_and_tables():
+    """Cria as tabelas e índices que ainda não existem, sem apagar o banco atual."""
+    for filename in SCHEMA_FILES:
+        filepath = os.path.join(SQL_DIR, filename)
         if not os.path.exists(filepath):
             raise FileNotFoundError(f"Arquivo SQL não encontrado: {filepath}")
         execute_sql_from_file(filepath)
+    if DB_NAME not in _sor_dates_checked:
+        _normalize_sor_dates()
+        _sor_dates_checked.add(DB_NAME)
+    _ensure_spec_feature_columns()
+    _ensure_indexes()
+
+def _ensure_spec_feature_columns():
+    """
+    Acrescenta as features do usuário às SPEC criadas antes de elas
+    existirem; ficam vazias até o próximo ETL (o imputador usa a mediana).
+    """
+    with db_transaction() as conn:
+        for table in ("spec_daily_activity_train", "spec_daily_activity_predict"):
+            columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            for col in MODEL_FEATURE_COLUMNS:
+                if col not in columns:
+                    sql_type = "INTEGER" if COLUMN_TYPES[col].startswith("int") else "REAL"
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {col} {sql_type}")
+
+def _normalize_sor_dates():
+    """
+    Migra bancos gravados antes de a SOR guardar ActivityDate como
+    'YYYY-MM-DD': converte as datas em outros formatos e remove as linhas
+    cuja data não pode ser convertida. Se a data convertida já existe para o
+    mesmo Id (gravada pelo ETL incremental, mais recente), a linha antiga sai.
+    """
+    with db_transaction() as conn:
+        old = pd.read_sql_query(
+            "SELECT rowid AS SorRowId, Id, ActivityDate FROM sor_daily_activity "
+            "WHERE ActivityDate IS NULL OR ActivityDate NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'",
+            conn,
+        )
+        if old.empty:
+            return 0
+        old['IsoDate'] = format_activity_dates(old['ActivityDate'], source="sor_daily_activity")
+        invalid = old[old['IsoDate'].isna()]
+        valid = old[old['IsoDate'].notna()]
+        conn.executemany("DELETE FROM sor_daily_activity WHERE rowid = ?", _records(invalid[['SorRowId']]))
+        conn.executemany(
+            "DELETE FROM sor_daily_activity WHERE rowid = ? AND EXISTS ("
+            "SELECT 1 FROM sor_daily_activity WHERE Id = ? AND ActivityDate = ?)",
+            _records(valid[['SorRowId', 'Id', 'IsoDate']]),
+        )
+        # Duas datas antigas com a mesma forma ISO: vale a de rowid maior
+        conn.executemany(
+            "UPDATE OR REPLACE sor_daily_activity SET ActivityDate = ? WHERE rowid = ?",
+            _records(valid.sort_values('SorRowId')[['IsoDate', 'SorRowId']]),
+        )
+    print(f"SOR: {len(valid)} datas convertidas para YYYY-MM-DD e {len(invalid)} linhas sem data válida removidas.")
+    return len(old)
+
+def _ensure_indexes():
+    """
+    (Re)cria os índices das tabelas. Necessário após gravações com
+    to_sql(if_exists="replace"), que recriam a tabela sem índices.
+    """
+    try:
+        execute_sql_from_file(os.path.join(SQL_DIR, "indexes.sql"))
+    except sqlite3.IntegrityError as e:
+        raise ValueError(
+            "As tabelas SOR/SOT têm chaves (Id, ActivityDate) duplicadas; "
+            "execute a carga completa (backfill) para recriá-las."
+        ) from e
+
+def create_database_and_tables():
+    """Cria o banco de dados e todas as tabelas a partir dos arquivos .sql."""
+    _remove_database_files()
+    
+    ensure_database_and_tables()
+    bump_data_version()
     print("Banco de dados e tabelas criados com sucesso.")
 
+def _write_sor(conn, df):
+    """Grava linhas já normalizadas por _prepare_sor_frame (chave repetida: vale a última)."""
+    placeholders = ", ".join("?" for _ in SOR_COLUMNS)
+    conn.executemany(
+        f"INSERT OR REPLACE INTO sor_daily_activity ({', '.join(SOR_COLUMNS)}) VALUES ({placeholders})",
+        _records(df[SOR_COLUMNS]),
+    )
+
+@timed()
 def insert_csv_to_sor(df):
-    """Insere os dados de um DataFrame na tabela SOR."""
-    conn = connect_db()
-    # A tabela SOR é genérica, então apenas inserimos os dados de treino nela
-    df.to_sql("sor_daily_activity", conn, if_exists="replace", index=False)
-    conn.close()
+    """Insere os dados de um DataFrame na tabela SOR, substituindo o conteúdo anterior."""
+    ensure_database_and_tables()
+    df = _prepare_sor_frame(df)
+    with db_transaction() as conn:
+        conn.execute("DELETE FROM sor_daily_activity")
+        _write_sor(conn, df)
+    bump_data_version()
     print("Dados inseridos na tabela SOR.")
 
-def run_etl_sor_to_sot():
-    """Executa a transformação de SOR para SOT para os dados de atividade."""
-    conn = connect_db()
-    df = pd.read_sql_query("SELECT * FROM sor_daily_activity", conn)
+@timed()
+def insert_csv_to_sor_streaming(source, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Insere um CSV (caminho ou arquivo binário) na tabela SOR em blocos.
+    Todos os blocos são gravados numa única transação: em caso de erro nada
+    é persistido. Substitui o conteúdo anterior, como insert_csv_to_sor.
+
+    É a carga de arquivos grandes pela linha de comando
+    (`python -m core.data.database arquivo.csv --etl`); o app lê os uploads
+    em memória porque o mesmo DataFrame alimenta a Visão Geral e o job de
+    treino.
+    """
+    ensure_database_and_tables()
+
+    total_rows = 0
+    with db_transaction() as conn:
+        conn.execute("DELETE FROM sor_daily_activity")
+        for chunk in iter_daily_activity_chunks(source, chunksize=chunksize):
+            chunk = _prepare_sor_frame(chunk)
+            _write_sor(conn, chunk)
+            total_rows += len(chunk)
+    bump_data_version()
+    print(f"Dados inseridos na tabela SOR em blocos ({total_rows} linhas).")
+    return total_rows
+
+def _sot_means(conn):
+    """Médias atuais da SOT para as colunas preenchidas pelo transformador (NaN se vazia)."""
+    return pd.read_sql_query(
+        "SELECT " + ", ".join(f"AVG({c}) AS {c}" for c in FILL_COLUMNS) + " FROM sot_daily_activity", conn
+    ).iloc[0]
+
+@timed(rows=lambda transformer: transformer.n_seen_)
+def fit_feature_transformer():
+    """
+    Ajusta o ActivityFeatureTransformer com as estatísticas da SOT (médias
+    calculadas no SQLite), as mesmas usadas no ETL de treino.
+    """
+    with db_connection() as conn:
+        n_rows = conn.execute("SELECT COUNT(*) FROM sot_daily_activity").fetchone()[0]
+        means = _sot_means(conn)
+    transformer = ActivityFeatureTransformer().set_fill_values(means)
+    transformer.n_seen_ = int(n_rows)
+    return transformer
+
+def _etl_sor_to_sot_sql():
+    """
+    Script do ETL SOR -> SOT (sql/etl_sor_to_sot.sql) preenchido com as
+    definições do ActivityFeatureTransformer, para que as engines SQL e
+    pandas não mantenham cópias separadas das fórmulas.
+    """
+    derived = ActivityFeatureTransformer().derive_sql()
+    sep = ",\n        "
+    with open(os.path.join(SQL_DIR, "etl_sor_to_sot.sql"), 'r') as f:
+        template = f.read()
+    return template.format(
+        columns=", ".join(SOT_COLUMNS),
+        sor_columns=sep.join(SOR_COLUMNS),
+        derived=sep.join(f"{expr} AS {name}" for name, expr in derived.items()),
+        means=sep.join(f"AVG({c}) AS {c}" for c in FILL_COLUMNS),
+        filled=",\n    ".join(
+            f"COALESCE(b.{c}, m.{c})" if c in FILL_COLUMNS else f"b.{c}" for c in SOT_COLUMNS
+        ),
+    )
+
+@timed()
+def run_etl_sor_to_sot(engine="sql"):
+    """
+    Executa a transformação de SOR para SOT para os dados de atividade.
+
+    Com engine="sql" (padrão) a transformação roda como INSERT ... SELECT
+    dentro do SQLite (sql/etl_sor_to_sot.sql), sem carregar a tabela no
+    pandas, numa única transação. engine="pandas" mantém a implementação em
+    DataFrame. As duas engines usam as fórmulas do ActivityFeatureTransformer,
+    recebem as datas da SOR já normalizadas por _prepare_sor_frame e
+    produzem a mesma SOT.
+    """
+    if engine == "sql":
+        get_manager(DB_NAME).executescript(_etl_sor_to_sot_sql())
+        build_feature_store()
+        print("ETL de SOR para SOT concluído (SQL).")
+        return
+    if engine != "pandas":
+        raise ValueError(f"Engine de ETL desconhecida: {engine}")
+
+    with db_connection() as conn:
+        df = pd.read_sql_query("SELECT * FROM sor_daily_activity", conn)
 
     # Lógica de Transformação para dados de atividade física
-    # Converter datas para formato padrão - corrigido para aceitar múltiplos formatos
-    try:
-        # Primeiro tenta o formato ISO (2016-03-25 00:00:00)
-        df['ActivityDate'] = pd.to_datetime(df['ActivityDate'], format='%Y-%m-%d %H:%M:%S')
-    except ValueError:
-        try:
-            # Se falhar, tenta o formato ISO sem hora (2016-03-25)
-            df['ActivityDate'] = pd.to_datetime(df['ActivityDate'], format='%Y-%m-%d')
-        except ValueError:
-            try:
-                # Se falhar, tenta o formato americano (03/25/2016)
-                df['ActivityDate'] = pd.to_datetime(df['ActivityDate'], format='%m/%d/%Y')
-            except ValueError:
-                # Se todos falharem, deixa o pandas inferir automaticamente
-                df['ActivityDate'] = pd.to_datetime(df['ActivityDate'], errors='coerce')
+    # Converter datas para formato padrão (formato detectado por linha)
+    df['ActivityDate'] = parse_activity_dates(df['ActivityDate'], source="sor_daily_activity")
     
-    # Calcular métricas derivadas
-    df['TotalActiveMinutes'] = df['VeryActiveMinutes'] + df['FairlyActiveMinutes'] + df['LightlyActiveMinutes']
-    df['ActivityRatio'] = df['TotalActiveMinutes'] / df['SedentaryMinutes'].replace(0, 1)  # Evitar divisão por zero
-    df['CaloriesPerStep'] = df['Calories'] / df['TotalSteps'].replace(0, 1)
-    
-    # Criar categorias de atividade
-    df['ActivityLevel'] = pd.cut(df['TotalSteps'],
-                               bins=[0, 5000, 10000, float('inf')],
-                               labels=['Sedentary', 'Active', 'Very Active'])
-    
-    # Tratar valores ausentes (se houver)
-    numeric_cols = df.select_dtypes(include=['number']).columns
-    df[numeric_cols] = df[numeric_cols].fillna(df[numeric_cols].mean())
+    # Calcular métricas derivadas e tratar valores ausentes (médias da própria SOR)
+    df = ActivityFeatureTransformer().fit_transform(df)
     
     # Converter a data de volta para string para armazenamento no SQLite
     df['ActivityDate'] = df['ActivityDate'].dt.strftime('%Y-%m-%d')
     
-    # Inserir na SOT
-    df.to_sql("sot_daily_activity", conn, if_exists="replace", index=False)
-    conn.close()
+    # Inserir na SOT (datas que viraram a mesma chave: vale a última)
+    df = df.drop_duplicates(subset=['Id', 'ActivityDate'], keep='last')
+    with db_transaction() as conn:
+        df.to_sql("sot_daily_activity", conn, if_exists="replace", index=False)
+    ensure_database_and_tables()
+    build_feature_store()
     print("ETL de SOR para SOT concluído.")
 
+@timed()
+def build_feature_store():
+    """Recalcula a feature store por usuário a partir de toda a SOT."""
+    with db_transaction() as conn:
+        n_rows = rebuild_feature_store(conn)
+    bump_data_version()
+    print(f"Feature store recalculada ({n_rows} linhas).")
+
+@timed()
 def run_etl_sot_to_spec_train():
-    """Copia dados da SOT para a SPEC de treino."""
-    conn = connect_db()
-    df = pd.read_sql_query("SELECT * FROM sot_daily_activity", conn)
-    
-    # Selecionar colunas relevantes para análise
-    spec_cols = [
-        'ActivityDate', 'TotalSteps', 'TotalDistance', 'TrackerDistance',
-        'VeryActiveMinutes', 'FairlyActiveMinutes', 'LightlyActiveMinutes',
-        'SedentaryMinutes', 'Calories', 'TotalActiveMinutes', 'ActivityRatio',
-        'CaloriesPerStep', 'ActivityLevel'
-    ]
-    
-    df_spec = df[spec_cols]
-    df_spec.to_sql("spec_daily_activity_train", conn, if_exists="replace", index=False)
-    conn.close()
+    """Copia dados da SOT para a SPEC de treino (INSERT ... SELECT no SQLite)."""
+    execute_sql_from_file(os.path.join(SQL_DIR, "etl_sot_to_spec_train.sql"))
+    refresh_spec_aggregates()
+    with db_transaction() as conn:
+        rebuild_table_sketches(conn, "spec_daily_activity_train")
+    write_spec_snapshot("spec_daily_activity_train")
     print("ETL de SOT para SPEC (treino) concluído.")
 
-def run_etl_for_predict_data(df_predict):
-    """Executa o ETL para novos dados e salva na SPEC de previsão."""
-    conn = connect_db()
-    
+@timed()
+def refresh_spec_aggregates(dates=None):
+    """
+    Atualiza as tabelas agregadas da SPEC de treino usadas pela aba Analytics.
+
+    spec_daily_activity_daily guarda somas e contagens por dia; quando `dates`
+    é informado, apenas esses dias são recalculados. O resumo geral
+    (spec_daily_activity_summary) é derivado da tabela diária, cujo tamanho
+    depende do número de dias e não do número de registros.
+    """
+    with db_transaction() as conn:
+        _refresh_spec_aggregates(conn, dates)
+    bump_data_version()
+
+def _refresh_spec_aggregates(conn, dates=None):
+    """Corpo de refresh_spec_aggregates na transação de quem chama (sem commit)."""
+    daily_select = """
+        SELECT
+            ActivityDate,
+            COUNT(*),
+            SUM(TotalSteps), COUNT(TotalSteps),
+            SUM(Calories), COUNT(Calories),
+            SUM(TotalActiveMinutes), COUNT(TotalActiveMinutes),
+            SUM(ActivityRatio), COUNT(ActivityRatio)
+        FROM spec_daily_activity_train
+        {where}
+        GROUP BY ActivityDate
+    """
+    if dates is None:
+        conn.execute("DELETE FROM spec_daily_activity_daily")
+        conn.execute("INSERT INTO spec_daily_activity_daily " + daily_select.format(where=""))
+    else:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS refresh_dates (ActivityDate TEXT PRIMARY KEY)")
+        conn.execute("DELETE FROM refresh_dates")
+        conn.executemany("INSERT OR IGNORE INTO refresh_dates VALUES (?)", ((d,) for d in dates))
+        conn.execute("DELETE FROM spec_daily_activity_daily WHERE ActivityDate IN (SELECT ActivityDate FROM refresh_dates)")
+        conn.execute("INSERT INTO spec_daily_activity_daily " + daily_select.format(
+            where="WHERE ActivityDate IN (SELECT ActivityDate FROM refresh_dates)"
+        ))
+
+    conn.execute("DELETE FROM spec_daily_activity_summary")
+    conn.execute("""
+        INSERT INTO spec_daily_activity_summary
+        SELECT
+            COALESCE(SUM(RecordCount), 0),
+            MIN(ActivityDate),
+            MAX(ActivityDate),
+            SUM(DailySteps) * 1.0 / SUM(StepsCount),
+            SUM(DailyCalories) * 1.0 / SUM(CaloriesCount),
+            SUM(DailyActiveMinutes) * 1.0 / SUM(ActiveMinutesCount)
+        FROM spec_daily_activity_daily
+    """)
+
+def _sor_row_hash(df):
+    """
+    Hash por linha do conteúdo SOR, estável entre CSV e SQLite. Colunas
+    float32 no schema são arredondadas para float32: o mesmo valor pode
+    chegar lido do CSV (7.11) ou de um upload tipado (7.1100001...).
+    """
+    canonical = df[SOR_COLUMNS].copy()
+    numeric_cols = [c for c in SOR_COLUMNS if c != 'ActivityDate']
+    float32_cols = [c for c in numeric_cols if COLUMN_TYPES.get(c) == 'float32']
+    canonical[numeric_cols] = canonical[numeric_cols].astype('float64')
+    canonical[float32_cols] = canonical[float32_cols].astype('float32').astype('float64')
+    canonical['ActivityDate'] = canonical['ActivityDate'].astype('string')
+    # uint64 reinterpretado como int64 para caber num INTEGER do SQLite
+    return pd.util.hash_pandas_object(canonical, index=False).values.view('int64')
+
+def _prepare_sor_frame(df):
+    """
+    Normaliza um DataFrame de entrada para o layout da SOR. Usado por todas
+    as gravações na SOR, para que a chave (Id, ActivityDate) tenha sempre a
+    mesma forma: datas como 'YYYY-MM-DD'; linhas sem Id ou sem data válida
+    são descartadas.
+    """
+    df = to_storage(df.reindex(columns=SOR_COLUMNS))
+    df['ActivityDate'] = format_activity_dates(df['ActivityDate'])
+    n_rows = len(df)
+    df = df.dropna(subset=['Id', 'ActivityDate'])
+    if len(df) < n_rows:
+        print(f"SOR: {n_rows - len(df)} linhas sem Id ou sem data válida descartadas.")
+    df['Id'] = df['Id'].astype('int64')
+    # Se a mesma chave aparecer mais de uma vez, vale a última ocorrência
+    return df.drop_duplicates(subset=['Id', 'ActivityDate'], keep='last').reset_index(drop=True)
+
+def _upsert_sql(table, columns, key=('Id', 'ActivityDate')):
+    updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c not in key)
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)}) "
+        f"ON CONFLICT({', '.join(key)}) DO UPDATE SET {updates}"
+    )
+
+def _records(df):
+    """Linhas do DataFrame como tuplas Python (NaN -> NULL)."""
+    df = df.astype(object)
+    return df.where(df.notna(), None).itertuples(index=False, name=None)
+
+def rebuild_etl_watermark():
+    """
+    Recalcula a marca d'água do ETL a partir da SOR atual.
+    Deve ser chamada após a carga completa para que as cargas incrementais
+    seguintes reconheçam as linhas que já foram processadas.
+    """
+    with db_transaction() as conn:
+        conn.execute("DELETE FROM etl_watermark")
+        updated_at = datetime.now().isoformat(timespec='seconds')
+        for chunk in pd.read_sql_query(
+            f"SELECT {', '.join(SOR_COLUMNS)} FROM sor_daily_activity", conn, chunksize=DEFAULT_CHUNKSIZE
+        ):
+            chunk['ActivityDate'] = format_activity_dates(chunk['ActivityDate'], source="sor_daily_activity")
+            marks = pd.DataFrame({
+                'Id': chunk['Id'],
+                'ActivityDate': chunk['ActivityDate'],
+                'RowHash': _sor_row_hash(chunk),
+                'UpdatedAt': updated_at,
+            })
+            conn.executemany(
+                "INSERT OR REPLACE INTO etl_watermark (Id, ActivityDate, RowHash, UpdatedAt) VALUES (?, ?, ?, ?)",
+                _records(marks),
+            )
+    print("Marca d'água do ETL reconstruída.")
+
+@timed()
+def run_etl_incremental(df_new):
+    """
+    Executa o ETL SOR -> SOT -> SPEC (treino) apenas para as linhas novas
+    ou alteradas de `df_new`, sem recriar o banco.
+
+    Cada (Id, ActivityDate) tem uma marca d'água com o hash da linha já
+    processada; só as chaves sem marca ou com hash diferente são
+    transformadas e gravadas com upsert. Valores ausentes são preenchidos
+    com as médias atuais da SOT (ou do próprio lote, se a SOT estiver vazia).
+    Retorna o número de linhas processadas.
+    """
+    ensure_database_and_tables()
+    df = _prepare_sor_frame(df_new)
+    df['RowHash'] = _sor_row_hash(df)
+
+    with db_transaction() as conn:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS incoming_keys (Id INTEGER, ActivityDate TEXT, RowHash INTEGER)")
+        conn.execute("DELETE FROM incoming_keys")
+        conn.executemany(
+            "INSERT INTO incoming_keys (Id, ActivityDate, RowHash) VALUES (?, ?, ?)",
+            _records(df[['Id', 'ActivityDate', 'RowHash']]),
+        )
+        changed = pd.read_sql_query("""
+            SELECT i.Id, i.ActivityDate
+            FROM incoming_keys i
+            LEFT JOIN etl_watermark w ON w.Id = i.Id AND w.ActivityDate = i.ActivityDate
+            WHERE w.RowHash IS NULL OR w.RowHash != i.RowHash
+        """, conn)
+
+        if changed.empty:
+            print("ETL incremental: nenhuma linha nova ou alterada.")
+            return 0
+
+        df_changed = df.merge(changed, on=['Id', 'ActivityDate'])
+
+        # SOR
+        conn.executemany(_upsert_sql("sor_daily_activity", SOR_COLUMNS), _records(df_changed[SOR_COLUMNS]))
+
+        # SOT
+        transformer = ActivityFeatureTransformer().fit(df_changed[SOR_COLUMNS])
+        transformer.set_fill_values(_sot_means(conn))
+        df_sot = transformer.transform(df_changed[SOR_COLUMNS])
+        df_sot['ActivityLevel'] = df_sot['ActivityLevel'].astype(object)
+        conn.executemany(_upsert_sql("sot_daily_activity", SOT_COLUMNS), _records(df_sot[SOT_COLUMNS]))
+
+        # Feature store: só as janelas dos usuários afetados
+        update_feature_store(conn, df_changed[['Id', 'ActivityDate']])
+
+        # SPEC (treino): mesmo rowid da linha correspondente na SOT. Além das
+        # chaves alteradas, os dias seguintes dos mesmos usuários mudam de
+        # features (janelas e acumulados): regrava tudo a partir da data
+        # inicial de cada usuário, a mesma usada pela feature store.
+        cols = ", ".join(SPEC_COLUMNS)
+        changed_spec_rows = f"""
+            SELECT {", ".join("p." + c for c in SPEC_COLUMNS)}
+            FROM spec_daily_activity_train p
+            JOIN sot_daily_activity s ON s.rowid = p.rowid
+            JOIN feature_store_starts k ON k.Id = s.Id AND s.ActivityDate >= k.StartDate
+        """
+        replaced = pd.read_sql_query(changed_spec_rows, conn)
+        conn.execute(f"""
+            INSERT OR REPLACE INTO spec_daily_activity_train (rowid, {cols})
+            SELECT s.rowid, {", ".join(("f." if c in MODEL_FEATURE_COLUMNS else "s.") + c for c in SPEC_COLUMNS)}
+            FROM sot_daily_activity s
+            JOIN feature_store_starts k ON k.Id = s.Id AND s.ActivityDate >= k.StartDate
+            LEFT JOIN feature_store_daily_activity f ON f.Id = s.Id AND f.ActivityDate = s.ActivityDate
+        """)
+        # Sketches de drift: tira as linhas substituídas e soma as novas
+        update_table_sketches(
+            conn, "spec_daily_activity_train",
+            df=pd.read_sql_query(changed_spec_rows, conn), removed=replaced,
+        )
+
+        # Marca d'água
+        updated_at = datetime.now().isoformat(timespec='seconds')
+        marks = df_changed[['Id', 'ActivityDate', 'RowHash']].assign(UpdatedAt=updated_at)
+        conn.executemany(
+            "INSERT OR REPLACE INTO etl_watermark (Id, ActivityDate, RowHash, UpdatedAt) VALUES (?, ?, ?, ?)",
+            _records(marks),
+        )
+        _refresh_spec_aggregates(conn, dates=df_changed['ActivityDate'].unique().tolist())
+
+    bump_data_version()
+    write_spec_snapshot("spec_daily_activity_train")
+    print(f"ETL incremental concluído ({len(df_changed)} linhas novas ou alteradas).")
+    return len(df_changed)
+
+@timed()
+def run_etl_for_predict_data(df_predict, transformer=None):
+    """
+    Executa o ETL para novos dados e salva na SPEC de previsão. As previsões
+    do lote anterior (de qualquer versão do modelo) são apagadas.
+
+    `transformer` é o ActivityFeatureTransformer do treino (guardado nos
+    metadados do modelo); sem ele, valem as médias atuais da SOT ou, com a
+    SOT vazia, as do próprio lote. As features do usuário usam o histórico
+    dele na SOT (compute_batch_features). `df_predict` não é alterado.
+    """
+    ensure_database_and_tables()
+    if transformer is None:
+        transformer = fit_feature_transformer()
+        if transformer.n_seen_ == 0:
+            print("SOT vazia: valores ausentes preenchidos com as médias do próprio lote.")
+            transformer = ActivityFeatureTransformer().fit(df_predict)
+
     # Aplica as mesmas transformações dos dados de treino
-    try:
-        df_predict['ActivityDate'] = pd.to_datetime(df_predict['ActivityDate'], format='%Y-%m-%d %H:%M:%S')
-    except ValueError:
-        try:
-            df_predict['ActivityDate'] = pd.to_datetime(df_predict['ActivityDate'], format='%Y-%m-%d')
-        except ValueError:
-            try:
-                df_predict['ActivityDate'] = pd.to_datetime(df_predict['ActivityDate'], format='%m/%d/%Y')
-            except ValueError:
-                df_predict['ActivityDate'] = pd.to_datetime(df_predict['ActivityDate'], errors='coerce')
-    
-    df_predict['TotalActiveMinutes'] = df_predict['VeryActiveMinutes'] + df_predict['FairlyActiveMinutes'] + df_predict['LightlyActiveMinutes']
-    df_predict['ActivityRatio'] = df_predict['TotalActiveMinutes'] / df_predict['SedentaryMinutes'].replace(0, 1)
-    df_predict['CaloriesPerStep'] = df_predict['Calories'] / df_predict['TotalSteps'].replace(0, 1)
-    df_predict['ActivityLevel'] = pd.cut(df_predict['TotalSteps'],
-                                       bins=[0, 5000, 10000, float('inf')],
-                                       labels=['Sedentary', 'Active', 'Very Active'])
-    
-    numeric_cols = df_predict.select_dtypes(include=['number']).columns
-    df_predict[numeric_cols] = df_predict[numeric_cols].fillna(df_predict[numeric_cols].mean())
-    
-    # Converter a data de volta para string
-    df_predict['ActivityDate'] = df_predict['ActivityDate'].dt.strftime('%Y-%m-%d')
+    df = transformer.transform(df_predict)
+    df['ActivityDate'] = format_activity_dates(df['ActivityDate'])
+
+    # Features do usuário, com o histórico dele na SOT como contexto
+    with db_connection() as conn:
+        df = df.assign(**compute_batch_features(conn, df))
     
     # Selecionar colunas para previsão
-    predict_cols = [
-        'ActivityDate', 'TotalSteps', 'TotalDistance', 'TrackerDistance',
-        'VeryActiveMinutes', 'FairlyActiveMinutes', 'LightlyActiveMinutes',
-        'SedentaryMinutes', 'Calories', 'TotalActiveMinutes', 'ActivityRatio',
-        'CaloriesPerStep', 'ActivityLevel'
-    ]
-    
-    df_spec = df_predict[predict_cols]
-    df_spec.to_sql("spec_daily_activity_predict", conn, if_exists="replace", index=False)
-    conn.close()
+    df_spec = to_storage(df[SPEC_COLUMNS])
+    with db_transaction() as conn:
+        df_spec.to_sql("spec_daily_activity_predict", conn, if_exists="replace", index=False)
+        # As previsões apontam para o rowid da SPEC de previsão: valem só para o lote anterior
+        conn.execute("DELETE FROM spec_daily_activity_predictions")
+        update_table_sketches(conn, "spec_daily_activity_predict", df_spec, reset=True)
+    ensure_database_and_tables()
+    bump_data_version()
+    write_spec_snapshot("spec_daily_activity_predict", df_spec)
     print("ETL para dados de previsão concluído e salvo na SPEC (previsão).")
 
+@timed()
+def write_spec_snapshot(table_name, df=None):
+    """
+    Grava o snapshot colunar de uma tabela SPEC para a etl_version() atual.
+    `df` evita reler a tabela quando o chamador já tem o conteúdo gravado.
+    """
+    if df is None:
+        with db_connection() as conn:
+            df = pd.read_sql_query(f"SELECT * FROM {table_name}", conn)
+    write_snapshot(apply_schema(df), SNAPSHOT_DIR, table_name, etl_version())
+
+@timed()
 def load_data(table_name: str):
-    """Carrega dados de qualquer tabela especificada."""
-    conn = connect_db()
-    df = pd.read_sql_query(f"SELECT * FROM {table_name}", conn)
-    conn.close()
+    """
+    Carrega dados de qualquer tabela especificada (com os tipos de core.data.schema).
+
+    As tabelas SPEC são lidas do snapshot colunar mapeado em memória quando
+    ele corresponde à versão atual do ETL; caso contrário a leitura vai ao
+    SQLite e o snapshot é regravado para as próximas cargas.
+    """
+    if table_name in SNAPSHOT_TABLES:
+        version = etl_version()
+        df = read_snapshot(SNAPSHOT_DIR, table_name, version)
+        if df is not None:
+            memory_report(df, f"{table_name} (snapshot)")
+            return df
+    with db_connection() as conn:
+        df = pd.read_sql_query(f"SELECT * FROM {table_name}", conn)
+    df = apply_schema(df, report=table_name)
+    if table_name in SNAPSHOT_TABLES:
+        write_snapshot(df, SNAPSHOT_DIR, table_name, version)
     return df
 
 def drop_database():
     """Remove o arquivo do banco de dados."""
-    if os.path.exists(DB_NAME):
-        os.remove(DB_NAME)
+    if _remove_database_files():
+        bump_data_version()
         print(f"Banco de dados '{DB_NAME}' removido.")
 
+def _read_aggregate(query):
+    """Lê uma tabela agregada, recalculando-a se ainda não tiver sido preenchida."""
+    with db_connection() as conn:
+        populated = conn.execute("SELECT COUNT(*) FROM spec_daily_activity_summary").fetchone()[0]
+    if not populated:
+        refresh_spec_aggregates()
+    with db_connection() as conn:
+        return pd.read_sql_query(query, conn)
+
+@timed()
 def get_activity_summary():
-    """Retorna um resumo estatístico das atividades."""
-    conn = connect_db()
-    query = """
-    SELECT 
-        COUNT(*) as TotalRecords,
-        MIN(ActivityDate) as StartDate,
-        MAX(ActivityDate) as EndDate,
-        AVG(TotalSteps) as AvgSteps,
-        AVG(Calories) as AvgCalories,
-        AVG(TotalActiveMinutes) as AvgActiveMinutes
-    FROM spec_daily_activity_train
-    """
-    df = pd.read_sql_query(query, conn)
-    conn.close()
-    return df
+    """Retorna um resumo estatístico das atividades (tabela pré-calculada pelo ETL)."""
+    return _read_aggregate("""
+    SELECT
+        TotalRecords,
+        StartDate,
+        EndDate,
+        AvgSteps,
+        AvgCalories,
+        AvgActiveMinutes
+    FROM spec_daily_activity_summary
+    """)
 
+@timed()
 def get_daily_activity_stats():
-    """Retorna estatísticas diárias de atividade."""
-    conn = connect_db()
-    query = """
+    """Retorna estatísticas diárias de atividade (tabela pré-calculada pelo ETL)."""
+    df = _read_aggregate("""
     SELECT 
         ActivityDate,
-        SUM(TotalSteps) as DailySteps,
-        SUM(Calories) as DailyCalories,
-        SUM(TotalActiveMinutes) as DailyActiveMinutes,
-        AVG(ActivityRatio) as AvgActivityRatio
-    FROM spec_daily_activity_train
-    GROUP BY ActivityDate
+        DailySteps,
+        DailyCalories,
+        DailyActiveMinutes,
+        ActivityRatioSum / ActivityRatioCount as AvgActivityRatio
+    FROM spec_daily_activity_daily
     ORDER BY ActivityDate
-    """
-    df = pd.read_sql_query(query, conn)
-    conn.close()
+    """)
 
     # Garantir que ActivityDate é datetime
     df['ActivityDate'] = pd.to_datetime(df['ActivityDate'])
 
     return df
+
+@timed()
+def get_drift_report(reference="spec_daily_activity_train", current="spec_daily_activity_predict"):
+    """Drift entre a SPEC de treino e a de previsão, a partir dos sketches do ETL."""
+    ensure_database_and_tables()
+    with db_connection() as conn:
+        return drift_report(conn, reference, current)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Carrega um CSV de atividade diária na SOR em blocos.")
+    parser.add_argument("csv", help="Caminho do CSV (dailyActivity_merged.csv).")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="Linhas por bloco.")
+    parser.add_argument("--etl", action="store_true", help="Executa também o ETL SOR -> SOT -> SPEC (treino).")
+    args = parser.parse_args(argv)
+    insert_csv_to_sor_streaming(args.csv, chunksize=args.chunksize)
+    if args.etl:
+        run_etl_sor_to_sot()
+        run_etl_sot_to_spec_train()
+        rebuild_etl_watermark()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# Formatos aceitos para ActivityDate e o padrão que identifica cada um.
+# A ordem importa apenas para formatos cujos padrões se sobrepõem.
+DATE_FORMATS = [
+    ('%Y-%m-%d %H:%M:%S', r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}'),
+    ('%Y-%m-%d', r'\d{4}-\d{2}-\d{2}'),
+    ('%m/%d/%Y %I:%M:%S %p', r'\d{1,2}/\d{1,2}/\d{4} \d{1,2}:\d{2}:\d{2} [AP]M'),
+    ('%m/%d/%Y', r'\d{1,2}/\d{1,2}/\d{4}'),
+]
+
+# Uma única expressão com um grupo nomeado por formato: cada linha é
+# classificada numa só passada vetorizada.
+_DETECT_PATTERN = "^(?:" + "|".join(
+    f"(?P<f{i}>{pattern})" for i, (_, pattern) in enumerate(DATE_FORMATS)
+) + ")$"
+
+# Formatos encontrados por arquivo/tabela de origem, com no máximo
+# FORMAT_CACHE_SIZE origens (as usadas há mais tempo saem primeiro): cada
+# upload tem um nome novo e o cache não pode crescer sem limite. As leituras
+# em paralelo (ThreadPoolExecutor) compartilham o cache: todo acesso passa
+# por _FORMAT_CACHE_LOCK, já que move_to_end/popitem não são atômicos.
+FORMAT_CACHE_SIZE = 128
+_FORMAT_CACHE = OrderedDict()
+_FORMAT_CACHE_LOCK = threading.Lock()
+
+
+def _cached_formats(source):
+    with _FORMAT_CACHE_LOCK:
+        formats = _FORMAT_CACHE.get(source)
+        if formats is None:
+            return None
+        _FORMAT_CACHE.move_to_end(source)
+        return list(formats)
+
+
+def _remember_formats(source, formats):
+    with _FORMAT_CACHE_LOCK:
+        _FORMAT_CACHE[source] = formats
+        _FORMAT_CACHE.move_to_end(source)
+        while len(_FORMAT_CACHE) > FORMAT_CACHE_SIZE:
+            _FORMAT_CACHE.popitem(last=False)
+
+
+def _detect_and_parse(text):
+    """Classifica cada linha pelo padrão e converte cada grupo com o seu formato."""
+    result = pd.Series(pd.NaT, index=text.index, dtype="datetime64[ns]")
+    matches = text.str.extract(_DETECT_PATTERN)
+    found = []
+
+    for i, (fmt, _) in enumerate(DATE_FORMATS):
+        mask = matches[f"f{i}"].notna()
+        if mask.any():
+            # O padrão não valida o calendário: 2016-02-30 casa e vira NaT
+            result[mask] = pd.to_datetime(text[mask], format=fmt, errors='coerce')
+            found.append(fmt)
+
+    # Linhas fora dos formatos conhecidos: inferência do pandas, só para elas
+    rest = text.notna() & matches.isna().all(axis=1)
+    if rest.any():
+        result[rest] = pd.to_datetime(text[rest], errors='coerce')
+
+    return result, found
+
+
+def parse_activity_dates(values, source=None):
+    """
+    Converte a coluna ActivityDate para datetime64 em uma única passada.
+
+    O formato de cada linha é detectado por padrão e cada grupo de linhas é
+    convertido com seu formato explícito, sem reprocessar a coluna inteira a
+    cada formato testado. Quando `source` é informado, o formato encontrado é
+    guardado e usado diretamente nas chamadas seguintes da mesma origem.
+    Valores que não puderem ser convertidos viram NaT.
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+
+    text = series.astype("string").str.strip()
+
+    cached = _cached_formats(source) if source is not None else None
+    if cached is not None and len(cached) == 1:
+        parsed = pd.to_datetime(text, format=cached[0], errors='coerce')
+        misses = parsed.isna() & text.notna()
+        if not misses.any():
+            return parsed
+        # Formato novo nesta origem: detecta só as linhas que falharam
+        parsed = parsed.astype("datetime64[ns]")
+        retry, found = _detect_and_parse(text[misses])
+        parsed[misses] = retry
+        _remember_formats(source, list(dict.fromkeys(cached + found)))
+        return parsed
+
+    parsed, found = _detect_and_parse(text)
+    if source is not None and found:
+        _remember_formats(source, found)
+    return parsed
+
+
+def format_activity_dates(values, source=None):
+    """
+    ActivityDate como texto 'YYYY-MM-DD', a forma gravada em todas as
+    tabelas do SQLite; valores que não puderem ser convertidos viram NaN.
+    """
+    return parse_activity_dates(values, source=source).dt.strftime('%Y-%m-%d')
+
+
+def iso_date(value):
+    """
+    Uma data (texto, date ou Timestamp) como 'YYYY-MM-DD', para comparar com
+    ActivityDate nos filtros SQL. Valores inválidos levantam ValueError.
+    """
+    return pd.Timestamp(value).strftime('%Y-%m-%d')
+
+
+def clear_format_cache():
+    """Esquece os formatos memorizados por origem."""
+    with _FORMAT_CACHE_LOCK:
+        _FORMAT_CACHE.clear()
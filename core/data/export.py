@@ -0,0 +1,204 @@
+"""
+Exportação em fluxo das tabelas do banco para CSV (ou CSV gzip).
+
+As linhas saem de um cursor do SQLite em lotes de `batch_size`, são
+escritas em CSV e, opcionalmente, comprimidas incrementalmente; nunca há
+um DataFrame nem o arquivo inteiro em memória. O resultado pode ser
+consumido como gerador de blocos de bytes (iter_csv_bytes) ou gravado
+num arquivo, temporário ou não (export_to_file). Também pela linha de
+comando, a partir da raiz do projeto:
+
+    python -m core.data.export spec_daily_activity_train --output train.csv.gz
+    python -m core.data.export spec_daily_activity_predictions --model-version v3 --start 2016-04-01
+"""
+import argparse
+import csv
+import io
+import os
+import tempfile
+import zlib
+
+from core.data.database import SOR_COLUMNS, SOT_COLUMNS, SPEC_COLUMNS, connect_db
+from core.data.dates import iso_date
+from core.monitoring.timing import timed
+
+PREDICTIONS_TABLE = "spec_daily_activity_predictions"
+DEFAULT_BATCH_SIZE = 10_000
+# wbits=31: fluxo zlib com cabeçalho gzip (legível por gzip/pandas)
+GZIP_WBITS = 31
+COMPRESS_LEVEL = 6
+
+
+def _plain(table, columns):
+    return {"from": table, "date": "ActivityDate", "columns": {c: c for c in columns}}
+
+
+# Cada fonte: cláusula FROM, coluna de data para o filtro de período e
+# colunas exportáveis (nome no CSV -> expressão SQL). As previsões saem
+# junto com as features da SPEC de previsão, como em load_predictions.
+EXPORT_SOURCES = {
+    "sor_daily_activity": _plain("sor_daily_activity", SOR_COLUMNS),
+    "sot_daily_activity": _plain("sot_daily_activity", SOT_COLUMNS),
+    "spec_daily_activity_train": _plain("spec_daily_activity_train", SPEC_COLUMNS),
+    "spec_daily_activity_predict": _plain("spec_daily_activity_predict", SPEC_COLUMNS),
+    PREDICTIONS_TABLE: {
+        "from": f"{PREDICTIONS_TABLE} p JOIN spec_daily_activity_predict s ON s.rowid = p.SpecRowId",
+        "date": "p.ActivityDate",
+        "columns": {
+            "SpecRowId": "p.SpecRowId",
+            **{c: f"s.{c}" for c in SPEC_COLUMNS},
+            "Prediction": "p.Prediction",
+            "ModelVersion": "p.ModelVersion",
+            "ScoredAt": "p.ScoredAt",
+        },
+    },
+}
+
+
+def export_columns(table):
+    """Colunas disponíveis para exportação em `table`."""
+    if table not in EXPORT_SOURCES:
+        raise ValueError(f"Tabela não disponível para exportação: {table}")
+    return list(EXPORT_SOURCES[table]["columns"])
+
+
+def export_query(table, columns=None, start_date=None, end_date=None, model_version=None):
+    """
+    (SQL, parâmetros, colunas) da exportação. Tabela e colunas são validadas
+    contra EXPORT_SOURCES antes de entrarem no texto da consulta.
+    """
+    available = export_columns(table)
+    source = EXPORT_SOURCES[table]
+    if columns is None:
+        columns = available
+    unknown = [c for c in columns if c not in source["columns"]]
+    if unknown:
+        raise ValueError(f"Colunas desconhecidas em {table}: {', '.join(unknown)}")
+    columns = list(dict.fromkeys(columns))
+
+    clauses, params = [], []
+    if start_date is not None:
+        clauses.append(f"{source['date']} >= ?")
+        params.append(iso_date(start_date))
+    if end_date is not None:
+        clauses.append(f"{source['date']} <= ?")
+        params.append(iso_date(end_date))
+    if model_version is not None:
+        if table != PREDICTIONS_TABLE:
+            raise ValueError(f"model_version só se aplica a {PREDICTIONS_TABLE}")
+        clauses.append("p.ModelVersion = ?")
+        params.append(model_version)
+
+    select = ", ".join(f"{source['columns'][c]} AS {c}" for c in columns)
+    sql = f"SELECT {select} FROM {source['from']}"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    return sql, params, columns
+
+
+def iter_csv_rows(table, columns=None, start_date=None, end_date=None, model_version=None,
+                  batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Gera o cabeçalho e depois as linhas da exportação em lotes (listas de
+    tuplas) lidos com fetchmany. Usa uma conexão própria, fechada ao fim
+    da iteração ou quando o gerador é descartado.
+    """
+    sql, params, columns = export_query(table, columns, start_date, end_date, model_version)
+    conn = connect_db()
+    try:
+        cursor = conn.execute(sql, params)
+        yield [tuple(columns)]
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield rows
+    finally:
+        conn.close()
+
+
+def _encode(batches, compress):
+    """Escreve os lotes em CSV e gera os bytes de cada um (comprimidos se `compress`)."""
+    compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, GZIP_WBITS) if compress else None
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    for rows in batches:
+        writer.writerows(rows)
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        if compressor is not None:
+            data = compressor.compress(data)
+        if data:
+            yield data
+    if compressor is not None:
+        yield compressor.flush()
+
+
+def iter_csv_bytes(table, columns=None, start_date=None, end_date=None, model_version=None,
+                   compress=False, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Gera a exportação como blocos de bytes CSV UTF-8, um por lote, ou um
+    fluxo gzip se `compress`. A memória usada é a de um lote, qualquer que
+    seja o tamanho da tabela.
+    """
+    batches = iter_csv_rows(table, columns, start_date, end_date, model_version, batch_size)
+    yield from _encode(batches, compress)
+
+
+@timed(rows=lambda result: result[1])
+def export_to_file(table, path=None, columns=None, start_date=None, end_date=None, model_version=None,
+                   compress=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Grava a exportação em `path` (ou num arquivo temporário, se None) e
+    retorna (caminho, número de linhas). Sem `compress`, comprime quando o
+    caminho termina em .gz. O arquivo temporário deve ser removido por
+    quem o pediu.
+    """
+    if compress is None:
+        compress = path is not None and path.endswith(".gz")
+    if path is None:
+        fd, path = tempfile.mkstemp(prefix=f"{table}_", suffix=".csv.gz" if compress else ".csv")
+        os.close(fd)
+
+    counts = []
+
+    def counted(batches):
+        for rows in batches:
+            counts.append(len(rows))
+            yield rows
+
+    batches = iter_csv_rows(table, columns, start_date, end_date, model_version, batch_size)
+    try:
+        with open(path, "wb") as f:
+            for data in _encode(counted(batches), compress):
+                f.write(data)
+    except BaseException:
+        os.remove(path)
+        raise
+    # O primeiro lote é o cabeçalho
+    total = sum(counts[1:])
+    print(f"Exportação de {table}: {total} linhas em {path}")
+    return path, total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta uma tabela do banco para CSV em fluxo.")
+    parser.add_argument("table", choices=sorted(EXPORT_SOURCES), help="Tabela a exportar.")
+    parser.add_argument("--output", help="Arquivo de saída (.csv ou .csv.gz). Padrão: arquivo temporário.")
+    parser.add_argument("--columns", help="Colunas separadas por vírgula. Padrão: todas.")
+    parser.add_argument("--start", help="Data inicial (inclusiva).")
+    parser.add_argument("--end", help="Data final (inclusiva).")
+    parser.add_argument("--model-version", help=f"Versão do modelo (só para {PREDICTIONS_TABLE}).")
+    parser.add_argument("--gzip", action="store_true", help="Comprime com gzip mesmo sem a extensão .gz.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Linhas por lote.")
+    args = parser.parse_args(argv)
+    columns = [c.strip() for c in args.columns.split(",") if c.strip()] if args.columns else None
+    export_to_file(
+        args.table, args.output, columns, args.start, args.end, args.model_version,
+        compress=True if args.gzip else None, batch_size=args.batch_size,
+    )
+
+
+if __name__ == "__main__":
+    main()
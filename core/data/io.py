@@ -1,6 +1,21 @@
+import codecs
+import io
 import pandas as pd
 import os  # Adicionar esta linha
+from concurrent.futures import ThreadPoolExecutor
 
+from core.data.dates import format_activity_dates, parse_activity_dates
+from core.data.schema import apply_schema
+from core.monitoring.timing import timed
+
+# latin-1 decodifica qualquer sequência de bytes, então fica por último;
+# cp1252 antes dele recusa os poucos bytes que não define (0x81, 0x8D...).
+# iso-8859-1 é outro nome do mesmo codec que latin-1 e não entra na lista.
+ENCODINGS = ['utf-8', 'cp1252', 'latin-1']
+ENCODING_SAMPLE_SIZE = 64 * 1024
+DEFAULT_CHUNKSIZE = 100_000
+
+@timed()
 def load_daily_activity(path="data/dailyActivity_merged.csv"):
     """
     Carrega e pré-processa o dataset dailyActivity_merged.csv.
@@ -17,9 +32,7 @@ def load_daily_activity(path="data/dailyActivity_merged.csv"):
             return None
         
         # Tenta carregar o CSV com diferentes encodings
-        encodings = ['utf-8', 'latin-1', 'iso-8859-1', 'cp1252']
-        
-        for encoding in encodings:
+        for encoding in ENCODINGS:
             try:
                 df = pd.read_csv(path, encoding=encoding)
                 
@@ -27,24 +40,13 @@ def load_daily_activity(path="data/dailyActivity_merged.csv"):
                     print(f"Aviso: DataFrame vazio com encoding {encoding}")
                     continue
                     
-                # Tenta converter a coluna de data
-                try:
-                    df['ActivityDate'] = pd.to_datetime(df['ActivityDate'], format='%Y-%m-%d %H:%M:%S', errors='coerce')
-                except (ValueError, KeyError):
-                    try:
-                        df['ActivityDate'] = pd.to_datetime(df['ActivityDate'], format='%Y-%m-%d', errors='coerce')
-                    except (ValueError, KeyError):
-                        try:
-                            df['ActivityDate'] = pd.to_datetime(df['ActivityDate'], format='%m/%d/%Y', errors='coerce')
-                        except (ValueError, KeyError):
-                            df['ActivityDate'] = pd.to_datetime(df['ActivityDate'], errors='coerce')
-                
-                # 🔑 Converte para date (compatível com Streamlit/Arrow)
+                # Converte a coluna de data (formato detectado por linha)
                 if 'ActivityDate' in df.columns:
-                    df['ActivityDate'] = df['ActivityDate'].dt.date
+                    df['ActivityDate'] = parse_activity_dates(df['ActivityDate'], source=path)
                 
                 print(f"Arquivo carregado com sucesso usando encoding: {encoding}")
-                return df
+                # Tipos compactos (datetime64, categorias, inteiros menores)
+                return apply_schema(df, report=os.path.basename(path))
                 
             except (pd.errors.EmptyDataError, UnicodeDecodeError) as e:
                 print(f"Falha com encoding {encoding}: {e}")
@@ -59,13 +61,11 @@ def load_daily_activity(path="data/dailyActivity_merged.csv"):
             df = pd.read_csv(path)
             if not df.empty:
                 try:
-                    df['ActivityDate'] = pd.to_datetime(df['ActivityDate'], errors='coerce')
-                    if 'ActivityDate' in df.columns:
-                        df['ActivityDate'] = df['ActivityDate'].dt.date
+                    df['ActivityDate'] = parse_activity_dates(df['ActivityDate'], source=path)
                 except KeyError:
                     print("Coluna 'ActivityDate' não encontrada no arquivo")
                 
-                return df
+                return apply_schema(df, report=os.path.basename(path))
             else:
                 print("DataFrame ainda está vazio")
                 return None
@@ -81,9 +81,202 @@ def load_daily_activity(path="data/dailyActivity_merged.csv"):
         return None
 
 
+def detect_encoding(source, sample_size=ENCODING_SAMPLE_SIZE):
+    """
+    Detecta o encoding do CSV lendo apenas uma amostra inicial do arquivo.
+    Aceita um caminho ou um objeto de arquivo binário (que é reposicionado no início).
+    """
+    if hasattr(source, "read"):
+        sample = source.read(sample_size)
+        source.seek(0)
+    else:
+        with open(source, "rb") as f:
+            sample = f.read(sample_size)
+
+    for encoding in ENCODINGS:
+        try:
+            # final=False: a amostra pode terminar no meio de um caractere multibyte
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return None
+
+
+def _fallback_encodings(encoding):
+    """O encoding detectado e os seguintes de ENCODINGS, na ordem de tentativa."""
+    return ENCODINGS[ENCODINGS.index(encoding):] if encoding in ENCODINGS else [encoding]
+
+
+def iter_daily_activity_chunks(source, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Lê o CSV de atividade diária em blocos de tamanho fixo.
+    O encoding é detectado a partir de uma amostra, e a coluna ActivityDate
+    é convertida para 'YYYY-MM-DD' em cada bloco, de modo que o uso de
+    memória depende do tamanho do bloco e não do tamanho do arquivo.
+
+    Se um byte inválido para o encoding aparecer depois da amostra, a
+    leitura recomeça com o próximo encoding de ENCODINGS, pulando as linhas
+    já entregues.
+    """
+    encoding = detect_encoding(source)
+    # Chave do cache de formatos: o caminho, ou o nome do arquivo aberto. Um
+    # buffer sem nome não entra no cache (o objeto nunca se repetiria como chave)
+    if hasattr(source, "read"):
+        name = getattr(source, "name", None)
+        source_key = name if isinstance(name, str) else None
+    else:
+        source_key = os.fspath(source)
+    if encoding is None:
+        raise ValueError("Nenhum dos encodings suportados conseguiu decodificar o arquivo.")
+
+    done = 0
+    for encoding in _fallback_encodings(encoding):
+        if hasattr(source, "seek"):
+            source.seek(0)
+        # Linhas já entregues com o encoding anterior são relidas e descartadas
+        # (skiprows contaria linhas em branco do arquivo, não linhas de dados)
+        skip = done
+        reader = pd.read_csv(source, encoding=encoding, chunksize=chunksize)
+        while True:
+            try:
+                chunk = next(reader)
+            except StopIteration:
+                return
+            except UnicodeDecodeError as e:
+                print(f"Falha com encoding {encoding} após {done} linhas: {e}")
+                break
+            if skip:
+                dropped = min(skip, len(chunk))
+                chunk, skip = chunk.iloc[dropped:], skip - dropped
+                if chunk.empty:
+                    continue
+            if 'ActivityDate' in chunk.columns:
+                chunk['ActivityDate'] = format_activity_dates(chunk['ActivityDate'], source=source_key)
+            done += len(chunk)
+            yield chunk
+    raise ValueError("Nenhum dos encodings suportados conseguiu decodificar o arquivo.")
+
+
+class BufferReader(io.RawIOBase):
+    """
+    Arquivo binário somente leitura sobre um buffer (bytes, memoryview,
+    BytesIO.getbuffer()), sem copiar o conteúdo: cada leitura copia só o
+    trecho pedido para o buffer de quem lê.
+    """
+
+    def __init__(self, data):
+        self._view = memoryview(data).cast("B")
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        n = max(0, min(len(b), len(self._view) - self._pos))
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._view)}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        if not self.closed:
+            self._view.release()
+        super().close()
+
+
+def _read_activity_csv(buffer, name):
+    encoding = detect_encoding(buffer)
+    if encoding is None:
+        raise ValueError("Nenhum dos encodings suportados conseguiu decodificar o arquivo.")
+    for encoding in _fallback_encodings(encoding):
+        buffer.seek(0)
+        try:
+            df = pd.read_csv(buffer, encoding=encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        raise ValueError("Nenhum dos encodings suportados conseguiu decodificar o arquivo.")
+    if 'ActivityDate' in df.columns:
+        df['ActivityDate'] = parse_activity_dates(df['ActivityDate'], source=name)
+    return apply_schema(df)
+
+
+def read_daily_activity_buffer(data, name="upload"):
+    """
+    Lê um CSV de atividade diária direto da memória, sem gravar arquivo
+    temporário nem copiar o conteúdo, com os tipos de core.data.schema, como
+    em load_daily_activity. `data` é um arquivo binário em memória (como o
+    UploadedFile do Streamlit, lido a partir do início) ou um buffer (bytes,
+    memoryview); `name` identifica a origem no cache de formatos.
+    """
+    if hasattr(data, "read"):
+        data.seek(0)
+        return _read_activity_csv(data, name)
+    with io.BufferedReader(BufferReader(data)) as buffer:
+        return _read_activity_csv(buffer, name)
+
+
+@timed()
+def load_daily_activity_uploads(files, max_workers=None):
+    """
+    Lê vários CSVs enviados (arquivos em memória com .name, como o
+    UploadedFile do Streamlit, ou pares (nome, bytes)) em paralelo e junta
+    tudo em um único DataFrame sem duplicatas de (Id, ActivityDate); em caso
+    de repetição vale o arquivo que vem por último na lista.
+
+    O parser C do pandas libera o GIL durante a leitura, então um pool de
+    threads aproveita vários núcleos sem copiar os buffers entre processos.
+    Retorna (DataFrame ou None, {nome do arquivo: mensagem de erro}).
+    """
+    # O próprio upload é lido em blocos: getvalue() ou getbuffer() podem copiá-lo
+    items = [f if isinstance(f, tuple) else (f.name, f) for f in files]
+    if not items:
+        return None, {}
+
+    max_workers = max_workers or min(len(items), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(read_daily_activity_buffer, data, name) for name, data in items]
+
+    frames, errors = [], {}
+    for (name, _), future in zip(items, futures):
+        try:
+            df = future.result()
+        except Exception as e:
+            print(f"Erro ao processar arquivo {name}: {e}")
+            errors[name] = str(e)
+            continue
+        if df.empty:
+            errors[name] = "arquivo sem linhas"
+            continue
+        frames.append(df)
+
+    if not frames:
+        return None, errors
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    if {'Id', 'ActivityDate'}.issubset(df.columns):
+        df = df.drop_duplicates(subset=['Id', 'ActivityDate'], keep='last').reset_index(drop=True)
+    print(f"{len(frames)} arquivo(s) carregado(s): {len(df)} linhas após remover duplicatas.")
+    # concat de categorias diferentes entre arquivos volta a object
+    return apply_schema(df, report="uploads"), errors
+
+
 def get_most_active_users_calories(df, top_n=10):
     """
     Calcula a média de calorias dos usuários mais ativos, baseados no total de passos.
+    Para dados já no banco, core.data.query.most_active_users_calories faz o
+    mesmo cálculo no SQLite.
     """
     if df is None:
         return None
@@ -0,0 +1,169 @@
+"""
+Consultas por usuário e período sobre as tabelas com chave (Id, ActivityDate).
+
+Filtros de usuário e datas, projeção de colunas e paginação vão para o
+SQL e usam os índices únicos (Id, ActivityDate) da SOR/SOT e a chave
+primária da feature store; só as linhas pedidas saem do SQLite. Nomes de
+tabela e coluna não podem ser parâmetros no SQL, então são validados
+contra QUERYABLE_TABLES antes de entrarem no texto da consulta.
+"""
+import json
+
+import pandas as pd
+
+from core.data.database import SOR_COLUMNS, SOT_COLUMNS, db_connection
+from core.data.dates import iso_date
+from core.data.schema import apply_schema
+from core.features.store import FEATURE_COLUMNS, FEATURE_TABLE
+from core.monitoring.timing import timed
+
+QUERYABLE_TABLES = {
+    "sor_daily_activity": SOR_COLUMNS,
+    "sot_daily_activity": SOT_COLUMNS,
+    FEATURE_TABLE: FEATURE_COLUMNS,
+}
+DEFAULT_TABLE = "sot_daily_activity"
+DEFAULT_PAGE_SIZE = 1000
+KEY_COLUMNS = ['Id', 'ActivityDate']
+
+
+def _table_columns(table, columns):
+    if table not in QUERYABLE_TABLES:
+        raise ValueError(f"Tabela não disponível para consulta: {table}")
+    allowed = QUERYABLE_TABLES[table]
+    if columns is None:
+        return list(allowed)
+    unknown = [c for c in columns if c not in allowed]
+    if unknown:
+        raise ValueError(f"Colunas desconhecidas em {table}: {', '.join(unknown)}")
+    return list(dict.fromkeys(columns))
+
+
+def _where(user_ids=None, start_date=None, end_date=None, after=None):
+    """Cláusula WHERE e parâmetros para os filtros (Id, período e cursor)."""
+    clauses, params = [], []
+    if user_ids is not None:
+        # Lista de qualquer tamanho num único parâmetro
+        clauses.append("Id IN (SELECT value FROM json_each(?))")
+        params.append(json.dumps([int(i) for i in user_ids]))
+    if start_date is not None:
+        clauses.append("ActivityDate >= ?")
+        params.append(iso_date(start_date))
+    if end_date is not None:
+        clauses.append("ActivityDate <= ?")
+        params.append(iso_date(end_date))
+    if after is not None:
+        clauses.append("(Id, ActivityDate) > (?, ?)")
+        params.extend([int(after[0]), iso_date(after[1])])
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+@timed()
+def query_daily_activity(table=DEFAULT_TABLE, user_ids=None, start_date=None, end_date=None,
+                         columns=None, limit=None, offset=0, after=None):
+    """
+    Linhas de `table` filtradas por usuários e período (datas inclusivas),
+    ordenadas por (Id, ActivityDate).
+
+    `columns` restringe as colunas lidas. Paginação por `limit`/`offset`
+    ou, para percorrer históricos grandes, por cursor: `after` é a chave
+    (Id, ActivityDate) da última linha da página anterior.
+    """
+    selected = _table_columns(table, columns)
+    where, params = _where(user_ids, start_date, end_date, after)
+    sql = f"SELECT {', '.join(selected)} FROM {table}{where} ORDER BY Id, ActivityDate"
+    if limit is not None:
+        sql += " LIMIT ? OFFSET ?"
+        params.extend([int(limit), int(offset)])
+    elif offset:
+        sql += " LIMIT -1 OFFSET ?"
+        params.append(int(offset))
+    with db_connection() as conn:
+        df = pd.read_sql_query(sql, conn, params=params)
+    return apply_schema(df)
+
+
+def iter_daily_activity_pages(table=DEFAULT_TABLE, user_ids=None, start_date=None, end_date=None,
+                              columns=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Percorre o resultado de query_daily_activity em páginas de `page_size`
+    linhas com cursor (Id, ActivityDate), sem o custo crescente do OFFSET.
+    """
+    selected = _table_columns(table, columns)
+    # A chave é necessária para o cursor; sai das páginas se não foi pedida
+    query_columns = list(dict.fromkeys(KEY_COLUMNS + selected))
+    after = None
+    while True:
+        page = query_daily_activity(table, user_ids, start_date, end_date, query_columns, limit=page_size, after=after)
+        if page.empty:
+            return
+        last = page.iloc[-1]
+        key = (int(last['Id']), iso_date(last['ActivityDate']))
+        if after is not None and key <= after:
+            # Chave sem ordem de data (ex.: texto fora de YYYY-MM-DD) repetiria páginas
+            raise RuntimeError(f"Cursor de {table} não avançou após {after}")
+        after = key
+        yield page[selected]
+        if len(page) < page_size:
+            return
+
+
+def count_daily_activity(table=DEFAULT_TABLE, user_ids=None, start_date=None, end_date=None):
+    """Número de linhas que query_daily_activity retornaria sem paginação."""
+    _table_columns(table, None)
+    where, params = _where(user_ids, start_date, end_date)
+    with db_connection() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}{where}", params).fetchone()[0]
+
+
+def list_user_ids(table=DEFAULT_TABLE):
+    """Ids distintos de `table` (lidos do índice (Id, ActivityDate))."""
+    _table_columns(table, None)
+    with db_connection() as conn:
+        return [row[0] for row in conn.execute(f"SELECT DISTINCT Id FROM {table} ORDER BY Id")]
+
+
+@timed()
+def top_active_users(top_n=10, start_date=None, end_date=None, table=DEFAULT_TABLE):
+    """
+    Os `top_n` usuários com mais passos no período, com dias registrados e
+    médias de passos e calorias. Agregado no SQLite: o resultado tem no
+    máximo `top_n` linhas.
+    """
+    _table_columns(table, None)
+    where, params = _where(start_date=start_date, end_date=end_date)
+    with db_connection() as conn:
+        return pd.read_sql_query(f"""
+            SELECT
+                Id,
+                SUM(TotalSteps) AS TotalSteps,
+                COUNT(*) AS Days,
+                AVG(TotalSteps) AS AvgSteps,
+                AVG(Calories) AS AvgCalories
+            FROM {table}{where}
+            GROUP BY Id
+            ORDER BY SUM(TotalSteps) DESC, Id
+            LIMIT ?
+        """, conn, params=params + [int(top_n)])
+
+
+@timed()
+def most_active_users_calories(top_n=10, start_date=None, end_date=None, table=DEFAULT_TABLE):
+    """
+    Média de calorias dos `top_n` usuários com mais passos no período, como
+    core.data.io.get_most_active_users_calories, mas calculada no SQLite.
+    """
+    _table_columns(table, None)
+    where, params = _where(start_date=start_date, end_date=end_date)
+    with db_connection() as conn:
+        row = conn.execute(f"""
+            WITH top_users AS (
+                SELECT Id FROM {table}{where}
+                GROUP BY Id
+                ORDER BY SUM(TotalSteps) DESC, Id
+                LIMIT ?
+            )
+            SELECT AVG(Calories) FROM {table}
+            {where or " WHERE 1 = 1"} AND Id IN (SELECT Id FROM top_users)
+        """, params + [int(top_n)] + params).fetchone()
+    return row[0]
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+
+from core.data.dates import parse_activity_dates
+
+ACTIVITY_LEVELS = ['Sedentary', 'Active', 'Very Active']
+
+# Tipos em memória das colunas de atividade diária (SOR, SOT, SPEC e previsões).
+# Minutos por dia cabem em int16 (<= 1440); distâncias e razões em float32
+# (~7 dígitos significativos, a mesma precisão em que o Fitbit exporta).
+# Id tem poucos valores distintos e vira categoria.
+COLUMN_TYPES = {
+    'Id': 'category',
+    'ActivityDate': 'datetime64[ns]',
+    'TotalSteps': 'int32',
+    'TotalDistance': 'float32',
+    'TrackerDistance': 'float32',
+    'LoggedActivitiesDistance': 'float32',
+    'VeryActiveDistance': 'float32',
+    'ModeratelyActiveDistance': 'float32',
+    'LightActiveDistance': 'float32',
+    'SedentaryActiveDistance': 'float32',
+    'VeryActiveMinutes': 'int16',
+    'FairlyActiveMinutes': 'int16',
+    'LightlyActiveMinutes': 'int16',
+    'SedentaryMinutes': 'int16',
+    'TotalActiveMinutes': 'int16',
+    'Calories': 'int32',
+    'ActivityRatio': 'float32',
+    'CaloriesPerStep': 'float32',
+    'ActivityLevel': pd.CategoricalDtype(ACTIVITY_LEVELS, ordered=True),
+    'Steps7dMean': 'float32',
+    'ActiveMinutes7dMean': 'float32',
+    'Calories7dMean': 'float32',
+    'StepsBaseline': 'float32',
+    'StepsDeviation': 'float32',
+    'GoalStreak': 'int16',
+    'DaysObserved': 'int32',
+    'Prediction': 'float32',
+    'ModelVersion': 'category',
+}
+
+
+def _to_int(series, dtype):
+    """Converte para o inteiro declarado; com NaN, frações ou fora da faixa, cai para float32/int64."""
+    values = pd.to_numeric(series, errors='coerce')
+    if values.isna().any() or not np.array_equal(values, np.round(values)):
+        return values.astype('float32')
+    info = np.iinfo(dtype)
+    if len(values) and (values.min() < info.min or values.max() > info.max):
+        return values.astype('int64')
+    return values.astype(dtype)
+
+
+def apply_schema(df, report=None):
+    """
+    Aplica COLUMN_TYPES às colunas conhecidas de `df` (as demais ficam como
+    estão) e retorna um novo DataFrame. Com `report`, imprime o consumo de
+    memória com esse rótulo.
+    """
+    df = df.copy(deep=False)
+    for col, dtype in COLUMN_TYPES.items():
+        if col not in df.columns:
+            continue
+        if dtype == 'datetime64[ns]':
+            df[col] = parse_activity_dates(df[col]).astype(dtype)
+        elif isinstance(dtype, str) and dtype.startswith('int'):
+            df[col] = _to_int(df[col], dtype)
+        elif dtype == 'float32':
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(dtype)
+        else:
+            df[col] = df[col].astype(dtype)
+    if report:
+        memory_report(df, report)
+    return df
+
+
+def to_storage(df):
+    """
+    Prepara um DataFrame tipado para gravação no SQLite: datas como
+    'YYYY-MM-DD', categorias com os valores originais e float32 convertido
+    para float64 sem arredondamento (7.63 em float32 é gravado como
+    7.630000114...). Comparações que precisam ignorar essa diferença
+    arredondam para float32 explicitamente (ver _sor_row_hash).
+    """
+    df = df.copy(deep=False)
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            df[col] = series.dt.strftime('%Y-%m-%d')
+        elif isinstance(series.dtype, pd.CategoricalDtype):
+            categories = series.cat.categories
+            if pd.api.types.is_numeric_dtype(categories.dtype):
+                target = categories.dtype if series.notna().all() else 'float64'
+                df[col] = series.astype(target)
+            else:
+                df[col] = series.astype(object)
+        elif series.dtype == 'float32':
+            df[col] = series.astype('float64')
+        elif pd.api.types.is_integer_dtype(series) and not pd.api.types.is_extension_array_dtype(series):
+            df[col] = series.astype('int64')
+    return df
+
+
+def to_model_input(df):
+    """
+    Colunas de data como categorias de texto 'YYYY-MM-DD', a forma em que o
+    pipeline de pré-processamento as recebe da SPEC no SQLite.
+    """
+    df = df.copy(deep=False)
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].dt.strftime('%Y-%m-%d').astype('category')
+    return df
+
+
+def memory_report(df, label):
+    """Imprime e retorna o uso de memória de `df` (bytes, contando objetos)."""
+    total = int(df.memory_usage(deep=True).sum())
+    per_row = total / len(df) if len(df) else 0
+    print(f"{label}: {len(df)} linhas, {total / 1024 ** 2:.2f} MB ({per_row:.0f} bytes/linha).")
+    return total
@@ -0,0 +1,110 @@
+"""
+Snapshot colunar das tabelas SPEC: um .npy por coluna e um manifest.json.
+
+Os arrays são abertos com np.load(mmap_mode="c"), de modo que a carga não
+passa pela conversão linha a linha do sqlite3 e as páginas só são lidas
+quando usadas; alterações no DataFrame ficam na memória do processo
+(copy-on-write) e nunca chegam ao arquivo. Colunas de texto/categoria são guardadas como códigos
+inteiros, com as categorias no manifesto.
+"""
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+def _table_dir(directory, table):
+    return os.path.join(directory, table)
+
+
+def read_manifest(directory, table):
+    path = os.path.join(_table_dir(directory, table), "manifest.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_snapshot(df, directory, table, version):
+    """
+    Grava `df` como snapshot de `table`, associado ao token `version`.
+
+    Os arquivos vão para um subdiretório novo e o manifesto é trocado de
+    forma atômica no final; leitores que ainda mapeiam a versão anterior
+    continuam válidos (no Linux o arquivo só some quando for desmapeado).
+    """
+    table_dir = _table_dir(directory, table)
+    write_id = uuid.uuid4().hex[:12]
+    data_dir = os.path.join(table_dir, write_id)
+    os.makedirs(data_dir, exist_ok=True)
+
+    columns = []
+    for i, col in enumerate(df.columns):
+        series = df[col]
+        entry = {"name": str(col), "file": f"{i}.npy"}
+        if isinstance(series.dtype, pd.CategoricalDtype) or not (
+            pd.api.types.is_numeric_dtype(series) or pd.api.types.is_datetime64_any_dtype(series)
+        ):
+            categorical = series.astype("category") if not isinstance(series.dtype, pd.CategoricalDtype) else series
+            values = categorical.cat.codes.to_numpy()
+            categories = categorical.cat.categories
+            entry["kind"] = "category"
+            entry["categories"] = [c.item() if hasattr(c, "item") else c for c in categories]
+            entry["ordered"] = bool(categorical.cat.ordered)
+        else:
+            values = series.to_numpy()
+            entry["kind"] = "array"
+        np.save(os.path.join(data_dir, entry["file"]), values, allow_pickle=False)
+        columns.append(entry)
+
+    manifest = {
+        "table": table,
+        "version": version,
+        "data_dir": write_id,
+        "n_rows": len(df),
+        "columns": columns,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    tmp_path = os.path.join(table_dir, f"manifest.{write_id}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(table_dir, "manifest.json"))
+
+    # Versões anteriores não são mais referenciadas pelo manifesto
+    for name in os.listdir(table_dir):
+        path = os.path.join(table_dir, name)
+        if name != write_id and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+    return manifest
+
+
+def read_snapshot(directory, table, version):
+    """
+    DataFrame do snapshot de `table` sobre arrays mapeados em memória, ou
+    None se não houver snapshot ou se ele não corresponder a `version`.
+    """
+    manifest = read_manifest(directory, table)
+    if manifest is None or manifest["version"] != version:
+        return None
+    data_dir = os.path.join(_table_dir(directory, table), manifest["data_dir"])
+    data = {}
+    try:
+        for entry in manifest["columns"]:
+            # view como ndarray comum: sem cópia, o mapeamento segue como base
+            values = np.load(os.path.join(data_dir, entry["file"]), mmap_mode="c", allow_pickle=False).view(np.ndarray)
+            if entry["kind"] == "category":
+                dtype = pd.CategoricalDtype(entry["categories"], ordered=entry["ordered"])
+                values = pd.Categorical.from_codes(values, dtype=dtype, validate=False)
+            data[entry["name"]] = values
+    except FileNotFoundError:
+        # Trocado por outro processo entre a leitura do manifesto e dos arrays
+        return None
+    return pd.DataFrame(data, copy=False)
+
+
+def remove_snapshots(directory):
+    shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,5 @@
+CREATE TABLE IF NOT EXISTS data_versions (
+    DbPath TEXT PRIMARY KEY,
+    Version INTEGER NOT NULL,
+    UpdatedAt TEXT NOT NULL
+);
@@ -0,0 +1,34 @@
+-- ETL SOR -> SOT executado inteiramente dentro do SQLite.
+-- Modelo preenchido por _etl_sor_to_sot_sql (core/data/database.py): as
+-- expressões das métricas derivadas e de ActivityLevel vêm de
+-- ActivityFeatureTransformer.derive_sql() e as colunas preenchidas com a
+-- média vêm de FILL_COLUMNS, as mesmas definições da engine pandas. As
+-- datas da SOR já estão em YYYY-MM-DD (todas as gravações passam por
+-- _prepare_sor_frame), então são copiadas como estão.
+-- DELETE e INSERT numa só transação: se o INSERT falhar, a SOT anterior fica.
+BEGIN;
+
+DELETE FROM sot_daily_activity;
+
+INSERT OR REPLACE INTO sot_daily_activity (
+    {columns}
+)
+WITH base AS (
+    SELECT
+        rowid AS SorRowId,
+        {sor_columns},
+        {derived}
+    FROM sor_daily_activity
+),
+means AS (
+    SELECT
+        {means}
+    FROM base
+)
+SELECT
+    {filled}
+FROM base b
+CROSS JOIN means m
+ORDER BY b.SorRowId;
+
+COMMIT;
@@ -0,0 +1,23 @@
+-- ETL SOT -> SPEC (treino) executado dentro do SQLite.
+-- A SPEC herda o rowid da SOT: é esse vínculo que permite ao ETL
+-- incremental atualizar apenas as linhas alteradas. As features do usuário
+-- vêm da feature store, que o ETL SOR -> SOT já recalculou.
+DELETE FROM spec_daily_activity_train;
+
+INSERT INTO spec_daily_activity_train (
+    rowid, ActivityDate, TotalSteps, TotalDistance, TrackerDistance,
+    VeryActiveMinutes, FairlyActiveMinutes, LightlyActiveMinutes,
+    SedentaryMinutes, Calories, TotalActiveMinutes, ActivityRatio,
+    CaloriesPerStep, ActivityLevel,
+    Steps7dMean, ActiveMinutes7dMean, Calories7dMean,
+    StepsBaseline, StepsDeviation, GoalStreak, DaysObserved
+)
+SELECT
+    s.rowid, s.ActivityDate, s.TotalSteps, s.TotalDistance, s.TrackerDistance,
+    s.VeryActiveMinutes, s.FairlyActiveMinutes, s.LightlyActiveMinutes,
+    s.SedentaryMinutes, s.Calories, s.TotalActiveMinutes, s.ActivityRatio,
+    s.CaloriesPerStep, s.ActivityLevel,
+    f.Steps7dMean, f.ActiveMinutes7dMean, f.Calories7dMean,
+    f.StepsBaseline, f.StepsDeviation, f.GoalStreak, f.DaysObserved
+FROM sot_daily_activity s
+LEFT JOIN feature_store_daily_activity f ON f.Id = s.Id AND f.ActivityDate = s.ActivityDate;
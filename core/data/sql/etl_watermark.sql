@@ -0,0 +1,7 @@
+CREATE TABLE IF NOT EXISTS etl_watermark (
+    Id INTEGER NOT NULL,
+    ActivityDate TEXT NOT NULL,
+    RowHash INTEGER NOT NULL,
+    UpdatedAt TEXT NOT NULL,
+    PRIMARY KEY (Id, ActivityDate)
+);
\ No newline at end of file
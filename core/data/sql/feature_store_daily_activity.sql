@@ -0,0 +1,22 @@
+-- Features por usuário calculadas a partir da SOT (core/features/store.py).
+-- Médias móveis dos 7 dias anteriores, linha de base (média dos dias
+-- anteriores), desvio do dia e sequência de dias com a meta de passos.
+-- CumSteps/DaysObserved são os acumulados usados para continuar o cálculo
+-- de forma incremental.
+CREATE TABLE IF NOT EXISTS feature_store_daily_activity (
+    Id INTEGER NOT NULL,
+    ActivityDate TEXT NOT NULL,
+    Steps7dMean REAL,
+    ActiveMinutes7dMean REAL,
+    Calories7dMean REAL,
+    StepsBaseline REAL,
+    StepsDeviation REAL,
+    GoalStreak INTEGER NOT NULL,
+    DaysObserved INTEGER NOT NULL,
+    CumSteps REAL NOT NULL,
+    PRIMARY KEY (Id, ActivityDate)
+);
+
+-- As features agora são colunas das SPEC de treino e de previsão
+-- (MODEL_FEATURE_COLUMNS); a view antiga não é mais usada.
+DROP VIEW IF EXISTS spec_daily_activity_train_features;
@@ -0,0 +1,5 @@
+CREATE UNIQUE INDEX IF NOT EXISTS ux_sor_daily_activity_key ON sor_daily_activity (Id, ActivityDate);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_sot_daily_activity_key ON sot_daily_activity (Id, ActivityDate);
+CREATE INDEX IF NOT EXISTS ix_spec_daily_activity_train_date ON spec_daily_activity_train (ActivityDate);
+CREATE INDEX IF NOT EXISTS ix_spec_daily_activity_predict_date ON spec_daily_activity_predict (ActivityDate);
+CREATE INDEX IF NOT EXISTS ix_spec_daily_activity_daily_date ON spec_daily_activity_daily (ActivityDate);
\ No newline at end of file
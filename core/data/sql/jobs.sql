@@ -0,0 +1,20 @@
+CREATE TABLE IF NOT EXISTS jobs (
+    JobId TEXT PRIMARY KEY,
+    Kind TEXT NOT NULL,
+    DedupeKey TEXT NOT NULL,
+    Params TEXT,
+    Status TEXT NOT NULL,          -- pending, running, done, failed, interrupted
+    Stage TEXT,
+    Progress REAL NOT NULL DEFAULT 0,
+    Result TEXT,
+    Error TEXT,
+    CreatedAt TEXT NOT NULL,
+    StartedAt TEXT,
+    FinishedAt TEXT,
+    PayloadPath TEXT,              -- conteúdo do job em disco até ele terminar (core/jobs/runner.py)
+    Owner TEXT,                    -- runner dono: host:pid:instância
+    HeartbeatAt TEXT               -- renovado pelo dono enquanto o job está ativo
+);
+
+CREATE INDEX IF NOT EXISTS ix_jobs_dedupe ON jobs (DedupeKey, Status);
+CREATE INDEX IF NOT EXISTS ix_jobs_created ON jobs (CreatedAt);
@@ -0,0 +1,18 @@
+-- Resumos (sketches) por coluna das tabelas SPEC, mantidos pelo ETL
+-- (core/monitoring/drift.py) para medir drift sem reler as tabelas.
+-- Numéricas: contagem, média e M2 (Welford), mínimo/máximo e buckets
+-- logarítmicos para quantis; categóricas: contagem por categoria.
+CREATE TABLE IF NOT EXISTS monitoring_sketches (
+    TableName TEXT NOT NULL,
+    ColumnName TEXT NOT NULL,
+    Kind TEXT NOT NULL,            -- numeric, categorical
+    Count INTEGER NOT NULL,
+    Nulls INTEGER NOT NULL,
+    Mean REAL,
+    M2 REAL,
+    MinValue REAL,
+    MaxValue REAL,
+    Buckets TEXT NOT NULL,         -- JSON: {"keys": [...], "counts": [...]} ou {categoria: contagem}
+    UpdatedAt TEXT NOT NULL,
+    PRIMARY KEY (TableName, ColumnName)
+);
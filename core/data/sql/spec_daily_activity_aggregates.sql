@@ -0,0 +1,21 @@
+CREATE TABLE IF NOT EXISTS spec_daily_activity_daily (
+    ActivityDate TEXT,
+    RecordCount INTEGER,
+    DailySteps INTEGER,
+    StepsCount INTEGER,
+    DailyCalories REAL,
+    CaloriesCount INTEGER,
+    DailyActiveMinutes INTEGER,
+    ActiveMinutesCount INTEGER,
+    ActivityRatioSum REAL,
+    ActivityRatioCount INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS spec_daily_activity_summary (
+    TotalRecords INTEGER,
+    StartDate TEXT,
+    EndDate TEXT,
+    AvgSteps REAL,
+    AvgCalories REAL,
+    AvgActiveMinutes REAL
+);
\ No newline at end of file
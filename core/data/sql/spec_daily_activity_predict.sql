@@ -11,5 +11,13 @@ CREATE TABLE IF NOT EXISTS spec_daily_activity_predict (
     TotalActiveMinutes INTEGER,
     ActivityRatio REAL,
     CaloriesPerStep REAL,
-    ActivityLevel TEXT
+    ActivityLevel TEXT,
+    -- Features do usuário (feature_store_daily_activity)
+    Steps7dMean REAL,
+    ActiveMinutes7dMean REAL,
+    Calories7dMean REAL,
+    StepsBaseline REAL,
+    StepsDeviation REAL,
+    GoalStreak INTEGER,
+    DaysObserved INTEGER
 );
\ No newline at end of file
@@ -0,0 +1,11 @@
+-- Previsões do lote atual de spec_daily_activity_predict, ligadas pelo rowid
+-- (SpecRowId). A SPEC de previsão é recriada a cada ETL de previsão, que
+-- apaga esta tabela na mesma transação.
+CREATE TABLE IF NOT EXISTS spec_daily_activity_predictions (
+    SpecRowId INTEGER NOT NULL,
+    ActivityDate TEXT,
+    Prediction REAL,
+    ModelVersion TEXT NOT NULL,
+    ScoredAt TEXT,
+    PRIMARY KEY (SpecRowId, ModelVersion)
+);
\ No newline at end of file
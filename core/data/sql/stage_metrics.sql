@@ -0,0 +1,19 @@
+CREATE TABLE IF NOT EXISTS stage_metrics (
+    Id INTEGER PRIMARY KEY AUTOINCREMENT,
+    RunId TEXT NOT NULL,           -- estágio raiz e todos os aninhados nele
+    Stage TEXT NOT NULL,
+    Parent TEXT,
+    Depth INTEGER NOT NULL DEFAULT 0,
+    Status TEXT NOT NULL,          -- ok, error
+    StartedAt TEXT NOT NULL,
+    WallSeconds REAL NOT NULL,
+    Rows INTEGER,
+    PeakAllocMB REAL,              -- pico de memória alocada no estágio acima do início (tracemalloc)
+    AllocGrowthMB REAL,            -- memória alocada ao final menos no início
+    ProfilePath TEXT,
+    ProfileSummary TEXT,
+    Pid INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS ix_stage_metrics_run ON stage_metrics (RunId);
+CREATE INDEX IF NOT EXISTS ix_stage_metrics_stage ON stage_metrics (Stage, StartedAt);
@@ -0,0 +1,123 @@
+"""
+Gerador determinístico de dados sintéticos no formato do
+dailyActivity_merged.csv, para testes de carga e benchmarks.
+
+Cada usuário tem uma média de passos (gama, como a dispersão entre usuários
+do dataset original), um comprimento de passo e um gasto basal próprios.
+Por dia: ~13% de dias sem uso do aparelho (0 passos, 1440 minutos
+sedentários), passos em torno da média do usuário, minutos por intensidade
+proporcionais aos passos, distâncias por intensidade que somam a distância
+total e calorias = basal + passos + minutos muito ativos + ruído.
+
+A saída depende apenas de (n_users, n_days, seed, start_date,
+users_per_chunk): cada bloco de usuários tem o próprio gerador aleatório,
+então os blocos podem ser gerados e gravados um de cada vez.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+CSV_COLUMNS = [
+    'Id', 'ActivityDate', 'TotalSteps', 'TotalDistance', 'TrackerDistance',
+    'LoggedActivitiesDistance', 'VeryActiveDistance', 'ModeratelyActiveDistance',
+    'LightActiveDistance', 'SedentaryActiveDistance', 'VeryActiveMinutes',
+    'FairlyActiveMinutes', 'LightlyActiveMinutes', 'SedentaryMinutes', 'Calories'
+]
+DEFAULT_START_DATE = "2016-03-25"
+DEFAULT_USERS_PER_CHUNK = 1000
+NON_WEAR_RATE = 0.13
+LOGGED_ACTIVITY_RATE = 0.05
+
+
+def _activity_dates(start_date, n_days):
+    # Mesmo formato do arquivo do Fitbit (M/D/AAAA), formatado uma vez por dia
+    dates = pd.date_range(start_date, periods=n_days, freq="D")
+    return np.array([f"{d.month}/{d.day}/{d.year}" for d in dates], dtype=object)
+
+
+def _generate_chunk(rng, user_ids, dates):
+    n_users, n_days = len(user_ids), len(dates)
+    n = n_users * n_days
+
+    # Parâmetros por usuário, repetidos para cada um dos seus dias
+    mean_steps = np.repeat(rng.gamma(2.4, 3130.0, n_users), n_days)
+    stride_km = np.repeat(rng.normal(0.00071, 0.00006, n_users).clip(0.0005, 0.001), n_days)
+    bmr = np.repeat(rng.normal(1800.0, 280.0, n_users).clip(1200, 3000), n_days)
+    intensity = np.repeat(rng.gamma(1.5, 1 / 1.5, n_users), n_days)
+
+    worn = rng.random(n) >= NON_WEAR_RATE
+    steps = np.where(worn, np.round(mean_steps * rng.gamma(3.0, 1 / 3.0, n)), 0).astype(np.int64)
+
+    very_min = np.where(worn, rng.poisson(intensity * np.clip(steps - 3000, 0, None) / 300.0), 0)
+    fairly_min = np.where(worn, rng.poisson(very_min * 0.3 + 10.0), 0)
+    light_min = np.where(worn, rng.poisson(steps * 0.022 * rng.gamma(3.0, 1 / 3.0, n) + 30.0), 0)
+    active_min = very_min + fairly_min + light_min
+    # Cerca de metade dos dias tem sono registrado fora dos minutos sedentários
+    sleep_min = np.where(rng.random(n) < 0.5, rng.normal(420.0, 60.0, n).clip(0), 0.0)
+    sedentary_min = np.where(worn, np.clip(1440 - active_min - sleep_min, 0, 1440), 1440).astype(np.int64)
+
+    total_distance = np.round(steps * stride_km, 2)
+    logged = np.where(rng.random(n) < LOGGED_ACTIVITY_RATE, np.round(rng.exponential(2.0, n), 2), 0.0)
+    logged = np.minimum(logged, total_distance)
+
+    # Distâncias por intensidade, proporcionais aos minutos e somando a total
+    raw = np.stack([very_min * 0.071, fairly_min * 0.037, light_min * 0.017])
+    share = np.divide(raw, raw.sum(axis=0), out=np.zeros_like(raw), where=raw.sum(axis=0) > 0)
+    very_dist, moderate_dist, light_dist = np.round(share * total_distance, 2)
+    sedentary_dist = np.where(worn & (rng.random(n) < 0.05), 0.01, 0.0)
+
+    calories = np.round(bmr + 0.045 * steps + 4.0 * very_min + rng.normal(0.0, 150.0, n)).clip(0).astype(np.int64)
+
+    return pd.DataFrame({
+        'Id': np.repeat(user_ids, n_days),
+        'ActivityDate': np.tile(dates, n_users),
+        'TotalSteps': steps,
+        'TotalDistance': total_distance,
+        'TrackerDistance': total_distance,
+        'LoggedActivitiesDistance': logged,
+        'VeryActiveDistance': very_dist,
+        'ModeratelyActiveDistance': moderate_dist,
+        'LightActiveDistance': light_dist,
+        'SedentaryActiveDistance': sedentary_dist,
+        'VeryActiveMinutes': very_min.astype(np.int64),
+        'FairlyActiveMinutes': fairly_min.astype(np.int64),
+        'LightlyActiveMinutes': light_min.astype(np.int64),
+        'SedentaryMinutes': sedentary_min,
+        'Calories': calories,
+    }, columns=CSV_COLUMNS)
+
+
+def iter_daily_activity(n_users, n_days, seed=42, start_date=DEFAULT_START_DATE,
+                        users_per_chunk=DEFAULT_USERS_PER_CHUNK):
+    """Gera os dados em blocos de `users_per_chunk` usuários (n_days linhas cada)."""
+    dates = _activity_dates(start_date, n_days)
+    # Ids de 10 dígitos, únicos e estáveis para a mesma semente
+    id_rng = np.random.default_rng([seed, 0])
+    user_ids = 1_000_000_000 + id_rng.choice(8_999_999_999, size=n_users, replace=False)
+    for i, start in enumerate(range(0, n_users, users_per_chunk)):
+        rng = np.random.default_rng([seed, i + 1])
+        yield _generate_chunk(rng, user_ids[start:start + users_per_chunk], dates)
+
+
+def generate_daily_activity(n_users, n_days, seed=42, start_date=DEFAULT_START_DATE,
+                            users_per_chunk=DEFAULT_USERS_PER_CHUNK):
+    """DataFrame com n_users * n_days linhas no formato do CSV original."""
+    chunks = list(iter_daily_activity(n_users, n_days, seed, start_date, users_per_chunk))
+    if not chunks:
+        return pd.DataFrame(columns=CSV_COLUMNS)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def write_daily_activity_csv(path, n_users, n_days, seed=42, start_date=DEFAULT_START_DATE,
+                             users_per_chunk=DEFAULT_USERS_PER_CHUNK):
+    """Grava o CSV bloco a bloco (sem manter tudo em memória); retorna o número de linhas."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    total_rows = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for i, chunk in enumerate(iter_daily_activity(n_users, n_days, seed, start_date, users_per_chunk)):
+            chunk.to_csv(f, header=(i == 0), index=False)
+            total_rows += len(chunk)
+    return total_rows
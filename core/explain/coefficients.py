@@ -1,6 +1,18 @@
+import threading
+import weakref
+
 import numpy as np
 import pandas as pd
 
+from core.monitoring.timing import timed
+
+# Nomes das features transformadas, resolvidos uma vez por modelo:
+# por versão registrada (quando informada) ou pelo próprio objeto do pipeline.
+_names_by_version = {}
+_names_by_model = weakref.WeakKeyDictionary()
+_names_lock = threading.Lock()
+
+
 def _feature_names_from_preprocess(pre, original_cols):
     pre_step = pre.named_steps["pre"]
     num_cols = pre_step.transformers_[0][2]
@@ -10,26 +22,60 @@ def _feature_names_from_preprocess(pre, original_cols):
     cat_feature_names = ohe.get_feature_names_out(cat_cols).tolist()
     return out + cat_feature_names
 
-def extract_logit_importances(model_pipe, X_train):
-    pre = model_pipe.named_steps["pre"]
-    X_transformed = pre.transform(X_train)
-    
+
+def _feature_names_from_transformers(pre, original_cols):
     if hasattr(pre, "get_feature_names_out"):
-        feature_names = pre.get_feature_names_out(X_train.columns)
-    else:
-        feature_names = []
-        for name, transformer, cols in pre.transformers_:
-            if hasattr(transformer, "get_feature_names_out"):
-                feature_names.extend(transformer.get_feature_names_out(cols))
-            else:
-                feature_names.extend(cols)
-    
+        return list(pre.get_feature_names_out(original_cols))
+    feature_names = []
+    for name, transformer, cols in pre.transformers_:
+        if hasattr(transformer, "get_feature_names_out"):
+            feature_names.extend(transformer.get_feature_names_out(cols))
+        else:
+            feature_names.extend(cols)
+    return feature_names
+
+
+def feature_names(model_pipe, original_cols=None, version=None, resolver=_feature_names_from_preprocess):
+    """
+    Nomes das colunas que saem do passo "pre" do pipeline, em cache.
+
+    Com `version` (versão do registro de modelos) o cache vale para qualquer
+    objeto carregado daquela versão; sem ela, para o objeto `model_pipe`.
+    """
+    key = (version, resolver.__name__)
+    with _names_lock:
+        cached = _names_by_version.get(key) if version is not None else _names_by_model.get(model_pipe, {}).get(key)
+    if cached is not None:
+        return cached
+
+    pre = model_pipe.named_steps["pre"]
+    if original_cols is None:
+        original_cols = getattr(pre, "feature_names_in_", None)
+    names = list(resolver(pre, original_cols))
+    with _names_lock:
+        if version is not None:
+            _names_by_version[key] = names
+        else:
+            _names_by_model.setdefault(model_pipe, {})[key] = names
+    return names
+
+
+def clear_feature_name_cache():
+    with _names_lock:
+        _names_by_version.clear()
+        _names_by_model.clear()
+
+
+@timed()
+def extract_logit_importances(model_pipe, X_train, version=None):
+    names = feature_names(model_pipe, X_train.columns, version, resolver=_feature_names_from_transformers)
+
     clf = model_pipe.named_steps["clf"]
     coefs = clf.coef_.ravel()
     odds = np.exp(coefs)
-    
+
     df = pd.DataFrame({
-        "feature": feature_names,
+        "feature": names,
         "coef": coefs,
         "odds_ratio": odds
     })
@@ -37,9 +83,62 @@ def extract_logit_importances(model_pipe, X_train):
     return df.sort_values("abs_coef", ascending=False).drop(columns="abs_coef")
 
 
-def extract_linear_importances(model_pipe, original_cols, pre):
+@timed()
+def extract_linear_importances(model_pipe, original_cols, pre, version=None):
+    reg = model_pipe.named_steps["reg"]
+    names = feature_names(model_pipe, original_cols, version)
+    coefs = reg.coef_.ravel()
+    df = pd.DataFrame({"feature": names, "coef": coefs, "abs_coef": np.abs(coefs)})
+    return df.sort_values("abs_coef", ascending=False)
+
+
+@timed()
+def explain_predictions(model_pipe, X, version=None, as_frame=True):
+    """
+    Contribuição de cada feature em cada previsão de um modelo linear
+    (coeficiente x valor transformado).
+
+    Uma única transformação do lote e um produto elemento a elemento com
+    os coeficientes (esparso quando a saída do pré-processamento é
+    esparsa). A soma de cada linha mais o intercepto é a previsão.
+    Com as_frame=False retorna (matriz, nomes das features, intercepto).
+    """
+    from scipy import sparse
+
+    pre = model_pipe.named_steps["pre"]
     reg = model_pipe.named_steps["reg"]
-    feature_names = _feature_names_from_preprocess(model_pipe.named_steps["pre"], original_cols)
+    cols = getattr(model_pipe, "feature_names_in_", None)
+    if cols is not None:
+        X = X[list(cols)]
+
+    Xt = pre.transform(X)
     coefs = reg.coef_.ravel()
-    df = pd.DataFrame({"feature": feature_names, "coef": coefs, "abs_coef": np.abs(coefs)})
-    return df.sort_values("abs_coef", ascending=False)
\ No newline at end of file
+    contributions = Xt.multiply(coefs).tocsr() if sparse.issparse(Xt) else np.asarray(Xt) * coefs
+    intercept = float(np.ravel(reg.intercept_)[0])
+    names = feature_names(model_pipe, X.columns, version)
+    if not as_frame:
+        return contributions, names, intercept
+
+    dense = contributions.toarray() if sparse.issparse(contributions) else contributions
+    df = pd.DataFrame(dense, columns=names, index=X.index)
+    df["Intercept"] = intercept
+    df["Prediction"] = dense.sum(axis=1) + intercept
+    return df
+
+
+def top_contributions(contributions, k=3):
+    """
+    As k features de maior contribuição absoluta em cada linha, em formato
+    longo (row, rank, feature, contribution), sem laço por linha.
+    """
+    values = contributions.drop(columns=["Intercept", "Prediction"], errors="ignore")
+    matrix = values.to_numpy()
+    k = min(k, matrix.shape[1])
+    order = np.argsort(-np.abs(matrix), axis=1)[:, :k]
+    rows = np.repeat(np.arange(len(matrix)), k)
+    return pd.DataFrame({
+        "row": values.index.to_numpy()[rows],
+        "rank": np.tile(np.arange(1, k + 1), len(matrix)),
+        "feature": values.columns.to_numpy()[order.ravel()],
+        "contribution": matrix[rows, order.ravel()],
+    })
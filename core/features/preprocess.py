@@ -4,11 +4,14 @@ from sklearn.compose import ColumnTransformer
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 from sklearn.impute import SimpleImputer
 
+from core.monitoring.timing import timed
+
 def infer_cols(df):
     num_cols = df.select_dtypes(include=[np.number]).columns.tolist()
     cat_cols = [c for c in df.columns if c not in num_cols]
     return num_cols, cat_cols
 
+@timed()
 def make_preprocess_pipeline(X_df):
     num_cols, cat_cols = infer_cols(X_df)
 
@@ -0,0 +1,213 @@
+"""
+Feature store por usuário, entre a SOT e a SPEC.
+
+Para cada (Id, ActivityDate) guarda médias móveis dos 7 dias anteriores,
+a linha de base do usuário (média de todos os dias anteriores), o desvio
+do dia em relação a ela e a sequência de dias consecutivos com a meta de
+passos. As colunas MODEL_FEATURE_COLUMNS são copiadas para as SPEC de
+treino e de previsão, onde entram no treino e na pontuação. As funções
+recebem uma conexão SQLite e não fazem commit.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+from core.monitoring.timing import timed
+
+FEATURE_TABLE = "feature_store_daily_activity"
+WINDOW_DAYS = 7
+GOAL_STEPS = 10000
+
+# Coluna da feature -> coluna da SOT usada na média móvel
+ROLLING_FEATURES = {
+    'Steps7dMean': 'TotalSteps',
+    'ActiveMinutes7dMean': 'TotalActiveMinutes',
+    'Calories7dMean': 'Calories',
+}
+FEATURE_COLUMNS = [
+    'Id', 'ActivityDate', 'Steps7dMean', 'ActiveMinutes7dMean', 'Calories7dMean',
+    'StepsBaseline', 'StepsDeviation', 'GoalStreak', 'DaysObserved', 'CumSteps'
+]
+# Features usadas pelos modelos (CumSteps só serve para continuar os acumulados)
+MODEL_FEATURE_COLUMNS = [
+    'Steps7dMean', 'ActiveMinutes7dMean', 'Calories7dMean',
+    'StepsBaseline', 'StepsDeviation', 'GoalStreak', 'DaysObserved'
+]
+HISTORY_COLUMNS = ['Id', 'ActivityDate'] + list(dict.fromkeys(ROLLING_FEATURES.values()))
+
+
+def compute_features(history, start_dates=None, seeds=None):
+    """
+    Calcula as features para as linhas de `history` (colunas HISTORY_COLUMNS).
+
+    Sem `start_dates` todas as linhas são calculadas a partir do zero. Com
+    `start_dates` (Series Id -> primeira data a calcular), as linhas
+    anteriores servem apenas de contexto para as janelas móveis, e `seeds`
+    (DataFrame indexado por Id com ActivityDate, CumSteps, DaysObserved e
+    GoalStreak da última linha já gravada antes do início) continua os
+    acumulados. Tudo é vetorizado por groupby sobre os usuários.
+    """
+    h = history.copy()
+    h['Id'] = h['Id'].astype('int64')
+    h['ActivityDate'] = pd.to_datetime(h['ActivityDate'])
+    h = h.sort_values(['Id', 'ActivityDate'], kind='stable').reset_index(drop=True)
+
+    # Janela dos 7 dias anteriores (sem o próprio dia), por calendário
+    sources = list(dict.fromkeys(ROLLING_FEATURES.values()))
+    rolled = (
+        h.set_index('ActivityDate')
+        .groupby('Id', sort=True)[sources]
+        .rolling(f'{WINDOW_DAYS}D', closed='left')
+        .mean()
+    )
+    out = h[['Id', 'ActivityDate']].copy()
+    for feature, source in ROLLING_FEATURES.items():
+        out[feature] = rolled[source].to_numpy()
+
+    if start_dates is not None:
+        target = (h['ActivityDate'] >= h['Id'].map(pd.to_datetime(start_dates))).to_numpy()
+        out, h = out[target], h[target]
+    if seeds is None:
+        seeds = pd.DataFrame(columns=['ActivityDate', 'CumSteps', 'DaysObserved', 'GoalStreak'])
+    # Semente de cada linha (a do seu usuário), alinhada ao índice de h
+    seed = seeds.reindex(h['Id'].to_numpy()).set_axis(h.index)
+    seed_date = pd.to_datetime(seed['ActivityDate'])
+    seed_cum = seed['CumSteps'].astype('float64').fillna(0.0)
+    seed_days = seed['DaysObserved'].astype('float64').fillna(0.0)
+    seed_streak = seed['GoalStreak'].astype('float64').fillna(0.0)
+
+    # Acumulados (expanding) continuando de onde a semente parou
+    by_user = h.groupby('Id', sort=False)
+    steps = h['TotalSteps'].astype('float64')
+    cum_steps = seed_cum + steps.groupby(h['Id'], sort=False).cumsum()
+    days = seed_days + by_user.cumcount() + 1
+    prev_days = days - 1
+    out['StepsBaseline'] = (cum_steps - steps) / prev_days.where(prev_days > 0)
+    out['StepsDeviation'] = steps - out['StepsBaseline']
+    out['DaysObserved'] = days.astype('int64')
+    out['CumSteps'] = cum_steps
+
+    # Sequência de dias consecutivos com a meta de passos
+    goal = (steps >= GOAL_STEPS).to_numpy()
+    first_row = (h['Id'] != h['Id'].shift()).to_numpy()
+    prev_date = by_user['ActivityDate'].shift().fillna(seed_date)
+    consecutive = ((h['ActivityDate'] - prev_date) == pd.Timedelta(days=1)).to_numpy()
+    prev_goal = np.where(first_row, seed_streak.to_numpy() > 0, np.roll(goal, 1))
+    starts = goal & (first_row | ~consecutive | ~prev_goal)
+    run = np.cumsum(starts)
+    offset = np.where(starts & first_row & consecutive, seed_streak.to_numpy(), 0.0)
+    offset = pd.Series(offset).groupby(run).transform('first').to_numpy()
+    position = pd.Series(np.ones(len(h))).groupby(run).cumsum().to_numpy()
+    out['GoalStreak'] = np.where(goal, position + offset, 0).astype('int64')
+
+    out['ActivityDate'] = out['ActivityDate'].dt.strftime('%Y-%m-%d')
+    return out[FEATURE_COLUMNS].reset_index(drop=True)
+
+
+def _write_features(conn, features):
+    placeholders = ", ".join("?" for _ in FEATURE_COLUMNS)
+    features = features.astype(object).where(features.notna(), None)
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {FEATURE_TABLE} ({', '.join(FEATURE_COLUMNS)}) VALUES ({placeholders})",
+        features.itertuples(index=False, name=None),
+    )
+
+
+@timed()
+def rebuild_feature_store(conn):
+    """Recalcula a feature store inteira a partir da SOT."""
+    history = pd.read_sql_query(f"SELECT {', '.join(HISTORY_COLUMNS)} FROM sot_daily_activity", conn)
+    conn.execute(f"DELETE FROM {FEATURE_TABLE}")
+    if history.empty:
+        return 0
+    features = compute_features(history)
+    _write_features(conn, features)
+    return len(features)
+
+
+@timed()
+def update_feature_store(conn, keys):
+    """
+    Atualiza a feature store após upserts na SOT das chaves `keys`
+    (DataFrame com Id e ActivityDate 'YYYY-MM-DD').
+
+    Para cada usuário afetado, só as linhas a partir da menor data alterada
+    são recalculadas, usando os 7 dias anteriores da SOT como contexto e a
+    última linha já gravada como semente dos acumulados. Essas datas
+    iniciais ficam na tabela temporária feature_store_starts (Id,
+    StartDate) da conexão, para quem precisa regravar as mesmas linhas.
+    """
+    if keys.empty:
+        return 0
+    starts = keys.groupby('Id')['ActivityDate'].min()
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS feature_store_starts (Id INTEGER PRIMARY KEY, StartDate TEXT)")
+    conn.execute("DELETE FROM feature_store_starts")
+    conn.executemany(
+        "INSERT INTO feature_store_starts (Id, StartDate) VALUES (?, ?)",
+        ((int(i), d) for i, d in starts.items()),
+    )
+
+    history = pd.read_sql_query(f"""
+        SELECT {', '.join('s.' + c for c in HISTORY_COLUMNS)}
+        FROM sot_daily_activity s
+        JOIN feature_store_starts k ON k.Id = s.Id
+        WHERE s.ActivityDate >= date(k.StartDate, '-{WINDOW_DAYS} days')
+    """, conn)
+    seeds = pd.read_sql_query(f"""
+        SELECT f.Id, f.ActivityDate, f.CumSteps, f.DaysObserved, f.GoalStreak
+        FROM {FEATURE_TABLE} f
+        JOIN feature_store_starts k ON k.Id = f.Id
+        WHERE f.ActivityDate = (
+            SELECT MAX(f2.ActivityDate) FROM {FEATURE_TABLE} f2
+            WHERE f2.Id = k.Id AND f2.ActivityDate < k.StartDate
+        )
+    """, conn).set_index('Id')
+
+    conn.execute(f"""
+        DELETE FROM {FEATURE_TABLE}
+        WHERE EXISTS (
+            SELECT 1 FROM feature_store_starts k
+            WHERE k.Id = {FEATURE_TABLE}.Id AND {FEATURE_TABLE}.ActivityDate >= k.StartDate
+        )
+    """)
+    if history.empty:
+        return 0
+    features = compute_features(history, start_dates=starts, seeds=seeds)
+    _write_features(conn, features)
+    return len(features)
+
+
+@timed()
+def compute_batch_features(conn, batch):
+    """
+    MODEL_FEATURE_COLUMNS para as linhas de `batch` (com HISTORY_COLUMNS e
+    datas 'YYYY-MM-DD'), dias que não estão na SOT, como o lote de previsão.
+
+    O histórico de cada usuário na SOT entra como contexto das janelas e dos
+    acumulados; numa chave presente nos dois, vale a linha do lote. Retorna
+    um DataFrame com o índice de `batch`; linhas sem Id ou sem data ficam
+    com as features vazias.
+    """
+    if 'Id' in batch.columns:
+        ids = pd.to_numeric(batch['Id'].astype(object), errors='coerce')
+    else:
+        ids = pd.Series(np.nan, index=batch.index)
+    valid = ids.notna() & batch['ActivityDate'].notna()
+    result = pd.DataFrame(np.nan, index=batch.index, columns=MODEL_FEATURE_COLUMNS)
+    if not valid.any():
+        return result
+
+    rows = batch.loc[valid, HISTORY_COLUMNS].assign(Id=ids[valid].astype('int64'))
+    history = pd.read_sql_query(
+        f"SELECT {', '.join(HISTORY_COLUMNS)} FROM sot_daily_activity "
+        "WHERE Id IN (SELECT value FROM json_each(?))",
+        conn, params=(json.dumps(sorted(int(i) for i in rows['Id'].unique())),),
+    )
+    combined = pd.concat([history, rows], ignore_index=True)
+    combined = combined.drop_duplicates(subset=['Id', 'ActivityDate'], keep='last')
+    features = compute_features(combined).set_index(['Id', 'ActivityDate'])
+
+    keys = pd.MultiIndex.from_frame(rows[['Id', 'ActivityDate']])
+    result.loc[valid, MODEL_FEATURE_COLUMNS] = features.reindex(keys)[MODEL_FEATURE_COLUMNS].to_numpy()
+    return result
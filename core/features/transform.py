@@ -0,0 +1,145 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from core.data.schema import ACTIVITY_LEVELS
+
+# Intervalos do pd.cut: (0, 5000], (5000, 10000], (10000, inf)
+ACTIVITY_LEVEL_BINS = [0, 5000, 10000, float('inf')]
+
+RAW_NUMERIC_COLUMNS = [
+    'TotalSteps', 'TotalDistance', 'TrackerDistance', 'LoggedActivitiesDistance',
+    'VeryActiveDistance', 'ModeratelyActiveDistance', 'LightActiveDistance',
+    'SedentaryActiveDistance', 'VeryActiveMinutes', 'FairlyActiveMinutes',
+    'LightlyActiveMinutes', 'SedentaryMinutes', 'Calories'
+]
+DERIVED_NUMERIC_COLUMNS = ['TotalActiveMinutes', 'ActivityRatio', 'CaloriesPerStep']
+# Colunas cujos valores ausentes são preenchidos com a média vista no ajuste
+FILL_COLUMNS = RAW_NUMERIC_COLUMNS + DERIVED_NUMERIC_COLUMNS
+
+# Definição das features derivadas, lida por derive() (pandas) e por
+# derive_sql() (ETL SOR -> SOT no SQLite), para que as duas engines não
+# tenham cópias próprias das fórmulas.
+TOTAL_ACTIVE_PARTS = ['VeryActiveMinutes', 'FairlyActiveMinutes', 'LightlyActiveMinutes']
+# Razão -> (numerador, denominador); denominador zero vira 1 (evita divisão por zero)
+RATIO_FEATURES = {
+    'ActivityRatio': ('TotalActiveMinutes', 'SedentaryMinutes'),
+    'CaloriesPerStep': ('Calories', 'TotalSteps'),
+}
+LEVEL_SOURCE = 'TotalSteps'
+
+
+class ActivityFeatureTransformer:
+    """
+    Derivação das features de atividade (SOR -> SOT) com estatísticas fixas.
+
+    fit/partial_fit acumulam somas e contagens de cada coluna numérica (já
+    com as derivadas), de modo que o ajuste pode ser feito em blocos ou a
+    partir de médias calculadas no SQLite (set_fill_values). transform
+    calcula TotalActiveMinutes, ActivityRatio, CaloriesPerStep e
+    ActivityLevel e preenche ausentes com as médias do ajuste, devolvendo um
+    novo DataFrame sem alterar o recebido. O estado é serializável em JSON
+    (to_dict/from_dict) para ser guardado junto com o modelo.
+    """
+
+    def __init__(self, bins=None, labels=None):
+        self.bins = list(ACTIVITY_LEVEL_BINS if bins is None else bins)
+        self.labels = list(ACTIVITY_LEVELS if labels is None else labels)
+        self._reset()
+
+    def _reset(self):
+        self.n_seen_ = 0
+        self.sums_ = {}
+        self.counts_ = {}
+        self.fill_values_ = {}
+
+    def derive(self, df):
+        """Colunas derivadas de `df` (dicionário nome -> Series), sem alterar `df`."""
+        derived = {'TotalActiveMinutes': sum(df[c] for c in TOTAL_ACTIVE_PARTS)}
+        for name, (numerator, denominator) in RATIO_FEATURES.items():
+            values = derived[numerator] if numerator in derived else df[numerator]
+            derived[name] = values / df[denominator].replace(0, 1)
+        derived['ActivityLevel'] = pd.cut(df[LEVEL_SOURCE], bins=self.bins, labels=self.labels)
+        return derived
+
+    def derive_sql(self):
+        """
+        As mesmas colunas de derive() como expressões SQL sobre as colunas da
+        SOR (dicionário nome -> expressão), para o ETL dentro do SQLite.
+        """
+        derived = {'TotalActiveMinutes': "(" + " + ".join(TOTAL_ACTIVE_PARTS) + ")"}
+        for name, (numerator, denominator) in RATIO_FEATURES.items():
+            values = derived.get(numerator, numerator)
+            derived[name] = f"{values} * 1.0 / CASE WHEN {denominator} = 0 THEN 1 ELSE {denominator} END"
+        # pd.cut com right=True: cada faixa é (início, fim]; fora delas, NULL
+        cases = []
+        for low, high, label in zip(self.bins[:-1], self.bins[1:], self.labels):
+            condition = f"{LEVEL_SOURCE} > {low!r}"
+            if np.isfinite(high):
+                condition += f" AND {LEVEL_SOURCE} <= {high!r}"
+            quoted = "'" + str(label).replace("'", "''") + "'"
+            cases.append(f"WHEN {condition} THEN {quoted}")
+        derived['ActivityLevel'] = "CASE " + " ".join(cases) + " END"
+        return derived
+
+    def partial_fit(self, df):
+        """Acumula as médias de um bloco de linhas SOR."""
+        derived = self.derive(df)
+        for col in FILL_COLUMNS:
+            values = derived[col] if col in derived else df.get(col)
+            if values is None:
+                continue
+            values = pd.to_numeric(values, errors='coerce').to_numpy(dtype='float64')
+            mask = ~np.isnan(values)
+            self.sums_[col] = self.sums_.get(col, 0.0) + float(values[mask].sum())
+            self.counts_[col] = self.counts_.get(col, 0) + int(mask.sum())
+        self.n_seen_ += len(df)
+        self.fill_values_ = {
+            col: self.sums_[col] / self.counts_[col] for col in self.sums_ if self.counts_[col]
+        }
+        return self
+
+    def fit(self, df):
+        self._reset()
+        return self.partial_fit(df)
+
+    def set_fill_values(self, values):
+        """Substitui médias de preenchimento (ex.: AVG da SOT calculado no SQLite)."""
+        self.fill_values_.update({col: float(v) for col, v in dict(values).items() if pd.notna(v)})
+        return self
+
+    def transform(self, df):
+        """Novo DataFrame com as colunas derivadas e os ausentes preenchidos."""
+        out = df.assign(**self.derive(df))
+        fill = {col: v for col, v in self.fill_values_.items() if col in out.columns}
+        if fill and out[list(fill)].isna().any().any():
+            out = out.fillna(value=fill)
+        return out
+
+    def fit_transform(self, df):
+        return self.fit(df).transform(df)
+
+    def to_dict(self):
+        return {
+            "bins": [b if np.isfinite(b) else "inf" for b in self.bins],
+            "labels": self.labels,
+            "n_seen": self.n_seen_,
+            "fill_values": self.fill_values_,
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        transformer = cls(bins=[float(b) for b in state["bins"]], labels=state["labels"])
+        transformer.n_seen_ = state.get("n_seen", 0)
+        transformer.fill_values_ = dict(state.get("fill_values", {}))
+        return transformer
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
@@ -0,0 +1,302 @@
+import hashlib
+import json
+import os
+import pickle
+import socket
+import threading
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from core.data.cache import frame_fingerprint
+from core.data.database import RUNTIME_DB_NAME, ensure_runtime_tables, runtime_connection, runtime_transaction
+from core.monitoring.timing import stage
+
+ACTIVE_STATUSES = ("pending", "running")
+FINISHED_STATUSES = ("done", "failed", "interrupted")
+# Conteúdo enviado a cada job (DataFrame dos uploads), ao lado do banco de
+# execução, para que jobs pendentes sejam retomados após um reinício
+PAYLOAD_DIR = os.environ.get("FITBIT_JOBS_DIR", os.path.splitext(RUNTIME_DB_NAME)[0] + "_jobs")
+# O runner dono renova HeartbeatAt dos seus jobs ativos a cada HEARTBEAT_SECONDS;
+# sem renovação há STALE_SECONDS, o dono é dado como morto
+HEARTBEAT_SECONDS = 15
+STALE_SECONDS = 60
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _owner_is_dead(owner):
+    """
+    True se `owner` ("host:pid:instância") é um processo desta máquina que
+    não existe mais. Em outra máquina (ou no Windows, onde os.kill(pid, 0)
+    não é uma simples consulta) só o heartbeat decide.
+    """
+    try:
+        host, pid, _ = owner.rsplit(":", 2)
+        pid = int(pid)
+    except (AttributeError, ValueError):
+        return False
+    if host != socket.gethostname() or os.name == "nt":
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False
+    return False
+
+
+def _json_default(value):
+    # Escalares numpy/pandas e datas que aparecem em métricas e tabelas
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def payload_fingerprint(payload):
+    """Hash do conteúdo enviado ao job (DataFrame ou bytes), para deduplicação."""
+    if payload is None:
+        return ""
+    if isinstance(payload, pd.DataFrame):
+        return frame_fingerprint(payload)
+    return hashlib.sha256(bytes(payload)).hexdigest()
+
+
+def dedupe_key(kind, params, payload=None):
+    encoded = json.dumps(params or {}, sort_keys=True, default=_json_default)
+    return hashlib.sha256(f"{kind}|{encoded}|{payload_fingerprint(payload)}".encode("utf-8")).hexdigest()
+
+
+class JobRunner:
+    """
+    Executa jobs de ETL/treino fora da thread do script do Streamlit.
+
+    A fila e o estado (estágio, progresso, resultado) ficam na tabela `jobs`
+    do banco de execução, de modo que qualquer sessão consegue consultar um
+    job pelo id. O conteúdo de cada job é gravado em PAYLOAD_DIR até ele
+    terminar: após um reinício, resume() reenfileira os jobs que estavam
+    pendentes ou em execução (estes recomeçam do início; as tarefas de ETL
+    e treino podem ser repetidas). Cada job guarda o runner dono (Owner) e
+    um heartbeat renovado por ele; só jobs de donos mortos ou sem heartbeat
+    recente são retomados, de modo que outro processo do Streamlit ligado
+    ao mesmo banco de execução não repete jobs ainda vivos. Com
+    max_workers=1 os jobs que gravam no fitness_tracker.db rodam um de cada
+    vez, em vez de disputarem o arquivo entre sessões. Um job idêntico (mesmo tipo, parâmetros e conteúdo) ainda
+    pendente ou em execução não é enfileirado de novo: o id existente é
+    devolvido.
+    """
+
+    def __init__(self, max_workers=1, payload_dir=PAYLOAD_DIR, heartbeat_seconds=HEARTBEAT_SECONDS,
+                 stale_seconds=STALE_SECONDS):
+        self._tasks = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fitbit-job")
+        self.payload_dir = payload_dir
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.heartbeat_seconds = heartbeat_seconds
+        self.stale_seconds = stale_seconds
+        ensure_runtime_tables()
+        with runtime_transaction() as conn:
+            # Bancos criados antes de as colunas existirem
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for col in ("PayloadPath", "Owner", "HeartbeatAt"):
+                if col not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {col} TEXT")
+        self._stopped = threading.Event()
+        self._heartbeat_thread = threading.Thread(target=self._heartbeat, name="fitbit-job-heartbeat", daemon=True)
+        self._heartbeat_thread.start()
+
+    def register(self, kind, func):
+        """Associa um tipo de job a func(params, payload, progress) -> dict."""
+        self._tasks[kind] = func
+
+    def submit(self, kind, params=None, payload=None):
+        """Enfileira um job e retorna seu id (ou o de um job idêntico ainda ativo)."""
+        if kind not in self._tasks:
+            raise ValueError(f"Tipo de job desconhecido: {kind}")
+        key = dedupe_key(kind, params, payload)
+        with self._lock:
+            with runtime_transaction() as conn:
+                row = conn.execute(
+                    "SELECT JobId FROM jobs WHERE DedupeKey = ? AND Status IN ('pending', 'running')",
+                    (key,),
+                ).fetchone()
+                if row is not None:
+                    return row[0]
+                job_id = uuid.uuid4().hex
+                payload_path = self._write_payload(job_id, payload)
+                conn.execute(
+                    "INSERT INTO jobs (JobId, Kind, DedupeKey, Params, Status, Stage, CreatedAt, PayloadPath, "
+                    "Owner, HeartbeatAt) VALUES (?, ?, ?, ?, 'pending', 'Na fila', ?, ?, ?, ?)",
+                    (job_id, kind, key, json.dumps(params or {}, default=_json_default), _now(), payload_path,
+                     self.owner, _now()),
+                )
+        self._executor.submit(self._run, job_id, kind, params or {}, payload)
+        return job_id
+
+    def resume(self):
+        """
+        Reenfileira os jobs pendentes ou em execução deixados por um processo
+        que morreu: dono desta máquina sem processo vivo, ou sem heartbeat
+        há mais de `stale_seconds`. Chamar depois de registrar as tarefas.
+        Cada job é assumido com uma troca atômica de dono, então dois
+        processos não retomam o mesmo job. Jobs de tipo desconhecido ou cujo
+        conteúdo não foi encontrado ficam como 'interrupted'. Retorna os ids
+        reenfileirados.
+        """
+        cutoff = (datetime.now() - timedelta(seconds=self.stale_seconds)).isoformat(timespec="seconds")
+        with runtime_connection() as conn:
+            rows = conn.execute(
+                "SELECT JobId, Kind, Params, PayloadPath, Owner, HeartbeatAt FROM jobs "
+                "WHERE Status IN ('pending', 'running') ORDER BY CreatedAt"
+            ).fetchall()
+        resumed = []
+        for job_id, kind, params, payload_path, owner, heartbeat_at in rows:
+            if owner == self.owner:
+                continue
+            if heartbeat_at is not None and heartbeat_at >= cutoff and not _owner_is_dead(owner):
+                continue
+            if kind not in self._tasks:
+                fields = {"Status": "interrupted", "Error": f"Tipo de job desconhecido: {kind}", "FinishedAt": _now()}
+            elif payload_path is not None and not os.path.exists(payload_path):
+                fields = {"Status": "interrupted", "Error": "Conteúdo do job não encontrado após o reinício",
+                          "FinishedAt": _now()}
+            else:
+                fields = {"Status": "pending", "Stage": "Retomado após reinício", "Progress": 0.0}
+            if not self._claim(job_id, owner, heartbeat_at, **fields):
+                continue
+            if fields["Status"] == "pending":
+                self._executor.submit(self._run, job_id, kind, json.loads(params) if params else {}, None, payload_path)
+                resumed.append(job_id)
+        return resumed
+
+    def _claim(self, job_id, owner, heartbeat_at, **fields):
+        """Assume o job se dono e heartbeat ainda são os lidos (troca atômica)."""
+        fields.update(Owner=self.owner, HeartbeatAt=_now())
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with runtime_transaction() as conn:
+            cursor = conn.execute(
+                f"UPDATE jobs SET {columns} WHERE JobId = ? AND Status IN ('pending', 'running') "
+                "AND Owner IS ? AND HeartbeatAt IS ?",
+                (*fields.values(), job_id, owner, heartbeat_at),
+            )
+        return cursor.rowcount == 1
+
+    def _heartbeat(self):
+        while not self._stopped.wait(self.heartbeat_seconds):
+            try:
+                with runtime_transaction() as conn:
+                    conn.execute(
+                        "UPDATE jobs SET HeartbeatAt = ? WHERE Owner = ? AND Status IN ('pending', 'running')",
+                        (_now(), self.owner),
+                    )
+            except Exception as e:
+                print(f"Falha ao renovar o heartbeat dos jobs: {e}")
+
+    def _write_payload(self, job_id, payload):
+        if payload is None:
+            return None
+        os.makedirs(self.payload_dir, exist_ok=True)
+        path = os.path.join(self.payload_dir, f"{job_id}.pickle")
+        with open(path, "wb") as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        return path
+
+    def _update(self, job_id, **fields):
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with runtime_transaction() as conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE JobId = ?", (*fields.values(), job_id))
+
+    def _run(self, job_id, kind, params, payload, payload_path=None):
+        with runtime_transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET Status = 'running', StartedAt = ?, HeartbeatAt = ? "
+                "WHERE JobId = ? AND Owner = ? AND Status IN ('pending', 'running')",
+                (_now(), _now(), job_id, self.owner),
+            )
+        if cursor.rowcount != 1:
+            # Assumido por outro processo enquanto estava na fila
+            print(f"Job {job_id} assumido por outro processo; execução local ignorada.")
+            return
+
+        def progress(stage, fraction=None):
+            fields = {"Stage": stage}
+            if fraction is not None:
+                fields["Progress"] = float(min(max(fraction, 0.0), 1.0))
+            self._update(job_id, **fields)
+
+        try:
+            if payload is None and payload_path is not None:
+                with open(payload_path, "rb") as f:
+                    payload = pickle.load(f)
+            # Os estágios instrumentados do job ficam com RunId = id do job
+            with stage(f"job.{kind}", run_id=job_id):
+                result = self._tasks[kind](params, payload, progress)
+        except Exception as e:
+            traceback.print_exc()
+            self._update(job_id, Status="failed", Error=f"{type(e).__name__}: {e}", FinishedAt=_now())
+            self._remove_payload(job_id)
+            return
+        self._remove_payload(job_id)
+        self._update(
+            job_id,
+            Status="done",
+            Stage="Concluído",
+            Progress=1.0,
+            Result=json.dumps(result or {}, default=_json_default),
+            FinishedAt=_now(),
+        )
+
+    def _remove_payload(self, job_id):
+        path = os.path.join(self.payload_dir, f"{job_id}.pickle")
+        if os.path.exists(path):
+            os.remove(path)
+
+    def get(self, job_id):
+        """Estado de um job como dicionário (None se o id não existir)."""
+        with runtime_connection() as conn:
+            cursor = conn.execute("SELECT * FROM jobs WHERE JobId = ?", (job_id,))
+            row = cursor.fetchone()
+            columns = [d[0] for d in cursor.description]
+        if row is None:
+            return None
+        job = dict(zip(columns, row))
+        job["Params"] = json.loads(job["Params"]) if job["Params"] else {}
+        job["Result"] = json.loads(job["Result"]) if job["Result"] else None
+        return job
+
+    def recent(self, limit=20):
+        """Jobs mais recentes, para exibição."""
+        with runtime_connection() as conn:
+            return pd.read_sql_query(
+                "SELECT JobId, Kind, Status, Stage, Progress, Error, CreatedAt, StartedAt, FinishedAt "
+                "FROM jobs ORDER BY CreatedAt DESC LIMIT ?",
+                conn, params=(int(limit),),
+            )
+
+    def shutdown(self, wait=True):
+        self._stopped.set()
+        self._executor.shutdown(wait=wait)
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_runner():
+    """Runner compartilhado pelo processo, com as tarefas padrão registradas."""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            from core.jobs.tasks import register_default_tasks
+
+            _runner = JobRunner()
+            register_default_tasks(_runner)
+            _runner.resume()
+        return _runner
@@ -0,0 +1,118 @@
+from core.data.database import (
+    create_database_and_tables,
+    insert_csv_to_sor,
+    run_etl_sor_to_sot,
+    run_etl_sot_to_spec_train,
+    run_etl_for_predict_data,
+    run_etl_incremental,
+    rebuild_etl_watermark,
+    fit_feature_transformer,
+    load_data,
+)
+from core.data.schema import to_model_input
+from core.explain.coefficients import extract_linear_importances
+from core.features.transform import ActivityFeatureTransformer
+from core.models.registry import MODEL_PATH, load_metadata, save_model
+from core.models.scoring import score_predict_table
+
+TRAINING_MODES = ("simple", "cv", "incremental")
+
+
+def run_training_job(params, df_data, progress):
+    """
+    ETL completo (ou incremental) seguido do treino e registro do modelo.
+
+    params: target, test_size, mode ("simple", "cv" ou "incremental"),
+    cv_folds, cv_jobs e incremental_etl. Retorna métricas, importâncias,
+    resultados da validação cruzada e a versão registrada.
+    """
+    # Módulos de treino (sklearn) só são carregados quando um treino roda
+    from core.features.preprocess import make_preprocess_pipeline
+    from core.models.incremental import train_regressor_incremental
+    from core.models.predict import evaluate_regressor
+    from core.models.train import train_regressor, train_regressor_cv
+
+    target = params.get("target", "Calories")
+    test_size = params.get("test_size", 0.2)
+    mode = params.get("mode", "simple")
+    if mode not in TRAINING_MODES:
+        raise ValueError(f"Modo de treino desconhecido: {mode}")
+
+    if params.get("incremental_etl"):
+        progress("ETL incremental", 0.05)
+        run_etl_incremental(df_data)
+    else:
+        progress("Recriando o banco", 0.05)
+        create_database_and_tables()
+        progress("Carregando SOR", 0.10)
+        insert_csv_to_sor(df_data)
+        progress("ETL SOR -> SOT", 0.20)
+        run_etl_sor_to_sot()
+        progress("ETL SOT -> SPEC", 0.30)
+        run_etl_sot_to_spec_train()
+        rebuild_etl_watermark()
+
+    progress("Treinando o modelo", 0.40)
+    cv_results = None
+    if mode == "incremental":
+        # Lê a SPEC do SQLite em blocos, sem carregá-la inteira
+        model, metrics = train_regressor_incremental(target=target, holdout_every=round(1 / test_size))
+        n_train_rows = metrics.pop("n_train_rows")
+        metrics.pop("n_test_rows", None)
+        feature_names = model.named_steps["pre"].named_steps["pre"].feature_names_in_
+    else:
+        # Datas voltam a categorias de texto, como a pontuação em lote as lê da SPEC
+        df_spec_train = to_model_input(load_data("spec_daily_activity_train"))
+        y = df_spec_train[target]
+        X = df_spec_train.drop(columns=[target])
+        pre = make_preprocess_pipeline(X)
+        if mode == "cv":
+            model, X_test, y_test, cv_results = train_regressor_cv(
+                X, y, pre, test_size=test_size,
+                n_splits=params.get("cv_folds", 5), n_jobs=params.get("cv_jobs", 1),
+            )
+        else:
+            model, X_test, y_test = train_regressor(X, y, pre, test_size=test_size)
+        progress("Avaliando", 0.85)
+        metrics = evaluate_regressor(model, X_test, y_test)
+        n_train_rows = len(X) - len(X_test)
+        feature_names = X.columns
+
+    progress("Registrando o modelo", 0.95)
+    # Estatísticas do ETL de treino, reaplicadas no ETL de previsão
+    transformer = fit_feature_transformer()
+    metadata = save_model(
+        model,
+        metrics=metrics,
+        feature_names=feature_names,
+        n_train_rows=n_train_rows,
+        extra={"target": target, "feature_transformer": transformer.to_dict()},
+    )
+    importances = extract_linear_importances(model, feature_names, None, version=metadata["version"])
+    return {
+        "version": metadata["version"],
+        "target": target,
+        "metrics": metrics,
+        "importances": importances.to_dict(orient="records"),
+        "cv_results": cv_results.to_dict(orient="records") if cv_results is not None else None,
+    }
+
+
+def run_predict_job(params, df_predict, progress):
+    """
+    ETL dos dados de previsão, com o transformador de features salvo junto
+    ao modelo, seguido da pontuação em lote com o modelo ativo.
+    """
+    model_path = params.get("model_path", MODEL_PATH)
+    state = load_metadata(model_path).get("feature_transformer")
+    transformer = ActivityFeatureTransformer.from_dict(state) if state else None
+    progress("ETL dos dados de previsão", 0.10)
+    run_etl_for_predict_data(df_predict, transformer)
+    progress("Pontuando em lote", 0.40)
+    version, n_rows = score_predict_table(model_path, target=params.get("target", "Calories"))
+    return {"version": version, "n_rows": n_rows}
+
+
+def register_default_tasks(runner):
+    runner.register("train", run_training_job)
+    runner.register("predict", run_predict_job)
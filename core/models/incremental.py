@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDRegressor
+from sklearn.pipeline import Pipeline
+
+from core.data.database import db_connection
+from core.features.preprocess import infer_cols, make_preprocess_pipeline
+from core.monitoring.timing import timed
+
+TRAIN_TABLE = "spec_daily_activity_train"
+DEFAULT_CHUNKSIZE = 50_000
+
+
+def _holdout_filter(holdout_every, test):
+    """Divisão treino/teste determinística pelo rowid, sem carregar a tabela."""
+    if not holdout_every:
+        return "1 = 1"
+    op = "=" if test else "!="
+    return f"rowid % {int(holdout_every)} {op} 0"
+
+
+def _iter_chunks(table, chunksize, where="1 = 1", params=()):
+    with db_connection() as conn:
+        yield from pd.read_sql_query(
+            f"SELECT * FROM {table} WHERE {where}", conn, params=params, chunksize=chunksize
+        )
+
+
+def _sql_median(conn, table, col, where, params):
+    """Mediana exata calculada no SQLite (mesma regra do SimpleImputer)."""
+    n = conn.execute(f"SELECT COUNT({col}) FROM {table} WHERE {where}", params).fetchone()[0]
+    if n == 0:
+        return np.nan
+    return conn.execute(f"""
+        SELECT AVG({col}) FROM (
+            SELECT {col} FROM {table}
+            WHERE {col} IS NOT NULL AND {where}
+            ORDER BY {col}
+            LIMIT {2 - n % 2} OFFSET {(n - 1) // 2}
+        )
+    """, params).fetchone()[0]
+
+
+def _sql_categories(conn, table, col, where, params):
+    """Categorias distintas e a mais frequente (empate: a menor, como no SimpleImputer)."""
+    rows = conn.execute(f"""
+        SELECT {col}, COUNT(*) AS n FROM {table}
+        WHERE {col} IS NOT NULL AND {where}
+        GROUP BY {col}
+    """, params).fetchall()
+    if not rows:
+        return [], None
+    mode = sorted(rows, key=lambda r: (-r[1], r[0]))[0][0]
+    return sorted(r[0] for r in rows), mode
+
+
+@timed()
+def fit_streaming_preprocess(table=TRAIN_TABLE, target="Calories", chunksize=DEFAULT_CHUNKSIZE, where="1 = 1", params=()):
+    """
+    Ajusta o pipeline de `make_preprocess_pipeline` sem carregar a tabela.
+
+    Medianas, categorias e modas são calculadas por agregações no SQLite e
+    aplicadas ajustando o ColumnTransformer numa tabela-protótipo com esses
+    valores; o StandardScaler é ajustado com partial_fit bloco a bloco.
+    """
+    sample = next(_iter_chunks(table, 1000, where, params), None)
+    if sample is None or sample.empty:
+        raise ValueError(f"A tabela {table} não tem dados para treino.")
+    sample = sample.drop(columns=[target])
+    num_cols, cat_cols = infer_cols(sample)
+    pre = make_preprocess_pipeline(sample)
+
+    with db_connection() as conn:
+        medians = {col: _sql_median(conn, table, col, where, params) for col in num_cols}
+        categories = {col: _sql_categories(conn, table, col, where, params) for col in cat_cols}
+
+    # Protótipo: cada categoria aparece uma vez e a moda mais de uma vez;
+    # as colunas numéricas repetem a mediana.
+    columns = {}
+    for col, (values, mode) in categories.items():
+        columns[col] = values + [mode] if values else [np.nan, np.nan]
+    n_rows = max([len(v) for v in columns.values()] + [2])
+    for col in cat_cols:
+        values = columns[col]
+        columns[col] = values + [values[-1]] * (n_rows - len(values))
+    for col in num_cols:
+        columns[col] = [medians[col]] * n_rows
+    prototype = pd.DataFrame(columns)[list(sample.columns)].astype(sample.dtypes.to_dict(), errors="ignore")
+
+    column_transformer = pre.named_steps["pre"]
+    column_transformer.fit(prototype)
+
+    scaler = pre.named_steps["scaler"]
+    for chunk in _iter_chunks(table, chunksize, where, params):
+        scaler.partial_fit(column_transformer.transform(chunk.drop(columns=[target])))
+    return pre
+
+
+def _partial_fit_epochs(pre, reg, table, target, chunksize, where, params, n_epochs, random_state):
+    rng = np.random.default_rng(random_state)
+    n_rows = 0
+    for _ in range(n_epochs):
+        n_rows = 0
+        for chunk in _iter_chunks(table, chunksize, where, params):
+            chunk = chunk.iloc[rng.permutation(len(chunk))]
+            reg.partial_fit(pre.transform(chunk.drop(columns=[target])), chunk[target].to_numpy())
+            n_rows += len(chunk)
+    return n_rows
+
+
+@timed(rows=lambda metrics: metrics["n_test_rows"])
+def evaluate_streaming(model, table=TRAIN_TABLE, target="Calories", chunksize=DEFAULT_CHUNKSIZE, where="1 = 1", params=()):
+    """RMSE calculado bloco a bloco."""
+    squared_error, n = 0.0, 0
+    for chunk in _iter_chunks(table, chunksize, where, params):
+        y_pred = model.predict(chunk.drop(columns=[target]))
+        squared_error += float(np.sum((chunk[target].to_numpy() - y_pred) ** 2))
+        n += len(chunk)
+    return {"rmse": float(np.sqrt(squared_error / n)) if n else None, "n_test_rows": n}
+
+
+@timed(rows=lambda result: result[1]["n_train_rows"])
+def train_regressor_incremental(table=TRAIN_TABLE, target="Calories", chunksize=DEFAULT_CHUNKSIZE,
+                                n_epochs=5, holdout_every=5, model=None, where=None, params=(),
+                                random_state=42):
+    """
+    Treina um SGDRegressor fora da memória, lendo a SPEC do SQLite em blocos.
+
+    Primeiro passo: estatísticas do pré-processamento (ver
+    fit_streaming_preprocess). Segundo passo: `n_epochs` passadas de
+    partial_fit. Linhas com rowid múltiplo de `holdout_every` ficam para teste.
+
+    Para continuar um modelo existente (ex.: dias novos), passe `model` e um
+    filtro `where`/`params` (ex.: "ActivityDate > ?"); o pré-processamento do
+    modelo é mantido e apenas o regressor recebe partial_fit.
+    Retorna (modelo, métricas).
+    """
+    train_where = _holdout_filter(holdout_every, test=False)
+    if where:
+        train_where = f"({where}) AND {train_where}"
+
+    if model is None:
+        pre = fit_streaming_preprocess(table, target, chunksize, train_where, params)
+        reg = SGDRegressor(eta0=0.001, random_state=random_state)
+        model = Pipeline([("pre", pre), ("reg", reg)])
+    else:
+        pre, reg = model.named_steps["pre"], model.named_steps["reg"]
+
+    n_train_rows = _partial_fit_epochs(pre, reg, table, target, chunksize, train_where, params, n_epochs, random_state)
+
+    metrics = {}
+    if holdout_every:
+        metrics = evaluate_streaming(model, table, target, chunksize, _holdout_filter(holdout_every, test=True))
+    metrics["n_train_rows"] = n_train_rows
+    return model, metrics
@@ -1,6 +1,9 @@
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix, mean_squared_error
 import numpy as np
 
+from core.monitoring.timing import timed
+
+@timed()
 def evaluate_classifier(model, X_test, y_test):
     y_pred = model.predict(X_test)
     metrics = {
@@ -12,6 +15,7 @@ def evaluate_classifier(model, X_test, y_test):
     cm = confusion_matrix(y_test, y_pred).tolist()
     return metrics, cm
 
+@timed()
 def evaluate_regressor(model, X_test, y_test):
     y_pred = model.predict(X_test)
     rmse = float(np.sqrt(mean_squared_error(y_test, y_pred)))
@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+from datetime import datetime
+
+from core.data.database import APP_DIR
+from core.monitoring.timing import timed
+
+MODEL_DIR = os.path.join(APP_DIR, "model")
+MODEL_PATH = os.path.join(MODEL_DIR, "regressor_model.pickle")
+VERSIONS_DIR = os.path.join(MODEL_DIR, "versions")
+
+# Cache por processo: caminho -> (mtime_ns, tamanho, sha256, modelo, metadados)
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _sha256_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _metadata_path(model_path):
+    return os.path.splitext(model_path)[0] + ".json"
+
+
+def _atomic_write(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def artifact_version(model_path=MODEL_PATH):
+    """Versão de um artefato: prefixo do SHA-256 do arquivo serializado."""
+    return _sha256_file(model_path)[:12]
+
+
+@timed(rows=lambda metadata: metadata.get("n_train_rows"))
+def save_model(model, metrics=None, feature_names=None, n_train_rows=None, extra=None, model_path=MODEL_PATH):
+    """
+    Registra um modelo treinado e o torna o modelo ativo.
+
+    O artefato é guardado em model/versions/<versão>.pickle junto com um
+    .json de metadados (métricas, features, linhas de treino, hash) e copiado
+    de forma atômica para `model_path`. Retorna os metadados.
+    """
+    # Importado aqui: o app carrega este módulo sem precisar do sklearn
+    import sklearn
+
+    data = pickle.dumps(model)
+    sha256 = _sha256_bytes(data)
+    version = sha256[:12]
+    metadata = {
+        "version": version,
+        "sha256": sha256,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "model_class": type(model).__name__,
+        "sklearn_version": sklearn.__version__,
+        "metrics": metrics or {},
+        "feature_names": [str(c) for c in feature_names] if feature_names is not None else None,
+        "n_train_rows": int(n_train_rows) if n_train_rows is not None else None,
+        **(extra or {}),
+    }
+    encoded_metadata = json.dumps(metadata, indent=2, ensure_ascii=False).encode("utf-8")
+
+    os.makedirs(VERSIONS_DIR, exist_ok=True)
+    version_path = os.path.join(VERSIONS_DIR, f"{version}.pickle")
+    _atomic_write(version_path, data)
+    _atomic_write(_metadata_path(version_path), encoded_metadata)
+
+    os.makedirs(os.path.dirname(model_path), exist_ok=True)
+    _atomic_write(model_path, data)
+    _atomic_write(_metadata_path(model_path), encoded_metadata)
+    return metadata
+
+
+def load_metadata(model_path=MODEL_PATH):
+    """Metadados do artefato (vazio para modelos salvos antes do registro)."""
+    path = _metadata_path(model_path)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_model(model_path=MODEL_PATH):
+    """
+    Carrega o modelo de `model_path` uma vez por processo.
+
+    Chamadas seguintes devolvem o objeto em cache enquanto mtime e tamanho do
+    arquivo não mudarem; se mudarem, o hash é recalculado e o arquivo só é
+    desserializado de novo se o conteúdo for de fato outro.
+    Retorna (modelo, metadados).
+    """
+    stat = os.stat(model_path)
+    with _cache_lock:
+        cached = _cache.get(model_path)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[3], cached[4]
+
+        sha256 = _sha256_file(model_path)
+        if cached and cached[2] == sha256:
+            _cache[model_path] = (stat.st_mtime_ns, stat.st_size) + cached[2:]
+            return cached[3], cached[4]
+
+        with open(model_path, "rb") as f:
+            model = pickle.load(f)
+        metadata = load_metadata(model_path) or {"version": sha256[:12], "sha256": sha256}
+        _cache[model_path] = (stat.st_mtime_ns, stat.st_size, sha256, model, metadata)
+        return model, metadata
+
+
+def model_fingerprint(model_path=MODEL_PATH):
+    """Identificador barato do arquivo (mtime, tamanho) para chaves de cache; None se não existir."""
+    if not os.path.exists(model_path):
+        return None
+    stat = os.stat(model_path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def list_versions():
+    """Metadados de todas as versões registradas, da mais recente para a mais antiga."""
+    if not os.path.isdir(VERSIONS_DIR):
+        return []
+    versions = []
+    for name in os.listdir(VERSIONS_DIR):
+        if name.endswith(".json"):
+            with open(os.path.join(VERSIONS_DIR, name), "r", encoding="utf-8") as f:
+                versions.append(json.load(f))
+    return sorted(versions, key=lambda m: m.get("created_at", ""), reverse=True)
+
+
+def activate_version(version, model_path=MODEL_PATH):
+    """Torna ativa uma versão registrada anteriormente."""
+    version_path = os.path.join(VERSIONS_DIR, f"{version}.pickle")
+    if not os.path.exists(version_path):
+        raise FileNotFoundError(f"Versão de modelo não encontrada: {version}")
+    with open(version_path, "rb") as f:
+        _atomic_write(model_path, f.read())
+    with open(_metadata_path(version_path), "rb") as f:
+        _atomic_write(_metadata_path(model_path), f.read())
+
+
+def clear_model_cache():
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,128 @@
+"""
+Pontuação em lote (offline) da tabela spec_daily_activity_predict.
+
+Uso pela linha de comando, a partir da raiz do projeto:
+
+    python -m core.models.scoring --chunksize 50000 --n-jobs 4
+"""
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+from core.data.database import bump_data_version, db_connection, db_transaction, ensure_database_and_tables
+from core.data.schema import apply_schema
+from core.models.registry import MODEL_PATH, artifact_version, load_model
+from core.monitoring.timing import timed
+
+PREDICT_TABLE = "spec_daily_activity_predict"
+PREDICTIONS_TABLE = "spec_daily_activity_predictions"
+DEFAULT_CHUNKSIZE = 50_000
+
+
+def predict_frame(model, df, target="Calories"):
+    """Aplica o modelo a um bloco da SPEC, usando as colunas vistas no treino."""
+    feature_cols = getattr(model, "feature_names_in_", None)
+    if feature_cols is None:
+        feature_cols = [c for c in df.columns if c not in (target, "SpecRowId")]
+    return model.predict(df[list(feature_cols)])
+
+
+# Modelo carregado uma vez por processo do pool
+_worker_model = None
+
+
+def _init_worker(model_path):
+    global _worker_model
+    _worker_model, _ = load_model(model_path)
+
+
+def _score_chunk(chunk, target):
+    return chunk["SpecRowId"].to_numpy(), chunk["ActivityDate"].to_numpy(), predict_frame(_worker_model, chunk, target)
+
+
+def _write_predictions(conn, row_ids, dates, preds, version, scored_at):
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {PREDICTIONS_TABLE} "
+        "(SpecRowId, ActivityDate, Prediction, ModelVersion, ScoredAt) VALUES (?, ?, ?, ?, ?)",
+        ((int(r), d, float(p), version, scored_at) for r, d, p in zip(row_ids, dates, preds)),
+    )
+
+
+@timed(rows=lambda result: result[1])
+def score_predict_table(model_path=MODEL_PATH, chunksize=DEFAULT_CHUNKSIZE, n_jobs=1, target="Calories"):
+    """
+    Pontua spec_daily_activity_predict em blocos e grava as previsões em
+    spec_daily_activity_predictions, identificadas pela versão do modelo.
+
+    Com n_jobs > 1 os blocos são distribuídos num pool de processos, com no
+    máximo 2 * n_jobs blocos em trânsito, de modo que a memória fica limitada
+    pelo tamanho do bloco. As previsões anteriores da mesma versão são
+    substituídas. Retorna (versão do modelo, número de linhas pontuadas).
+    """
+    version = artifact_version(model_path)
+    scored_at = datetime.now().isoformat(timespec="seconds")
+    ensure_database_and_tables()
+
+    total = 0
+    with db_transaction() as conn:
+        conn.execute(f"DELETE FROM {PREDICTIONS_TABLE} WHERE ModelVersion = ?", (version,))
+        chunks = pd.read_sql_query(
+            f"SELECT rowid AS SpecRowId, * FROM {PREDICT_TABLE}", conn, chunksize=chunksize
+        )
+
+        if n_jobs is None or n_jobs <= 1:
+            model, _ = load_model(model_path)
+            for chunk in chunks:
+                preds = predict_frame(model, chunk, target)
+                _write_predictions(conn, chunk["SpecRowId"], chunk["ActivityDate"], preds, version, scored_at)
+                total += len(chunk)
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(model_path,)) as pool:
+                pending = deque()
+                for chunk in chunks:
+                    pending.append(pool.submit(_score_chunk, chunk, target))
+                    if len(pending) >= 2 * n_jobs:
+                        row_ids, dates, preds = pending.popleft().result()
+                        _write_predictions(conn, row_ids, dates, preds, version, scored_at)
+                        total += len(row_ids)
+                while pending:
+                    row_ids, dates, preds = pending.popleft().result()
+                    _write_predictions(conn, row_ids, dates, preds, version, scored_at)
+                    total += len(row_ids)
+
+    bump_data_version()
+    print(f"Pontuação em lote concluída: {total} linhas (modelo {version}).")
+    return version, total
+
+
+@timed()
+def load_predictions(version=None):
+    """Carrega as previsões junto com as features da SPEC de previsão."""
+    where = "WHERE p.ModelVersion = ?" if version else ""
+    params = (version,) if version else ()
+    with db_connection() as conn:
+        df = pd.read_sql_query(f"""
+            SELECT s.*, p.Prediction, p.ModelVersion, p.ScoredAt
+            FROM {PREDICTIONS_TABLE} p
+            JOIN {PREDICT_TABLE} s ON s.rowid = p.SpecRowId
+            {where}
+            ORDER BY p.SpecRowId
+        """, conn, params=params)
+    return apply_schema(df, report=PREDICTIONS_TABLE)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pontua a tabela spec_daily_activity_predict em lote.")
+    parser.add_argument("--model", default=MODEL_PATH, help="Caminho do modelo serializado (.pickle).")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="Linhas por bloco.")
+    parser.add_argument("--n-jobs", type=int, default=1, help="Processos para a pontuação.")
+    parser.add_argument("--target", default="Calories", help="Coluna alvo, ignorada como feature.")
+    args = parser.parse_args(argv)
+    score_predict_table(args.model, chunksize=args.chunksize, n_jobs=args.n_jobs, target=args.target)
+
+
+if __name__ == "__main__":
+    main()
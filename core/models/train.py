@@ -1,10 +1,20 @@
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LogisticRegression, LinearRegression
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.metrics import mean_squared_error
+from sklearn.model_selection import KFold, ParameterGrid, train_test_split
+from sklearn.linear_model import ElasticNet, Lasso, LogisticRegression, LinearRegression, Ridge
 from sklearn.pipeline import Pipeline
 
+from core.monitoring.timing import timed
+
 def split(X, y, test_size=0.2, random_state=42):
     return train_test_split(X, y, test_size=test_size, random_state=random_state, stratify=None)
 
+@timed()
 def train_regressor(X, y, pre, test_size=0.2):
     X_train, X_test, y_train, y_test = split(X, y, test_size=test_size)
     reg = LinearRegression()
@@ -12,9 +22,91 @@ def train_regressor(X, y, pre, test_size=0.2):
     model.fit(X_train, y_train)
     return model, X_test, y_test
 
+@timed()
 def train_classifier(X, y, pre, test_size=0.2):
     X_train, X_test, y_train, y_test = split(X, y, test_size=test_size)
     clf = LogisticRegression(max_iter=1000)
     model = Pipeline([("pre", pre), ("clf", clf)])
     model.fit(X_train, y_train)
-    return model, X_test, y_test
\ No newline at end of file
+    return model, X_test, y_test
+
+# Candidatos da busca: (nome, classe, grade de hiperparâmetros)
+DEFAULT_REGRESSOR_GRID = [
+    ("LinearRegression", LinearRegression, {}),
+    ("Ridge", Ridge, {"alpha": [0.1, 1.0, 10.0, 100.0]}),
+    ("Lasso", Lasso, {"alpha": [0.01, 0.1, 1.0, 10.0], "max_iter": [10000]}),
+    ("ElasticNet", ElasticNet, {"alpha": [0.01, 0.1, 1.0], "l1_ratio": [0.2, 0.5, 0.8], "max_iter": [10000]}),
+]
+
+def _expand_candidates(grid):
+    candidates = []
+    for name, estimator_cls, params in grid:
+        for combo in ParameterGrid(params):
+            candidates.append((name, combo, estimator_cls(**combo)))
+    return candidates
+
+def _preprocess_fold(pre, X, y, train_idx, val_idx):
+    """Ajusta o pré-processamento uma única vez por fold; reaproveitado por todos os candidatos."""
+    start = time.perf_counter()
+    fold_pre = clone(pre)
+    Xt_train = fold_pre.fit_transform(X.iloc[train_idx], y.iloc[train_idx])
+    Xt_val = fold_pre.transform(X.iloc[val_idx])
+    elapsed = time.perf_counter() - start
+    return Xt_train, y.iloc[train_idx].to_numpy(), Xt_val, y.iloc[val_idx].to_numpy(), elapsed
+
+def _fit_candidate(candidate_id, name, params, estimator, fold_id, fold):
+    Xt_train, y_train, Xt_val, y_val, _ = fold
+    start = time.perf_counter()
+    estimator.fit(Xt_train, y_train)
+    fit_time = time.perf_counter() - start
+    start = time.perf_counter()
+    y_pred = estimator.predict(Xt_val)
+    score_time = time.perf_counter() - start
+    rmse = float(np.sqrt(mean_squared_error(y_val, y_pred)))
+    return {"candidate_id": candidate_id, "model": name, "params": params, "fold": fold_id, "rmse": rmse,
+            "fit_time": fit_time, "score_time": score_time}
+
+@timed()
+def train_regressor_cv(X, y, pre, test_size=0.2, n_splits=5, grid=None, n_jobs=None, random_state=42):
+    """
+    Treina com validação cruzada k-fold e busca em grade de regressores
+    (LinearRegression, Ridge, Lasso e ElasticNet por padrão).
+
+    O pré-processamento de `make_preprocess_pipeline` é ajustado uma vez por
+    fold e os dados transformados são compartilhados entre os candidatos.
+    Os ajustes (fold x candidato) são distribuídos em `n_jobs` processos.
+    O melhor candidato (menor RMSE médio) é re-treinado no conjunto de treino
+    completo. Retorna (modelo, X_test, y_test, tabela de resultados).
+    """
+    X_train, X_test, y_train, y_test = split(X, y, test_size=test_size, random_state=random_state)
+    candidates = _expand_candidates(grid or DEFAULT_REGRESSOR_GRID)
+    kfold = KFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+
+    parallel = Parallel(n_jobs=n_jobs)
+    folds = parallel(
+        delayed(_preprocess_fold)(pre, X_train, y_train, train_idx, val_idx)
+        for train_idx, val_idx in kfold.split(X_train)
+    )
+    runs = parallel(
+        delayed(_fit_candidate)(candidate_id, name, params, clone(estimator), fold_id, fold)
+        for fold_id, fold in enumerate(folds)
+        for candidate_id, (name, params, estimator) in enumerate(candidates)
+    )
+
+    results = pd.DataFrame(runs).groupby("candidate_id").agg(
+        model=("model", "first"),
+        params=("params", "first"),
+        mean_rmse=("rmse", "mean"),
+        std_rmse=("rmse", "std"),
+        mean_fit_time=("fit_time", "mean"),
+        mean_score_time=("score_time", "mean"),
+    ).reset_index()
+    results["mean_preprocess_time"] = float(np.mean([fold[-1] for fold in folds]))
+    results = results.sort_values("mean_rmse").reset_index(drop=True)
+    results.insert(0, "rank", np.arange(1, len(results) + 1))
+
+    best_estimator = candidates[int(results.loc[0, "candidate_id"])][2]
+    results = results.drop(columns="candidate_id")
+    model = Pipeline([("pre", clone(pre)), ("reg", clone(best_estimator))])
+    model.fit(X_train, y_train)
+    return model, X_test, y_test, results
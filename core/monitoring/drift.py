@@ -0,0 +1,365 @@
+"""
+Monitoramento de qualidade e drift das tabelas SPEC com resumos mescláveis.
+
+Cada coluna tem um sketch atualizado bloco a bloco pelo ETL e guardado na
+tabela monitoring_sketches:
+- numéricas: contagem, nulos, média e M2 (Welford, combinados pela fórmula
+  de Chan), mínimo/máximo e um histograma em buckets logarítmicos (erro
+  relativo de RELATIVE_ACCURACY nos quantis);
+- categóricas (ActivityLevel): contagem por categoria.
+
+Sketches se somam (merge) e se subtraem (subtract, para linhas
+substituídas pelo ETL incremental; mínimo/máximo passam a ser limites).
+PSI e KS entre treino e previsão são calculados sobre os buckets, em
+O(tamanho do sketch) e não O(linhas). As funções que usam o banco recebem
+uma conexão SQLite e não fazem commit.
+"""
+import json
+import math
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+SKETCH_TABLE = "monitoring_sketches"
+NUMERIC_COLUMNS = [
+    'TotalSteps', 'TotalDistance', 'TrackerDistance', 'VeryActiveMinutes',
+    'FairlyActiveMinutes', 'LightlyActiveMinutes', 'SedentaryMinutes', 'Calories',
+    'TotalActiveMinutes', 'ActivityRatio', 'CaloriesPerStep'
+]
+CATEGORICAL_COLUMNS = ['ActivityLevel']
+DEFAULT_CHUNKSIZE = 100_000
+
+RELATIVE_ACCURACY = 0.01
+_GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+# Valores com módulo abaixo disso caem no bucket do zero (chave 0)
+MIN_MAGNITUDE = 1e-9
+_KEY_OFFSET = int(math.ceil(-math.log(MIN_MAGNITUDE) / _LOG_GAMMA)) + 1
+
+PSI_BINS = 10
+PSI_EPSILON = 1e-6
+# Faixas usuais do PSI
+PSI_MODERATE = 0.1
+PSI_HIGH = 0.25
+
+
+def _bucket_keys(values):
+    """Chave inteira de cada valor, crescente com o valor (negativos < 0 < positivos)."""
+    magnitude = np.abs(values)
+    keys = np.zeros(len(values), dtype=np.int64)
+    nonzero = magnitude >= MIN_MAGNITUDE
+    keys[nonzero] = np.ceil(np.log(magnitude[nonzero]) / _LOG_GAMMA).astype(np.int64) + _KEY_OFFSET
+    return np.where(values < 0, -keys, keys)
+
+
+def _bucket_values(keys):
+    """Valor representativo (centro relativo) de cada chave."""
+    keys = np.asarray(keys, dtype=np.int64)
+    magnitude = 2 * np.power(_GAMMA, np.abs(keys) - _KEY_OFFSET) / (_GAMMA + 1)
+    return np.where(keys == 0, 0.0, np.sign(keys) * magnitude)
+
+
+def _combine_buckets(keys_a, counts_a, keys_b, counts_b, sign=1):
+    keys, inverse = np.unique(np.concatenate([keys_a, keys_b]), return_inverse=True)
+    weights = np.concatenate([counts_a, sign * np.asarray(counts_b, dtype=np.int64)])
+    counts = np.bincount(inverse, weights=weights, minlength=len(keys)).astype(np.int64)
+    keep = counts > 0
+    return keys[keep], counts[keep]
+
+
+class NumericSketch:
+    """Contagem, média/variância (Welford), extremos e quantis aproximados de uma coluna."""
+
+    kind = "numeric"
+
+    def __init__(self):
+        self.count = 0
+        self.nulls = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.keys = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int64)
+
+    @classmethod
+    def from_values(cls, values):
+        sketch = cls()
+        values = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype="float64")
+        present = values[~np.isnan(values)]
+        sketch.nulls = int(len(values) - len(present))
+        sketch.count = int(len(present))
+        if sketch.count:
+            sketch.mean = float(present.mean())
+            sketch.m2 = float(((present - sketch.mean) ** 2).sum())
+            sketch.min = float(present.min())
+            sketch.max = float(present.max())
+            sketch.keys, sketch.counts = np.unique(_bucket_keys(present), return_counts=True)
+            sketch.counts = sketch.counts.astype(np.int64)
+        return sketch
+
+    def update(self, values):
+        return self.merge(NumericSketch.from_values(values))
+
+    def merge(self, other):
+        """Soma `other` a este sketch (fórmula de Chan para média e M2)."""
+        n = self.count + other.count
+        if other.count:
+            delta = other.mean - self.mean
+            self.m2 += other.m2 + delta * delta * self.count * other.count / n
+            self.mean += delta * other.count / n
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+            self.keys, self.counts = _combine_buckets(self.keys, self.counts, other.keys, other.counts)
+        self.count = n
+        self.nulls += other.nulls
+        return self
+
+    def subtract(self, other):
+        """
+        Retira de este sketch linhas resumidas em `other` (que devem ter sido
+        somadas antes). Mínimo e máximo não podem ser desfeitos e passam a
+        ser apenas limites.
+        """
+        n = self.count - other.count
+        if n <= 0:
+            nulls = max(self.nulls - other.nulls, 0)
+            self.__init__()
+            self.nulls = nulls
+            return self
+        if other.count:
+            mean = (self.count * self.mean - other.count * other.mean) / n
+            delta = other.mean - mean
+            self.m2 = max(self.m2 - other.m2 - delta * delta * n * other.count / self.count, 0.0)
+            self.mean = mean
+            self.keys, self.counts = _combine_buckets(self.keys, self.counts, other.keys, other.counts, sign=-1)
+        self.count = n
+        self.nulls = max(self.nulls - other.nulls, 0)
+        return self
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else None
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        index = int(np.searchsorted(np.cumsum(self.counts), rank, side="right"))
+        value = float(_bucket_values(self.keys[min(index, len(self.keys) - 1)]))
+        return min(max(value, self.min), self.max)
+
+    def cdf(self, x):
+        """Fração de valores <= x (na resolução dos buckets), para um array de x."""
+        if not self.count:
+            return np.zeros(len(np.atleast_1d(x)))
+        cumulative = np.concatenate([[0], np.cumsum(self.counts)])
+        positions = np.searchsorted(self.keys, _bucket_keys(np.atleast_1d(np.asarray(x, dtype="float64"))), side="right")
+        return cumulative[positions] / self.count
+
+    def buckets_json(self):
+        return json.dumps({"keys": self.keys.tolist(), "counts": self.counts.tolist()})
+
+    @classmethod
+    def from_row(cls, count, nulls, mean, m2, min_value, max_value, buckets):
+        sketch = cls()
+        sketch.count, sketch.nulls = int(count), int(nulls)
+        sketch.mean, sketch.m2 = float(mean or 0.0), float(m2 or 0.0)
+        sketch.min, sketch.max = min_value, max_value
+        data = json.loads(buckets)
+        sketch.keys = np.asarray(data["keys"], dtype=np.int64)
+        sketch.counts = np.asarray(data["counts"], dtype=np.int64)
+        return sketch
+
+
+class CategoricalSketch:
+    """Contagem por categoria (histograma exato) de uma coluna."""
+
+    kind = "categorical"
+
+    def __init__(self):
+        self.count = 0
+        self.nulls = 0
+        self.frequencies = {}
+
+    @classmethod
+    def from_values(cls, values):
+        sketch = cls()
+        series = pd.Series(values).astype(object)
+        counts = series.dropna().astype(str).value_counts()
+        sketch.frequencies = {k: int(v) for k, v in counts.items()}
+        sketch.count = int(counts.sum())
+        sketch.nulls = int(series.isna().sum())
+        return sketch
+
+    def update(self, values):
+        return self.merge(CategoricalSketch.from_values(values))
+
+    def merge(self, other, sign=1):
+        for category, n in other.frequencies.items():
+            total = self.frequencies.get(category, 0) + sign * n
+            if total > 0:
+                self.frequencies[category] = total
+            else:
+                self.frequencies.pop(category, None)
+        self.count = max(self.count + sign * other.count, 0)
+        self.nulls = max(self.nulls + sign * other.nulls, 0)
+        return self
+
+    def subtract(self, other):
+        return self.merge(other, sign=-1)
+
+    def buckets_json(self):
+        return json.dumps(self.frequencies, ensure_ascii=False)
+
+    @classmethod
+    def from_row(cls, count, nulls, mean, m2, min_value, max_value, buckets):
+        sketch = cls()
+        sketch.count, sketch.nulls = int(count), int(nulls)
+        sketch.frequencies = {k: int(v) for k, v in json.loads(buckets).items()}
+        return sketch
+
+
+def sketch_frame(df, numeric_columns=NUMERIC_COLUMNS, categorical_columns=CATEGORICAL_COLUMNS):
+    """Sketches das colunas monitoradas presentes em `df` (coluna -> sketch)."""
+    sketches = {c: NumericSketch.from_values(df[c]) for c in numeric_columns if c in df.columns}
+    sketches.update({c: CategoricalSketch.from_values(df[c]) for c in categorical_columns if c in df.columns})
+    return sketches
+
+
+def load_sketches(conn, table):
+    rows = conn.execute(
+        f"SELECT ColumnName, Kind, Count, Nulls, Mean, M2, MinValue, MaxValue, Buckets "
+        f"FROM {SKETCH_TABLE} WHERE TableName = ?",
+        (table,),
+    ).fetchall()
+    kinds = {"numeric": NumericSketch, "categorical": CategoricalSketch}
+    return {row[0]: kinds[row[1]].from_row(*row[2:]) for row in rows}
+
+
+def save_sketches(conn, table, sketches):
+    updated_at = datetime.now().isoformat(timespec="seconds")
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {SKETCH_TABLE} (TableName, ColumnName, Kind, Count, Nulls, Mean, M2, "
+        f"MinValue, MaxValue, Buckets, UpdatedAt) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (
+                table, column, s.kind, s.count, s.nulls,
+                getattr(s, "mean", None), getattr(s, "m2", None),
+                getattr(s, "min", None), getattr(s, "max", None),
+                s.buckets_json(), updated_at,
+            )
+            for column, s in sketches.items()
+        ],
+    )
+
+
+def update_table_sketches(conn, table, df=None, removed=None, reset=False, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Atualiza os sketches de `table`: soma as linhas de `df` e subtrai as de
+    `removed` (linhas substituídas), em blocos de `chunksize`. Com
+    reset=True começa do zero.
+    """
+    sketches = {} if reset else load_sketches(conn, table)
+    for frame, op in ((removed, "subtract"), (df, "merge")):
+        if frame is None:
+            continue
+        for start in range(0, len(frame), chunksize):
+            for column, chunk_sketch in sketch_frame(frame.iloc[start:start + chunksize]).items():
+                if column not in sketches:
+                    sketches[column] = type(chunk_sketch)()
+                getattr(sketches[column], op)(chunk_sketch)
+    save_sketches(conn, table, sketches)
+    return sketches
+
+
+def rebuild_table_sketches(conn, table, chunksize=DEFAULT_CHUNKSIZE):
+    """Recalcula os sketches de `table` lendo a tabela em blocos."""
+    columns = ", ".join(NUMERIC_COLUMNS + CATEGORICAL_COLUMNS)
+    sketches = {}
+    for chunk in pd.read_sql_query(f"SELECT {columns} FROM {table}", conn, chunksize=chunksize):
+        for column, chunk_sketch in sketch_frame(chunk).items():
+            sketches.setdefault(column, type(chunk_sketch)()).merge(chunk_sketch)
+    conn.execute(f"DELETE FROM {SKETCH_TABLE} WHERE TableName = ?", (table,))
+    save_sketches(conn, table, sketches)
+    return sketches
+
+
+def _psi(expected, actual):
+    expected = np.clip(np.asarray(expected, dtype="float64"), PSI_EPSILON, None)
+    actual = np.clip(np.asarray(actual, dtype="float64"), PSI_EPSILON, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def numeric_drift(reference, current, bins=PSI_BINS):
+    """(PSI nos decis da referência, estatística KS) entre dois NumericSketch."""
+    if not reference.count or not current.count:
+        return None, None
+    edges = np.unique([reference.quantile(q) for q in np.linspace(0, 1, bins + 1)[1:-1]])
+    ref_cdf = np.concatenate([[0.0], reference.cdf(edges), [1.0]])
+    cur_cdf = np.concatenate([[0.0], current.cdf(edges), [1.0]])
+    psi = _psi(np.diff(ref_cdf), np.diff(cur_cdf))
+
+    # KS: maior distância entre as CDFs nos buckets de qualquer dos dois
+    keys = np.union1d(reference.keys, current.keys)
+    ref_cum = np.concatenate([[0], np.cumsum(reference.counts)])[np.searchsorted(reference.keys, keys, side="right")]
+    cur_cum = np.concatenate([[0], np.cumsum(current.counts)])[np.searchsorted(current.keys, keys, side="right")]
+    ks = float(np.max(np.abs(ref_cum / reference.count - cur_cum / current.count)))
+    return psi, ks
+
+
+def categorical_drift(reference, current):
+    """PSI entre as distribuições de dois CategoricalSketch."""
+    if not reference.count or not current.count:
+        return None
+    categories = sorted(set(reference.frequencies) | set(current.frequencies))
+    expected = [reference.frequencies.get(c, 0) / reference.count for c in categories]
+    actual = [current.frequencies.get(c, 0) / current.count for c in categories]
+    return _psi(expected, actual)
+
+
+def _status(psi):
+    if psi is None:
+        return "sem dados"
+    if psi >= PSI_HIGH:
+        return "alto"
+    if psi >= PSI_MODERATE:
+        return "moderado"
+    return "estável"
+
+
+def drift_report(conn, reference="spec_daily_activity_train", current="spec_daily_activity_predict"):
+    """
+    Drift e qualidade por coluna entre duas tabelas, só com os sketches
+    gravados (sem ler as tabelas). Retorna um DataFrame ordenado pelo PSI.
+    """
+    ref_sketches = load_sketches(conn, reference)
+    cur_sketches = load_sketches(conn, current)
+    rows = []
+    for column in NUMERIC_COLUMNS + CATEGORICAL_COLUMNS:
+        ref, cur = ref_sketches.get(column), cur_sketches.get(column)
+        if ref is None or cur is None:
+            continue
+        if ref.kind == "numeric":
+            psi, ks = numeric_drift(ref, cur)
+        else:
+            psi, ks = categorical_drift(ref, cur), None
+        rows.append({
+            "Column": column,
+            "PSI": psi,
+            "KS": ks,
+            "Status": _status(psi),
+            "RefMean": getattr(ref, "mean", None) if ref.count else None,
+            "CurMean": getattr(cur, "mean", None) if cur.count else None,
+            "CurMin": getattr(cur, "min", None),
+            "CurMax": getattr(cur, "max", None),
+            "RefNullRate": ref.nulls / (ref.count + ref.nulls) if ref.count + ref.nulls else None,
+            "CurNullRate": cur.nulls / (cur.count + cur.nulls) if cur.count + cur.nulls else None,
+            "RefRows": ref.count + ref.nulls,
+            "CurRows": cur.count + cur.nulls,
+        })
+    report = pd.DataFrame(rows)
+    if not report.empty:
+        report = report.sort_values("PSI", ascending=False, na_position="last").reset_index(drop=True)
+    return report
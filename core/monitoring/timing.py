@@ -0,0 +1,351 @@
+"""
+Instrumentação dos estágios do pipeline (carga, ETL, pré-processamento,
+treino, avaliação, explicação).
+
+`stage(name)` (context manager) e `@timed()` (decorador) medem o tempo de
+parede, as linhas processadas e a memória alocada pelo estágio (tracemalloc:
+pico acima do início e o que ficou retido ao final) e guardam uma linha por
+execução para a tabela `stage_metrics` do banco de execução. Estágios
+aninhados na mesma thread compartilham o RunId do estágio raiz.
+
+As linhas são gravadas em lote, ao fim de um estágio raiz, quando há
+FLUSH_ROWS pendentes ou passaram FLUSH_SECONDS desde a última gravação (os
+jobs gravam na hora), e só as MAX_ROWS mais recentes ficam na tabela: as
+chamadas frequentes da interface não geram uma escrita cada.
+
+Variáveis de ambiente:
+- FITBIT_TIMING=0 desliga a instrumentação;
+- FITBIT_TIMING_MEMORY=0 desliga a medição de memória (o tracemalloc deixa
+  as alocações mais lentas enquanto algum estágio está em execução);
+- FITBIT_TIMING_MAX_ROWS limita o tamanho da tabela (padrão: 100000);
+- FITBIT_PROFILE=1 (ou uma lista de prefixos de estágio separados por
+  vírgula, ex.: "database.run_etl,train.") captura um cProfile dos
+  estágios raiz correspondentes em FITBIT_PROFILE_DIR (padrão: profiles/).
+"""
+import atexit
+import cProfile
+import functools
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+TIMING_ENABLED = os.environ.get("FITBIT_TIMING", "1") != "0"
+PROFILE_STAGES = os.environ.get("FITBIT_PROFILE", "").strip()
+PROFILE_DIR = os.environ.get("FITBIT_PROFILE_DIR", os.path.join(APP_DIR, "profiles"))
+PROFILE_TOP = 25
+MEMORY_ENABLED = os.environ.get("FITBIT_TIMING_MEMORY", "1") != "0"
+FLUSH_ROWS = 200
+FLUSH_SECONDS = 10.0
+MAX_ROWS = int(os.environ.get("FITBIT_TIMING_MAX_ROWS", "100000"))
+
+_local = threading.local()
+
+
+class StageInfo:
+    """Estágio em execução; `rows` pode ser preenchido dentro do bloco."""
+
+    def __init__(self, name, run_id, parent, depth, rows=None):
+        self.name = name
+        self.run_id = run_id
+        self.parent = parent
+        self.depth = depth
+        self.rows = rows
+        self.memory_start = None
+        self.memory_peak = None
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def peak_rss_mb():
+    """
+    Pico de memória residente do processo em MB, desde o início do processo
+    (None sem o módulo resource). Usado pelos benchmarks, que rodam cada
+    escala num subprocesso próprio.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+# Estágios em execução (de todas as threads) cujo pico de memória está sendo medido
+_memory_lock = threading.Lock()
+_memory_stages = []
+_memory_owner = False
+
+
+def _fold_peak():
+    """Repassa o pico desde o último reset aos estágios ativos e zera o pico."""
+    _, peak = tracemalloc.get_traced_memory()
+    for info in _memory_stages:
+        info.memory_peak = max(info.memory_peak, peak)
+    tracemalloc.reset_peak()
+
+
+def _memory_enter(info):
+    global _memory_owner
+    with _memory_lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _memory_owner = True
+        _fold_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        info.memory_start = info.memory_peak = current
+        _memory_stages.append(info)
+
+
+def _memory_exit(info):
+    """
+    (pico acima do início, crescimento ao final) do estágio em MB. O
+    tracemalloc é do processo: estágios simultâneos em outras threads
+    entram na medição um do outro.
+    """
+    global _memory_owner
+    with _memory_lock:
+        _fold_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        _memory_stages.remove(info)
+        if not _memory_stages and _memory_owner:
+            tracemalloc.stop()
+            _memory_owner = False
+    return (info.memory_peak - info.memory_start) / 1024 ** 2, (current - info.memory_start) / 1024 ** 2
+
+
+def _should_profile(name):
+    if not PROFILE_STAGES or getattr(_local, "profiling", False):
+        return False
+    if PROFILE_STAGES.lower() in ("1", "all", "true"):
+        return True
+    return any(name.startswith(prefix.strip()) for prefix in PROFILE_STAGES.split(",") if prefix.strip())
+
+
+def _save_profile(profiler, info):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{info.run_id[:12]}_{info.name}.prof")
+    profiler.dump_stats(path)
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP)
+    return path, out.getvalue()
+
+
+_pending = []
+_pending_lock = threading.Lock()
+_last_flush = time.monotonic()
+_columns_checked = False
+
+_INSERT = (
+    "INSERT INTO stage_metrics (RunId, Stage, Parent, Depth, Status, StartedAt, WallSeconds, "
+    "Rows, PeakAllocMB, AllocGrowthMB, ProfilePath, ProfileSummary, Pid) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def _record(info, status, started_at, wall, memory, profile_path, profile_summary):
+    peak_alloc, alloc_growth = memory if memory is not None else (None, None)
+    with _pending_lock:
+        _pending.append((
+            info.run_id, info.name, info.parent, info.depth, status, started_at, wall,
+            int(info.rows) if info.rows is not None else None,
+            peak_alloc, alloc_growth, profile_path, profile_summary, os.getpid(),
+        ))
+
+
+def _ensure_columns(conn):
+    """Tabelas criadas antes das colunas de memória por estágio."""
+    global _columns_checked
+    if _columns_checked:
+        return
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(stage_metrics)")}
+    for col in ("PeakAllocMB", "AllocGrowthMB"):
+        if col not in columns:
+            conn.execute(f"ALTER TABLE stage_metrics ADD COLUMN {col} REAL")
+    _columns_checked = True
+
+
+def flush_metrics(force=True):
+    """
+    Grava as medições pendentes numa única transação e remove as mais
+    antigas além de MAX_ROWS. Sem `force`, só grava com FLUSH_ROWS linhas
+    pendentes ou FLUSH_SECONDS desde a última gravação. Retorna o número de
+    linhas gravadas.
+    """
+    global _last_flush
+    with _pending_lock:
+        if not _pending:
+            return 0
+        if not force and len(_pending) < FLUSH_ROWS and time.monotonic() - _last_flush < FLUSH_SECONDS:
+            return 0
+        rows = list(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+    # Import tardio: core.data.database também é instrumentado por este módulo
+    from core.data.database import ensure_runtime_tables, runtime_transaction
+    try:
+        ensure_runtime_tables()
+        with runtime_transaction() as conn:
+            _ensure_columns(conn)
+            conn.executemany(_INSERT, rows)
+            conn.execute(
+                "DELETE FROM stage_metrics WHERE Id <= (SELECT MAX(Id) FROM stage_metrics) - ?", (MAX_ROWS,)
+            )
+    except Exception as e:
+        # A instrumentação nunca deve derrubar o pipeline
+        print(f"Falha ao registrar as métricas de {len(rows)} estágios: {e}")
+        return 0
+    return len(rows)
+
+
+atexit.register(flush_metrics)
+
+
+@contextmanager
+def stage(name, rows=None, run_id=None):
+    """
+    Mede o bloco como o estágio `name`. `run_id` só vale para o estágio
+    raiz (ex.: o id de um job); os aninhados herdam o do raiz.
+    """
+    if not TIMING_ENABLED:
+        yield StageInfo(name, run_id, None, 0, rows)
+        return
+
+    stack = _stack()
+    if stack:
+        info = StageInfo(name, stack[-1].run_id, stack[-1].name, len(stack), rows)
+    else:
+        info = StageInfo(name, run_id or uuid.uuid4().hex, None, 0, rows)
+
+    profiler = cProfile.Profile() if _should_profile(name) else None
+    started_at = datetime.now().isoformat(timespec="milliseconds")
+    if MEMORY_ENABLED:
+        _memory_enter(info)
+    stack.append(info)
+    status = "error"
+    start = time.perf_counter()
+    if profiler is not None:
+        _local.profiling = True
+        profiler.enable()
+    try:
+        yield info
+        status = "ok"
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            _local.profiling = False
+        wall = time.perf_counter() - start
+        stack.pop()
+        memory = _memory_exit(info) if MEMORY_ENABLED else None
+        profile_path = profile_summary = None
+        if profiler is not None:
+            profile_path, profile_summary = _save_profile(profiler, info)
+        _record(info, status, started_at, wall, memory, profile_path, profile_summary)
+        if not stack:
+            # Jobs gravam na hora (a aba de diagnóstico acompanha o id do job)
+            flush_metrics(force=run_id is not None)
+
+
+def count_rows(result, args=(), kwargs=None):
+    """
+    Linhas processadas por padrão: o tamanho do DataFrame/Series retornado
+    (ou do primeiro item de uma tupla), um inteiro retornado, ou o tamanho
+    do primeiro DataFrame recebido como argumento.
+    """
+    if isinstance(result, tuple) and result:
+        result = result[0]
+    if isinstance(result, (pd.DataFrame, pd.Series)):
+        return len(result)
+    if isinstance(result, int) and not isinstance(result, bool):
+        return result
+    for value in list(args) + list((kwargs or {}).values()):
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            return len(value)
+    return None
+
+
+def timed(name=None, rows=None):
+    """
+    Decorador que executa a função dentro de stage(). O nome padrão é
+    "<módulo>.<função>"; `rows(result)` substitui a contagem padrão de
+    count_rows.
+    """
+    def decorate(func):
+        stage_name = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not TIMING_ENABLED:
+                return func(*args, **kwargs)
+            with stage(stage_name) as info:
+                result = func(*args, **kwargs)
+                info.rows = rows(result) if rows is not None else count_rows(result, args, kwargs)
+                return result
+        return wrapper
+
+    if callable(name):
+        func, name = name, None
+        return decorate(func)
+    return decorate
+
+
+def recent_runs(limit=20):
+    """Execuções raiz mais recentes, com o número de estágios aninhados."""
+    from core.data.database import ensure_runtime_tables, runtime_connection
+    ensure_runtime_tables()
+    flush_metrics()
+    with runtime_connection() as conn:
+        return pd.read_sql_query("""
+            SELECT r.RunId, r.Stage, r.Status, r.StartedAt, r.WallSeconds, r.Rows, r.PeakAllocMB, r.AllocGrowthMB,
+                   (SELECT COUNT(*) FROM stage_metrics c WHERE c.RunId = r.RunId AND c.Depth > 0) AS NestedStages,
+                   r.ProfilePath
+            FROM stage_metrics r
+            WHERE r.Depth = 0
+            ORDER BY r.Id DESC
+            LIMIT ?
+        """, conn, params=(int(limit),))
+
+
+def run_stages(run_id):
+    """Todos os estágios de uma execução, na ordem em que terminaram."""
+    from core.data.database import ensure_runtime_tables, runtime_connection
+    ensure_runtime_tables()
+    flush_metrics()
+    with runtime_connection() as conn:
+        return pd.read_sql_query("""
+            SELECT Stage, Parent, Depth, Status, StartedAt, WallSeconds, Rows, PeakAllocMB, AllocGrowthMB, ProfileSummary
+            FROM stage_metrics WHERE RunId = ? ORDER BY Id
+        """, conn, params=(run_id,))
+
+
+def stage_summary(limit=1000):
+    """Tempo médio/máximo e linhas por estágio nas últimas `limit` medições."""
+    from core.data.database import ensure_runtime_tables, runtime_connection
+    ensure_runtime_tables()
+    flush_metrics()
+    with runtime_connection() as conn:
+        return pd.read_sql_query("""
+            SELECT Stage, COUNT(*) AS Runs, AVG(WallSeconds) AS MeanSeconds, MAX(WallSeconds) AS MaxSeconds,
+                   SUM(Rows) AS TotalRows, MAX(PeakAllocMB) AS PeakAllocMB,
+                   SUM(CASE WHEN Status = 'error' THEN 1 ELSE 0 END) AS Errors
+            FROM (SELECT * FROM stage_metrics ORDER BY Id DESC LIMIT ?)
+            GROUP BY Stage
+            ORDER BY MeanSeconds DESC
+        """, conn, params=(int(limit),))
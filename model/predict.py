@@ -1,18 +0,0 @@
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix, mean_squared_error
-import numpy as np
-
-def evaluate_classifier(model, X_test, y_test):
-    y_pred = model.predict(X_test)
-    metrics = {
-        "accuracy": float(accuracy_score(y_test, y_pred)),
-        "precision": float(precision_score(y_test, y_pred, zero_division=0)),
-        "recall": float(recall_score(y_test, y_pred, zero_division=0)),
-        "f1": float(f1_score(y_test, y_pred, zero_division=0)),
-    }
-    cm = confusion_matrix(y_test, y_pred).tolist()
-    return metrics, cm
-
-def evaluate_regressor(model, X_test, y_test):
-    y_pred = model.predict(X_test)
-    rmse = float(np.sqrt(mean_squared_error(y_test, y_pred)))
-    return {"rmse": rmse}
\ No newline at end of file
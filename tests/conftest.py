@@ -0,0 +1,46 @@
+"""
+Configuração comum dos testes: banco principal e banco de execução num
+diretório temporário. As variáveis de ambiente precisam estar definidas
+antes da primeira importação de core.data.database, que lê os caminhos
+no nível do módulo.
+"""
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+import pandas as pd
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+_TMP_DIR = tempfile.mkdtemp(prefix="fitbit_tests_")
+atexit.register(shutil.rmtree, _TMP_DIR, ignore_errors=True)
+os.environ["FITBIT_DB_PATH"] = os.path.join(_TMP_DIR, "fitness_tracker.db")
+os.environ["FITBIT_RUNTIME_DB_PATH"] = os.path.join(_TMP_DIR, "fitness_runtime.db")
+os.environ["FITBIT_TIMING"] = "0"
+os.environ.pop("FITBIT_PROFILE", None)
+
+CSV_PATH = os.path.join(ROOT_DIR, "core", "data", "dailyActivity_merged.csv")
+
+
+@pytest.fixture(scope="session")
+def _raw_csv():
+    return pd.read_csv(CSV_PATH)
+
+
+@pytest.fixture
+def raw_activity(_raw_csv):
+    """O CSV de exemplo como lido do disco (ActivityDate no formato M/D/YYYY)."""
+    return _raw_csv.copy()
+
+
+@pytest.fixture
+def empty_db():
+    """Banco recriado vazio para o teste."""
+    from core.data.database import create_database_and_tables
+
+    create_database_and_tables()
+    yield
@@ -0,0 +1,14 @@
+from core.chatbot import engine
+
+
+def test_answers_cache_keeps_only_recent_versions(monkeypatch):
+    monkeypatch.setattr(engine, "ANSWERS_CACHE_SIZE", 3)
+    monkeypatch.setattr(engine, "_answers_cache", engine.OrderedDict())
+
+    first = engine.answers_for_model("regressão", {"rmse": 1.0}, None, version="v0")
+    for i in range(1, 5):
+        engine.answers_for_model("regressão", {"rmse": float(i)}, None, version=f"v{i}")
+
+    assert list(engine._answers_cache) == [("v2", "regressão"), ("v3", "regressão"), ("v4", "regressão")]
+    assert engine.answers_for_model("regressão", {"rmse": 9.0}, None, version="v3")["metrics"].endswith("{'rmse': 3.0}")
+    assert "{'rmse': 1.0}" in first["metrics"]
@@ -0,0 +1,36 @@
+import sqlite3
+
+import pytest
+
+from core.data.connection import ConnectionManager
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = ConnectionManager(str(tmp_path / "pool.db"))
+    manager.executescript("CREATE TABLE t (x INTEGER);")
+    yield manager
+    manager.close_all()
+
+
+def _count(manager):
+    with sqlite3.connect(manager.path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM t").fetchone()[0]
+
+
+def test_executescript_refused_inside_transaction(manager):
+    with pytest.raises(RuntimeError):
+        with manager.transaction() as conn:
+            conn.execute("INSERT INTO t VALUES (1)")
+            manager.executescript("INSERT INTO t VALUES (2);")
+    # A transação externa foi desfeita, não confirmada pelo script
+    assert _count(manager) == 0
+
+
+def test_failed_script_rolls_back_its_transaction(manager):
+    with pytest.raises(sqlite3.OperationalError):
+        manager.executescript("BEGIN; INSERT INTO t VALUES (1); INSERT INTO nao_existe VALUES (1); COMMIT;")
+    assert _count(manager) == 0
+    with manager.transaction() as conn:
+        conn.execute("INSERT INTO t VALUES (3)")
+    assert _count(manager) == 1
@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+
+from core.data import dates
+from core.data.dates import clear_format_cache, format_activity_dates, parse_activity_dates
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    clear_format_cache()
+    yield
+    clear_format_cache()
+
+
+def test_mixed_and_invalid_dates():
+    values = ['2016-04-12', '4/13/2016', '4/14/2016 12:00:00 AM', '2016-04-15 08:30:00',
+              '2016-02-30', 'ontem', None, ' 4/16/2016 ']
+
+    parsed = parse_activity_dates(values)
+
+    assert parsed.tolist()[:4] == [
+        pd.Timestamp('2016-04-12'), pd.Timestamp('2016-04-13'),
+        pd.Timestamp('2016-04-14'), pd.Timestamp('2016-04-15 08:30'),
+    ]
+    assert parsed.iloc[4:7].isna().all()
+    assert parsed.iloc[7] == pd.Timestamp('2016-04-16')
+
+
+def test_cached_format_falls_back_for_new_formats():
+    parse_activity_dates(['4/12/2016', '4/13/2016'], source='upload.csv')
+    assert dates._FORMAT_CACHE['upload.csv'] == ['%m/%d/%Y']
+
+    parsed = parse_activity_dates(['4/14/2016', '2016-04-15', '2016-02-30'], source='upload.csv')
+
+    assert parsed.iloc[:2].tolist() == [pd.Timestamp('2016-04-14'), pd.Timestamp('2016-04-15')]
+    assert pd.isna(parsed.iloc[2])
+    assert dates._FORMAT_CACHE['upload.csv'] == ['%m/%d/%Y', '%Y-%m-%d']
+
+
+def test_format_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(dates, 'FORMAT_CACHE_SIZE', 3)
+    for i in range(5):
+        parse_activity_dates(['4/12/2016'], source=f'upload_{i}.csv')
+
+    assert list(dates._FORMAT_CACHE) == ['upload_2.csv', 'upload_3.csv', 'upload_4.csv']
+
+
+def test_format_activity_dates():
+    formatted = format_activity_dates(['4/12/2016', '2016-04-13 00:00:00', 'ontem'])
+
+    assert formatted.tolist()[:2] == ['2016-04-12', '2016-04-13']
+    assert pd.isna(formatted.iloc[2])
+
+
+def test_format_cache_is_shared_safely_between_threads(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    monkeypatch.setattr(dates, 'FORMAT_CACHE_SIZE', 8)
+    values = ['4/12/2016', '2016-04-13']
+
+    def parse(i):
+        return parse_activity_dates(values, source=f'upload_{i % 20}.csv').tolist()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(parse, range(400)))
+
+    assert all(r == [pd.Timestamp('2016-04-12'), pd.Timestamp('2016-04-13')] for r in results)
+    assert len(dates._FORMAT_CACHE) == 8
@@ -0,0 +1,79 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from core.data.database import DB_NAME, SOT_COLUMNS, insert_csv_to_sor, run_etl_sor_to_sot
+
+
+def _sot():
+    with sqlite3.connect(DB_NAME) as conn:
+        df = pd.read_sql_query(f"SELECT {', '.join(SOT_COLUMNS)} FROM sot_daily_activity", conn)
+    return df.sort_values(['Id', 'ActivityDate']).reset_index(drop=True)
+
+
+@pytest.fixture
+def mixed_dates(raw_activity):
+    """Datas em vários formatos, com um dia inexistente e um texto inválido."""
+    df = raw_activity.iloc[:60].copy()
+    iso = pd.to_datetime(df['ActivityDate'], format='%m/%d/%Y')
+    df.loc[df.index[:20], 'ActivityDate'] = iso[:20].dt.strftime('%Y-%m-%d')
+    df.loc[df.index[20:40], 'ActivityDate'] = iso[20:40].dt.strftime('%m/%d/%Y 12:00:00 AM')
+    df.loc[df.index[40], 'ActivityDate'] = '2016-02-30'
+    df.loc[df.index[41], 'ActivityDate'] = 'ontem'
+    df.loc[df.index[42:45], 'TotalSteps'] = None
+    return df
+
+
+def test_sql_and_pandas_engines_agree(empty_db, mixed_dates):
+    insert_csv_to_sor(mixed_dates)
+    run_etl_sor_to_sot(engine="sql")
+    from_sql = _sot()
+    run_etl_sor_to_sot(engine="pandas")
+    from_pandas = _sot()
+
+    assert len(from_sql) == len(mixed_dates) - 2
+    assert from_sql['ActivityDate'].str.fullmatch(r"\d{4}-\d{2}-\d{2}").all()
+    pd.testing.assert_frame_equal(from_sql, from_pandas, check_dtype=False)
+
+
+def test_failed_sql_etl_keeps_previous_sot(empty_db, raw_activity):
+    insert_csv_to_sor(raw_activity)
+    run_etl_sor_to_sot(engine="sql")
+    before = _sot()
+    with sqlite3.connect(DB_NAME) as conn:
+        conn.execute("""
+            CREATE TRIGGER fail_sot_insert BEFORE INSERT ON sot_daily_activity
+            BEGIN SELECT RAISE(ABORT, 'falha simulada'); END
+        """)
+    try:
+        with pytest.raises(sqlite3.DatabaseError):
+            run_etl_sor_to_sot(engine="sql")
+        pd.testing.assert_frame_equal(_sot(), before)
+    finally:
+        with sqlite3.connect(DB_NAME) as conn:
+            conn.execute("DROP TRIGGER fail_sot_insert")
+
+
+def test_derive_sql_matches_derive():
+    """As expressões SQL do transformer reproduzem derive() nas bordas das faixas."""
+    from core.features.transform import ActivityFeatureTransformer
+
+    df = pd.DataFrame({
+        'TotalSteps': [0, 1, 5000, 5001, 10000, 10001, None],
+        'Calories': [1800, 1900, 2000, 2100, 2200, 2300, 2400],
+        'VeryActiveMinutes': [0, 5, 10, 15, 20, 25, 30],
+        'FairlyActiveMinutes': [0, 1, 2, 3, 4, 5, 6],
+        'LightlyActiveMinutes': [0, 10, 20, 30, 40, 50, 60],
+        'SedentaryMinutes': [0, 600, 700, 800, 900, 1000, 1100],
+    })
+    transformer = ActivityFeatureTransformer()
+    expected = pd.DataFrame(transformer.derive(df))
+    expected['ActivityLevel'] = expected['ActivityLevel'].astype(object)
+
+    select = ", ".join(f"{expr} AS {name}" for name, expr in transformer.derive_sql().items())
+    with sqlite3.connect(":memory:") as conn:
+        df.to_sql("sor", conn, index=False)
+        result = pd.read_sql_query(f"SELECT {select} FROM sor", conn)
+
+    pd.testing.assert_frame_equal(result, expected[list(result.columns)], check_dtype=False)
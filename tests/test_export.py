@@ -0,0 +1,55 @@
+import csv
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from core.data.database import (
+    DB_NAME, insert_csv_to_sor, run_etl_for_predict_data, run_etl_sor_to_sot, run_etl_sot_to_spec_train,
+)
+from core.data.dates import iso_date
+from core.data.export import EXPORT_SOURCES, PREDICTIONS_TABLE, export_to_file, iter_csv_rows
+
+START, END = '2016-04-12', '2016-04-16'
+
+
+@pytest.fixture
+def loaded_db(empty_db, raw_activity):
+    insert_csv_to_sor(raw_activity)
+    run_etl_sor_to_sot()
+    run_etl_sot_to_spec_train()
+    run_etl_for_predict_data(raw_activity)
+    # Previsões fictícias para cada linha da SPEC de previsão
+    with sqlite3.connect(DB_NAME) as conn:
+        conn.execute(f"""
+            INSERT INTO {PREDICTIONS_TABLE} (SpecRowId, ActivityDate, Prediction, ModelVersion, ScoredAt)
+            SELECT rowid, ActivityDate, Calories, 'v1', '2016-05-13T00:00:00'
+            FROM spec_daily_activity_predict
+        """)
+    dates = pd.to_datetime(raw_activity['ActivityDate'], format='%m/%d/%Y')
+    return dates.dt.strftime('%Y-%m-%d')
+
+
+@pytest.mark.parametrize("table", sorted(EXPORT_SOURCES))
+def test_date_filters_on_every_source(loaded_db, table):
+    expected = sorted(loaded_db[loaded_db.between(START, END)])
+
+    rows = [row for batch in iter_csv_rows(table, ['ActivityDate'], START, END) for row in batch]
+
+    assert rows[0] == ('ActivityDate',)
+    assert sorted(row[0] for row in rows[1:]) == expected
+
+
+def test_export_file_with_date_filter(loaded_db, tmp_path):
+    path, total = export_to_file('sor_daily_activity', str(tmp_path / 'sor.csv'), start_date='4/12/2016', end_date=END)
+
+    with open(path, newline='') as f:
+        records = list(csv.DictReader(f))
+    assert total == len(records) == int(loaded_db.between(START, END).sum())
+
+
+def test_iso_date():
+    assert iso_date('4/12/2016') == '2016-04-12'
+    assert iso_date(pd.Timestamp('2016-04-12 13:45')) == '2016-04-12'
+    with pytest.raises(ValueError):
+        iso_date('ontem')
@@ -0,0 +1,92 @@
+import sqlite3
+
+import pandas as pd
+
+from core.data.database import (
+    DB_NAME, insert_csv_to_sor, load_data, rebuild_etl_watermark, run_etl_for_predict_data,
+    run_etl_incremental, run_etl_sor_to_sot, run_etl_sot_to_spec_train,
+)
+from core.features.store import FEATURE_COLUMNS, FEATURE_TABLE, MODEL_FEATURE_COLUMNS
+
+
+def _full_load(df):
+    insert_csv_to_sor(df)
+    run_etl_sor_to_sot()
+    run_etl_sot_to_spec_train()
+    rebuild_etl_watermark()
+
+
+def _features():
+    with sqlite3.connect(DB_NAME) as conn:
+        df = pd.read_sql_query(f"SELECT {', '.join(FEATURE_COLUMNS)} FROM {FEATURE_TABLE}", conn)
+    return df.sort_values(['Id', 'ActivityDate']).reset_index(drop=True)
+
+
+def test_update_after_incremental_etl_matches_rebuild(empty_db, raw_activity):
+    initial = raw_activity.iloc[:400]
+    update = raw_activity.iloc[350:].copy()
+    # Passos alterados no meio do histórico: mudam as janelas e os acumulados seguintes
+    update.loc[update.index[:50:5], 'TotalSteps'] += 4000
+    final = pd.concat([raw_activity.iloc[:350], update])
+
+    _full_load(final)
+    expected = _features()
+
+    _full_load(initial)
+    run_etl_incremental(update)
+    pd.testing.assert_frame_equal(_features(), expected, check_dtype=False)
+
+
+def test_spec_train_carries_user_features(empty_db, raw_activity):
+    _full_load(raw_activity)
+    spec = load_data("spec_daily_activity_train")
+
+    assert set(MODEL_FEATURE_COLUMNS) <= set(spec.columns)
+    # Só o primeiro dia de cada usuário não tem histórico
+    assert spec['DaysObserved'].notna().all()
+    assert spec['Steps7dMean'].notna().sum() >= len(spec) - raw_activity['Id'].nunique()
+
+
+def test_predict_features_use_sot_history(empty_db, raw_activity):
+    dates = pd.to_datetime(raw_activity['ActivityDate'], format='%m/%d/%Y')
+    last_days = dates >= dates.max() - pd.Timedelta(days=2)
+
+    _full_load(raw_activity)
+    expected = _features()
+    expected = expected[expected['ActivityDate'] >= (dates.max() - pd.Timedelta(days=2)).strftime('%Y-%m-%d')]
+
+    _full_load(raw_activity[~last_days])
+    run_etl_for_predict_data(raw_activity[last_days])
+    with sqlite3.connect(DB_NAME) as conn:
+        predict = pd.read_sql_query("SELECT * FROM spec_daily_activity_predict", conn)
+
+    assert len(predict) == len(expected)
+    order = ['ActivityDate', 'DaysObserved', 'StepsDeviation']
+    columns = ['ActivityDate'] + MODEL_FEATURE_COLUMNS
+    pd.testing.assert_frame_equal(
+        predict[columns].sort_values(order).reset_index(drop=True),
+        expected[columns].sort_values(order).reset_index(drop=True),
+        check_dtype=False,
+    )
+
+
+def test_models_are_trained_on_user_features(empty_db, raw_activity):
+    from core.models.incremental import train_regressor_incremental
+
+    _full_load(raw_activity)
+    model, _ = train_regressor_incremental(n_epochs=1)
+
+    columns = model.named_steps["pre"].named_steps["pre"].feature_names_in_
+    assert set(MODEL_FEATURE_COLUMNS) <= set(columns)
+
+
+def test_old_spec_tables_gain_feature_columns(empty_db):
+    from core.data.database import ensure_database_and_tables
+
+    with sqlite3.connect(DB_NAME) as conn:
+        conn.execute("DROP TABLE spec_daily_activity_predict")
+        conn.execute("CREATE TABLE spec_daily_activity_predict (ActivityDate TEXT, TotalSteps INTEGER)")
+    ensure_database_and_tables()
+    with sqlite3.connect(DB_NAME) as conn:
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(spec_daily_activity_predict)")]
+    assert columns == ['ActivityDate', 'TotalSteps'] + MODEL_FEATURE_COLUMNS
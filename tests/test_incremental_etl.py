@@ -0,0 +1,139 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from core.data.database import (
+    DB_NAME, SOR_COLUMNS, SOT_COLUMNS, SPEC_COLUMNS, insert_csv_to_sor, rebuild_etl_watermark,
+    run_etl_incremental, run_etl_sor_to_sot, run_etl_sot_to_spec_train,
+)
+
+
+def _full_load(df):
+    insert_csv_to_sor(df)
+    run_etl_sor_to_sot()
+    run_etl_sot_to_spec_train()
+    rebuild_etl_watermark()
+
+
+def _table(name, columns):
+    with sqlite3.connect(DB_NAME) as conn:
+        df = pd.read_sql_query(f"SELECT {', '.join(columns)} FROM {name}", conn)
+    return df.sort_values(['ActivityDate', 'TotalSteps', 'Calories']).reset_index(drop=True)
+
+
+def _assert_same_tables(expected):
+    for name, columns in (
+        ("sor_daily_activity", SOR_COLUMNS),
+        ("sot_daily_activity", SOT_COLUMNS),
+        ("spec_daily_activity_train", SPEC_COLUMNS),
+    ):
+        pd.testing.assert_frame_equal(_table(name, columns), expected[name], check_dtype=False)
+
+
+@pytest.fixture
+def batches(raw_activity):
+    """Carga inicial de 400 linhas e um lote com 50 linhas alteradas e 57 novas."""
+    initial = raw_activity.iloc[:400]
+    update = raw_activity.iloc[350:].copy()
+    update.loc[update.index[:50], 'Calories'] += 1
+    final = pd.concat([raw_activity.iloc[:350], update])
+    return initial, update, final
+
+
+def test_sor_dates_are_iso_after_full_load(empty_db, raw_activity):
+    insert_csv_to_sor(raw_activity)
+    dates = _table("sor_daily_activity", SOR_COLUMNS)['ActivityDate']
+    assert dates.str.fullmatch(r"\d{4}-\d{2}-\d{2}").all()
+
+
+def test_incremental_after_full_load_matches_full_rebuild(empty_db, batches):
+    initial, update, final = batches
+
+    _full_load(final)
+    expected = {
+        name: _table(name, columns) for name, columns in (
+            ("sor_daily_activity", SOR_COLUMNS),
+            ("sot_daily_activity", SOT_COLUMNS),
+            ("spec_daily_activity_train", SPEC_COLUMNS),
+        )
+    }
+    assert len(expected["sor_daily_activity"]) == len(final)
+
+    _full_load(initial)
+    assert run_etl_incremental(update) == 50 + (len(update) - 50)
+    _assert_same_tables(expected)
+
+
+def test_incremental_skips_unchanged_rows(empty_db, batches):
+    initial, _, _ = batches
+    _full_load(initial)
+    assert run_etl_incremental(initial) == 0
+    # Mesmo conteúdo com datas já convertidas: a chave é a mesma
+    parsed = initial.assign(ActivityDate=pd.to_datetime(initial['ActivityDate'], format='%m/%d/%Y'))
+    assert run_etl_incremental(parsed) == 0
+
+
+def test_data_version_bumped_only_after_commit(empty_db, batches, monkeypatch):
+    import core.data.database as database
+    from core.data.connection import get_manager
+
+    initial, update, _ = batches
+    _full_load(initial)
+    calls = []
+    bump = database.bump_data_version
+    monkeypatch.setattr(
+        database, "bump_data_version",
+        lambda: calls.append(get_manager(DB_NAME).in_transaction()) or bump(),
+    )
+    run_etl_incremental(update)
+    assert calls and not any(calls)
+
+
+def test_typed_upload_after_csv_load_is_unchanged(empty_db, raw_activity):
+    from core.data.io import load_daily_activity
+    from tests.conftest import CSV_PATH
+
+    # Carga pelo CSV (float64) seguida do mesmo conteúdo tipado (float32)
+    _full_load(raw_activity)
+    assert run_etl_incremental(load_daily_activity(CSV_PATH)) == 0
+
+
+def test_to_storage_keeps_float32_values():
+    from core.data.schema import apply_schema, to_storage
+
+    typed = apply_schema(pd.DataFrame({'TotalDistance': [7.11, 0.1]}))
+    stored = to_storage(typed)['TotalDistance']
+    assert stored.dtype == 'float64'
+    assert stored.tolist() == typed['TotalDistance'].astype('float64').tolist()
+
+
+def test_incremental_processes_only_rows_whose_hash_changed(empty_db, batches):
+    initial, _, _ = batches
+    _full_load(initial)
+    with sqlite3.connect(DB_NAME) as conn:
+        conn.execute("UPDATE etl_watermark SET UpdatedAt = 'antes'")
+        hashes = dict(((i, d), h) for i, d, h in conn.execute("SELECT Id, ActivityDate, RowHash FROM etl_watermark"))
+
+    # Mesmo lote inteiro, com 10 linhas alteradas no meio
+    batch = initial.copy()
+    altered = batch.index[100:110]
+    batch.loc[altered, 'TotalSteps'] += 1000
+    assert run_etl_incremental(batch) == 10
+
+    with sqlite3.connect(DB_NAME) as conn:
+        marks = pd.read_sql_query("SELECT Id, ActivityDate, RowHash, UpdatedAt FROM etl_watermark", conn)
+        sor = pd.read_sql_query("SELECT Id, ActivityDate, TotalSteps FROM sor_daily_activity", conn)
+    touched = marks[marks['UpdatedAt'] != 'antes']
+    keys = set(zip(touched['Id'], touched['ActivityDate']))
+    expected_keys = set(zip(
+        batch.loc[altered, 'Id'],
+        pd.to_datetime(batch.loc[altered, 'ActivityDate'], format='%m/%d/%Y').dt.strftime('%Y-%m-%d'),
+    ))
+    assert keys == expected_keys
+    assert all(hashes[(i, d)] != h for i, d, h in zip(touched['Id'], touched['ActivityDate'], touched['RowHash']))
+    assert len(marks) == len(initial)
+    assert sor['TotalSteps'].sum() == initial['TotalSteps'].sum() + 10 * 1000
+
+    # Reenviar o lote alterado não processa nada
+    assert run_etl_incremental(batch) == 0
@@ -0,0 +1,59 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.data.database import (
+    DB_NAME, insert_csv_to_sor, run_etl_sor_to_sot, run_etl_sot_to_spec_train,
+)
+from core.features.preprocess import make_preprocess_pipeline
+from core.models.incremental import (
+    TRAIN_TABLE, _holdout_filter, fit_streaming_preprocess, train_regressor_incremental,
+)
+
+
+@pytest.fixture
+def spec_train(empty_db, raw_activity):
+    insert_csv_to_sor(raw_activity)
+    run_etl_sor_to_sot()
+    run_etl_sot_to_spec_train()
+
+
+def _rowids(where):
+    with sqlite3.connect(DB_NAME) as conn:
+        return {row[0] for row in conn.execute(f"SELECT rowid FROM {TRAIN_TABLE} WHERE {where}")}
+
+
+def _dense(matrix):
+    return matrix.toarray() if hasattr(matrix, "toarray") else np.asarray(matrix)
+
+
+def test_streaming_preprocess_matches_batch_fit(spec_train):
+    where = _holdout_filter(5, test=False)
+    with sqlite3.connect(DB_NAME) as conn:
+        X = pd.read_sql_query(f"SELECT * FROM {TRAIN_TABLE} WHERE {where}", conn).drop(columns=["Calories"])
+
+    # Blocos pequenos: o StandardScaler passa por vários partial_fit
+    streaming = fit_streaming_preprocess(target="Calories", chunksize=37, where=where)
+    batch = make_preprocess_pipeline(X).fit(X)
+
+    streaming_scaler, batch_scaler = streaming.named_steps["scaler"], batch.named_steps["scaler"]
+    assert streaming_scaler.n_samples_seen_ == len(X)
+    np.testing.assert_allclose(streaming_scaler.var_, batch_scaler.var_, rtol=1e-6)
+    np.testing.assert_allclose(streaming_scaler.scale_, batch_scaler.scale_, rtol=1e-6)
+    np.testing.assert_allclose(_dense(streaming.transform(X)), _dense(batch.transform(X)), rtol=1e-6, atol=1e-9)
+
+
+def test_holdout_rows_are_disjoint_from_training(spec_train):
+    train = _rowids(_holdout_filter(5, test=False))
+    test = _rowids(_holdout_filter(5, test=True))
+
+    assert train and test
+    assert not train & test
+    assert train | test == _rowids("1 = 1")
+    assert all(rowid % 5 == 0 for rowid in test)
+
+    _, metrics = train_regressor_incremental(n_epochs=1, holdout_every=5, chunksize=100)
+    assert metrics["n_train_rows"] == len(train)
+    assert metrics["n_test_rows"] == len(test)
@@ -0,0 +1,34 @@
+import io
+import sqlite3
+
+import pandas as pd
+
+from core.data import dates
+from core.data.database import DB_NAME, main
+from core.data.io import iter_daily_activity_chunks
+from tests.conftest import CSV_PATH
+
+
+def test_chunks_of_an_unnamed_buffer_are_not_cached():
+    dates.clear_format_cache()
+    with open(CSV_PATH, "rb") as f:
+        data = f.read()
+
+    chunks = list(iter_daily_activity_chunks(io.BytesIO(data), chunksize=100))
+    assert len(dates._FORMAT_CACHE) == 0
+
+    list(iter_daily_activity_chunks(CSV_PATH, chunksize=100))
+    assert list(dates._FORMAT_CACHE) == [CSV_PATH]
+    assert sum(len(c) for c in chunks) == len(pd.read_csv(CSV_PATH))
+    dates.clear_format_cache()
+
+
+def test_command_line_load_runs_the_etl(empty_db):
+    main([CSV_PATH, "--chunksize", "100", "--etl"])
+
+    with sqlite3.connect(DB_NAME) as conn:
+        counts = [
+            conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("sor_daily_activity", "sot_daily_activity", "spec_daily_activity_train")
+        ]
+    assert counts == [len(pd.read_csv(CSV_PATH))] * 3
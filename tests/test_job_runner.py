@@ -0,0 +1,138 @@
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import pandas as pd
+
+from core.data.database import runtime_transaction
+from core.jobs.runner import JobRunner
+
+
+def _orphan(runner, running_job):
+    """Simula a queda de `runner`: seus jobs param de receber heartbeat."""
+    deadline = time.monotonic() + 10
+    while runner.get(running_job)["Status"] != "running" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    with runtime_transaction() as conn:
+        conn.execute("UPDATE jobs SET HeartbeatAt = '2000-01-01T00:00:00' WHERE Owner = ?", (runner.owner,))
+
+
+def test_pending_jobs_resume_with_their_payload(tmp_path):
+    release = threading.Event()
+    first = JobRunner(payload_dir=str(tmp_path))
+    first.register("work", lambda params, payload, progress: release.wait(10) and {})
+
+    blocking = first.submit("work", {"n": 1}, pd.DataFrame({"x": [1]}))
+    queued = first.submit("work", {"n": 2}, pd.DataFrame({"x": [2, 3]}))
+    assert first.get(queued)["Status"] == "pending"
+    assert len(os.listdir(tmp_path)) == 2
+
+    # Outro processo (após um reinício) retoma os jobs pelo conteúdo em disco
+    _orphan(first, blocking)
+    received = {}
+
+    def record(params, payload, progress):
+        received[params["n"]] = payload
+        return {}
+
+    second = JobRunner(payload_dir=str(tmp_path))
+    second.register("work", record)
+    assert second.resume() == [blocking, queued]
+    second.shutdown(wait=True)
+
+    assert received[2]["x"].tolist() == [2, 3]
+    assert second.get(queued)["Status"] == "done"
+    assert not os.path.exists(tmp_path / f"{queued}.pickle")
+
+    release.set()
+    first.shutdown(wait=True)
+
+
+def test_job_without_payload_file_is_interrupted(tmp_path):
+    release = threading.Event()
+    first = JobRunner(payload_dir=str(tmp_path))
+    first.register("work", lambda params, payload, progress: release.wait(10) and {})
+    blocking = first.submit("work", {"n": 1}, pd.DataFrame({"x": [1]}))
+    lost = first.submit("work", {"n": 2}, pd.DataFrame({"x": [2]}))
+    os.remove(tmp_path / f"{lost}.pickle")
+    _orphan(first, blocking)
+
+    second = JobRunner(payload_dir=str(tmp_path))
+    second.register("work", lambda params, payload, progress: {})
+    assert lost not in second.resume()
+    assert second.get(lost)["Status"] == "interrupted"
+    second.shutdown(wait=True)
+
+    release.set()
+    first.shutdown(wait=True)
+
+
+def test_jobs_of_a_live_runner_are_not_resumed(tmp_path):
+    release = threading.Event()
+    first = JobRunner(payload_dir=str(tmp_path))
+    first.register("work", lambda params, payload, progress: release.wait(10) and {})
+    running = first.submit("work", {"n": 1}, pd.DataFrame({"x": [1]}))
+    queued = first.submit("work", {"n": 2}, pd.DataFrame({"x": [2]}))
+
+    second = JobRunner(payload_dir=str(tmp_path))
+    second.register("work", lambda params, payload, progress: {})
+    assert second.resume() == []
+    assert first.get(queued)["Owner"] == first.owner
+
+    release.set()
+    first.shutdown(wait=True)
+    second.shutdown(wait=True)
+    assert first.get(running)["Status"] == "done"
+    assert first.get(queued)["Status"] == "done"
+
+
+def test_jobs_of_a_dead_process_are_resumed_without_waiting(tmp_path):
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    first = JobRunner(payload_dir=str(tmp_path))
+    first.register("work", lambda params, payload, progress: {})
+    first._executor.shutdown(wait=True)
+    first._executor = _NoExecutor()
+    job_id = first.submit("work", {"n": 1}, pd.DataFrame({"x": [1]}))
+    with runtime_transaction() as conn:
+        conn.execute("UPDATE jobs SET Owner = ? WHERE JobId = ?", (f"{socket.gethostname()}:{dead.pid}:morto", job_id))
+
+    second = JobRunner(payload_dir=str(tmp_path))
+    second.register("work", lambda params, payload, progress: {})
+    assert second.resume() == [job_id]
+    second.shutdown(wait=True)
+    assert second.get(job_id)["Status"] == "done"
+    first.shutdown(wait=True)
+
+
+def test_queued_job_claimed_by_another_runner_is_skipped(tmp_path):
+    release = threading.Event()
+    ran = []
+    first = JobRunner(payload_dir=str(tmp_path))
+    first.register("work", lambda params, payload, progress: ran.append(params["n"]) or release.wait(10) and {})
+    blocking = first.submit("work", {"n": 1}, pd.DataFrame({"x": [1]}))
+    queued = first.submit("work", {"n": 2}, pd.DataFrame({"x": [2]}))
+    _orphan(first, blocking)
+
+    second = JobRunner(payload_dir=str(tmp_path))
+    second.register("work", lambda params, payload, progress: {})
+    assert queued in second.resume()
+    second.shutdown(wait=True)
+
+    release.set()
+    first.shutdown(wait=True)
+    assert ran == [1]
+    assert first.get(queued)["Owner"] == second.owner
+
+
+class _NoExecutor:
+    """Executor que nunca roda nada: o job fica pendente como num processo morto."""
+
+    def submit(self, *args, **kwargs):
+        return None
+
+    def shutdown(self, wait=True):
+        pass
@@ -0,0 +1,52 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from core.data.database import DB_NAME, insert_csv_to_sor, run_etl_sor_to_sot
+from core.data.query import (
+    QUERYABLE_TABLES, count_daily_activity, iter_daily_activity_pages, query_daily_activity,
+)
+
+START, END = '2016-04-12', '2016-04-16'
+
+
+@pytest.fixture
+def loaded_db(empty_db, raw_activity):
+    insert_csv_to_sor(raw_activity)
+    run_etl_sor_to_sot()
+    dates = pd.to_datetime(raw_activity['ActivityDate'], format='%m/%d/%Y')
+    return raw_activity.assign(ActivityDate=dates)
+
+
+@pytest.mark.parametrize("table", sorted(QUERYABLE_TABLES))
+def test_date_filters_on_every_table(loaded_db, table):
+    in_range = loaded_db['ActivityDate'].between(START, END)
+    expected = loaded_db[in_range].sort_values(['Id', 'ActivityDate'])
+
+    result = query_daily_activity(table, start_date=START, end_date=END, columns=['Id', 'ActivityDate'])
+
+    assert count_daily_activity(table, start_date=START, end_date=END) == len(expected)
+    assert result['Id'].tolist() == expected['Id'].tolist()
+    assert result['ActivityDate'].tolist() == expected['ActivityDate'].tolist()
+
+
+@pytest.mark.parametrize("table", sorted(QUERYABLE_TABLES))
+def test_keyset_pages_cover_every_row_once(loaded_db, table):
+    pages = list(iter_daily_activity_pages(table, columns=['Id', 'ActivityDate'], page_size=7))
+
+    assert all(len(page) == 7 for page in pages[:-1])
+    rows = pd.concat(pages, ignore_index=True)
+    assert len(rows) == len(loaded_db)
+    assert not rows.duplicated().any()
+
+
+def test_keyset_pages_stop_when_cursor_does_not_advance(empty_db):
+    # Datas fora de YYYY-MM-DD gravadas sem passar pelos escritores da SOR
+    with sqlite3.connect(DB_NAME) as conn:
+        conn.executemany(
+            "INSERT INTO sor_daily_activity (Id, ActivityDate, TotalSteps) VALUES (?, ?, ?)",
+            [(1, '4/9/2016', 100), (1, '4/10/2016', 200)],
+        )
+    with pytest.raises(RuntimeError, match="não avançou"):
+        list(iter_daily_activity_pages('sor_daily_activity', page_size=1))
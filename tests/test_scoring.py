@@ -0,0 +1,43 @@
+import pickle
+
+import pytest
+
+from core.data.database import load_data, run_etl_for_predict_data
+from core.data.io import load_daily_activity
+from core.data.schema import to_model_input
+from core.models.scoring import load_predictions, score_predict_table
+from tests.conftest import CSV_PATH
+
+
+@pytest.fixture
+def model_path(empty_db, tmp_path):
+    from core.data.database import insert_csv_to_sor_streaming, run_etl_sor_to_sot, run_etl_sot_to_spec_train
+    from core.features.preprocess import make_preprocess_pipeline
+    from core.models.train import train_regressor
+
+    insert_csv_to_sor_streaming(CSV_PATH)
+    run_etl_sor_to_sot()
+    run_etl_sot_to_spec_train()
+    df = to_model_input(load_data("spec_daily_activity_train"))
+    X = df.drop(columns=["Calories"])
+    model, _, _ = train_regressor(X, df["Calories"], make_preprocess_pipeline(X))
+    path = tmp_path / "model.pickle"
+    with open(path, "wb") as f:
+        pickle.dump(model, f)
+    return str(path)
+
+
+def test_new_predict_batch_drops_previous_predictions(model_path):
+    df = load_daily_activity(CSV_PATH)
+    run_etl_for_predict_data(df.iloc[:100])
+    version, n_rows = score_predict_table(model_path)
+    assert n_rows == 100
+    assert len(load_predictions()) == 100
+
+    # Novo lote: as previsões antigas apontariam para linhas de outro lote
+    run_etl_for_predict_data(df.iloc[200:250])
+    assert load_predictions().empty
+    score_predict_table(model_path)
+    predictions = load_predictions(version)
+    assert len(predictions) == 50
+    assert predictions["TotalSteps"].tolist() == df["TotalSteps"].iloc[200:250].tolist()
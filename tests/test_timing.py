@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from core.data.database import ensure_runtime_tables, runtime_connection, runtime_transaction
+from core.monitoring import timing
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(timing, "TIMING_ENABLED", True)
+    monkeypatch.setattr(timing, "MEMORY_ENABLED", True)
+    ensure_runtime_tables()
+    timing.flush_metrics()
+    with runtime_transaction() as conn:
+        conn.execute("DELETE FROM stage_metrics")
+    yield
+    timing.flush_metrics()
+
+
+def _stages(run_id):
+    return timing.run_stages(run_id).set_index("Stage")
+
+
+def test_peak_memory_is_per_stage(enabled):
+    with timing.stage("raiz", run_id="memoria") as root:
+        with timing.stage("grande"):
+            big = np.ones(40 * 1024 ** 2 // 8)
+            del big
+        # O pico do processo já passou de 40 MB; este estágio aloca só 8 MB
+        with timing.stage("pequeno"):
+            small = np.ones(8 * 1024 ** 2 // 8)
+            del small
+    assert root.run_id == "memoria"
+
+    stages = _stages("memoria")
+    assert stages.loc["grande", "PeakAllocMB"] == pytest.approx(40, abs=2)
+    assert stages.loc["pequeno", "PeakAllocMB"] == pytest.approx(8, abs=2)
+    assert stages.loc["raiz", "PeakAllocMB"] >= stages.loc["grande", "PeakAllocMB"]
+    assert abs(stages.loc["pequeno", "AllocGrowthMB"]) < 1
+
+
+def test_root_stages_are_written_in_batches(enabled, monkeypatch):
+    monkeypatch.setattr(timing, "FLUSH_SECONDS", 3600.0)
+    timing.flush_metrics()
+    for _ in range(3):
+        with timing.stage("consulta"):
+            pass
+    with runtime_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM stage_metrics").fetchone()[0] == 0
+
+    assert timing.flush_metrics() == 3
+
+
+def test_table_is_pruned_to_max_rows(enabled, monkeypatch):
+    monkeypatch.setattr(timing, "MAX_ROWS", 5)
+    for i in range(12):
+        with timing.stage(f"consulta_{i}", run_id=f"run_{i}"):
+            pass
+
+    with runtime_connection() as conn:
+        stages = [row[0] for row in conn.execute("SELECT Stage FROM stage_metrics ORDER BY Id")]
+    assert stages == [f"consulta_{i}" for i in range(7, 12)]
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.linear_model import LinearRegression, Ridge
+from sklearn.model_selection import KFold
+from sklearn.pipeline import Pipeline
+
+from core.features.preprocess import make_preprocess_pipeline
+from core.models.train import split, train_regressor_cv
+
+FITTED_ON = []
+
+
+class RecordFit(BaseEstimator, TransformerMixin):
+    """Guarda os índices das linhas usadas em cada fit (n_jobs=1: mesmo processo)."""
+
+    def fit(self, X, y=None):
+        FITTED_ON.append(set(X.index))
+        return self
+
+    def transform(self, X):
+        return X
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({
+        "TotalSteps": rng.integers(0, 20000, 300).astype(float),
+        "VeryActiveMinutes": rng.integers(0, 120, 300).astype(float),
+        "ActivityLevel": rng.choice(["Baixo", "Médio", "Alto"], 300),
+    })
+    X.loc[X.sample(30, random_state=0).index, "TotalSteps"] = np.nan
+    y = pd.Series(1500 + 0.05 * X["TotalSteps"].fillna(8000) + 8 * X["VeryActiveMinutes"] + rng.normal(0, 50, 300))
+    FITTED_ON.clear()
+    return X, y
+
+
+def test_preprocessing_is_fitted_on_each_training_fold_only(data):
+    X, y = data
+    pre = Pipeline([("record", RecordFit()), ("pre", make_preprocess_pipeline(X))])
+
+    _, X_test, _, _ = train_regressor_cv(X, y, pre, n_splits=4, n_jobs=1)
+
+    X_train, _, _, _ = split(X, y, test_size=0.2, random_state=42)
+    folds = KFold(n_splits=4, shuffle=True, random_state=42).split(X_train)
+    expected = [set(X_train.index[train_idx]) for train_idx, _ in folds]
+    # Um ajuste por fold (compartilhado entre os candidatos) e o re-treino final
+    assert FITTED_ON == expected + [set(X_train.index)]
+    for fitted, (_, val_idx) in zip(FITTED_ON, KFold(n_splits=4, shuffle=True, random_state=42).split(X_train)):
+        assert not fitted & set(X_train.index[val_idx])
+    assert not any(fitted & set(X_test.index) for fitted in FITTED_ON)
+
+
+def test_results_table_ranks_candidates(data):
+    X, y = data
+    grid = [("LinearRegression", LinearRegression, {}), ("Ridge", Ridge, {"alpha": [0.1, 1000.0]})]
+
+    model, _, _, results = train_regressor_cv(X, y, make_preprocess_pipeline(X), n_splits=3, grid=grid, n_jobs=1)
+
+    assert list(results.columns) == [
+        "rank", "model", "params", "mean_rmse", "std_rmse",
+        "mean_fit_time", "mean_score_time", "mean_preprocess_time",
+    ]
+    assert results["rank"].tolist() == [1, 2, 3]
+    assert results["mean_rmse"].is_monotonic_increasing
+    assert sorted(map(str, results["params"])) == sorted(["{}", "{'alpha': 0.1}", "{'alpha': 1000.0}"])
+    assert (results[["mean_fit_time", "mean_score_time", "mean_preprocess_time"]] >= 0).all().all()
+    # O modelo devolvido é o primeiro da tabela, re-treinado
+    best = results.loc[0]
+    assert type(model.named_steps["reg"]).__name__ == best["model"]
+    assert model.named_steps["reg"].get_params().items() >= best["params"].items()